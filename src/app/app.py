@@ -5,39 +5,41 @@ app.py - starting point for lambda function execution
 from app.utils.notify import send_error
 from app.config import _IS_LAMBDA_ENV, _USERS
 from app.utils.scrape import process_partition
-from app.utils.aws import AWSClient
+from app.utils.breaker import breaker_stats
+from app.utils.transport import latency_stats
+from app.utils.dbstats import get_stats
+from app.utils.profiler import profiling_enabled, profile_call
+from app.utils.runtime import RuntimeContext, get_runtime
+from app.utils.logs import setup_logging, flush_logs
+from app.utils.codec import pack_result
 from app.exec.cleanup import update_point
 from app.exec.txn import check_txns
 from app.exec.after import update_stock_info
 from app.exec.work import test_exec
 from app.exec.test import test_pc
 
-import json
 import traceback
 import logging
 
 
-# Log settings
+# Log settings - records are queued and written as JSON lines by a background thread
 logger = logging.getLogger()
-logger.setLevel(logging.INFO)
-formatter = logging.Formatter("%(filename)s:%(funcName)s:%(lineno)d:%(message)s")
-stream_handler = logging.StreamHandler()
-stream_handler.setFormatter(formatter)
 
 # Additional set up based on environment ran from
 if _IS_LAMBDA_ENV:
+    setup_logging(logging.INFO)
     logger.info("Setting up in AWS...")
 else:
-    logger.addHandler(stream_handler)
-    logger.info("Setting up for local testing...")
-
     # add log file
     file_handler = logging.FileHandler("testing.log")
     file_handler.setLevel(logging.INFO)
-    file_handler.setFormatter(formatter)
-    logger.addHandler(file_handler)
+    setup_logging(logging.INFO, [logging.StreamHandler(), file_handler])
+    logger.info("Setting up for local testing...")
 logger.info("Set up complete!")
 
+# shared by warm invocations of this container (partition code obtains it via get_runtime)
+_RUNTIME = get_runtime()
+
 
 def lambda_handler(event: dict, context: dict) -> dict:
     """Starting point for AWS lambda call
@@ -47,13 +49,46 @@ def lambda_handler(event: dict, context: dict) -> dict:
     :return: Response object containing dictionary of results
     """
 
+    # warm containers reuse module state - stats cover this invocation only
+    get_stats().reset()
+    try:
+        try:
+            _RUNTIME.check()
+        except Exception as e:
+            # unhealthy resources are rebuilt on next use - the invocation can still proceed
+            logger.error("Runtime context check failed: %s", e, exc_info=True)
+
+        if profiling_enabled(event):
+            name = "partition" if "partitionPayload" in event else event.get("script", "")
+            return profile_call(name, _dispatch, event, context, _RUNTIME)
+        return _dispatch(event, context, _RUNTIME)
+    finally:
+        get_stats().log_summary()
+        try:
+            _RUNTIME.persist()
+        except Exception as e:
+            logger.error("Runtime context could not be persisted: %s", e, exc_info=True)
+        logger.info("Runtime context: %s", _RUNTIME.stats())
+        flush_logs()
+
+
+def _dispatch(event: dict, context: dict, runtime: RuntimeContext) -> dict:
+    """Executes partition processing or script requested by lambda event
+
+    :param event: JSON doc containing data for lambda function to process
+    :param context: Provides info about invocation, function and runtime env
+    :param runtime: QT/DB/AWS resources shared across warm invocations
+    :return: Response object containing dictionary of results
+    """
+
     # Process partition
     if "partitionPayload" in event:
         try:
             partition_payload = event["partitionPayload"]
 
             if bool(partition_payload):
-                return process_partition(**partition_payload)
+                res = process_partition(**partition_payload)
+                return _encode_result(event, res, runtime)
         except Exception as e:
             tb = traceback.format_exc()
             logger.info(f"An error occurred while processing partition: {e}")
@@ -84,6 +119,10 @@ def lambda_handler(event: dict, context: dict) -> dict:
             test_exec()
         elif script == "test":
             test_pc()
+        elif script == "symbols":
+            symbols = runtime.symbols
+            if symbols.harvest():
+                symbols.save()
 
         ret_body = {
             "statusCode": 200,
@@ -110,8 +149,8 @@ def lambda_handler(event: dict, context: dict) -> dict:
         logger.info(f"Splitting execution of {script}...")
 
         script = script.replace("SPLIT", "")
-        lambda_client = AWSClient("lambda")
-        lambda_client.pc_lambda(json.dumps({"script": script}))
+        lambda_client = runtime.aws("lambda")
+        lambda_client.pc_lambda({"script": script})
         ret_body = {
             "statusCode": 200,
             "body": {"status": f"Successfully split {script}"},
@@ -148,4 +187,20 @@ def lambda_handler(event: dict, context: dict) -> dict:
                 }
 
     logger.info(f"Script complete: {script}")
-    return ret_body
+    logger.info("Circuit breakers: %s", breaker_stats())
+    logger.info("Endpoint latencies: %s", latency_stats())
+    return _encode_result(event, ret_body, runtime)
+
+
+def _encode_result(event: dict, res: dict, runtime: RuntimeContext) -> dict:
+    """Packs the body of a successful response if the caller asked for a compact encoded result
+
+    :param event: JSON doc of lambda event (AWSClient.pc_lambda sets resultCodec)
+    :param res: response object
+    :param runtime: QT/DB/AWS resources shared across warm invocations
+    :return: response object, with body packed by codec.pack_result if requested
+    """
+
+    if event.get("resultCodec") and res.get("statusCode") == 200:
+        res["body"] = pack_result(res["body"], runtime.aws("s3"))
+    return res
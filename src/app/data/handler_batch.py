@@ -0,0 +1,133 @@
+"""
+handler_batch.py - Contains the DataHandlerBatch class which holds many symbols compactly and routes source calls in bulk
+"""
+
+from app.data.qt import QT
+from app.data.nq import get_quote_nq_batch
+
+from typing import Dict, Iterator, List, Sequence
+
+
+class HandlerView:
+    """A lightweight, DataHandler-compatible view of one symbol in a DataHandlerBatch
+
+    Exposes tickers/exchange/currency/qt so it can be passed to any source function
+    expecting a DataHandler (e.g. QT.get_mkt_quote, get_quote_nq).
+    """
+
+    __slots__ = ("batch", "i", "_tickers")
+
+    def __init__(self, batch: "DataHandlerBatch", i: int) -> None:
+        """Constructor method
+
+        :param batch: batch the symbol belongs to
+        :param i: index of symbol in batch
+        """
+
+        self.batch = batch
+        self.i = i
+        self._tickers = None  # {source: ticker}, built on first access
+
+    @property
+    def tickers(self) -> Dict[str, str]:
+        if self._tickers is None:
+            self._tickers = {src: tickers[self.i] for src, tickers in self.batch.tickers.items()}
+        return self._tickers
+
+    @property
+    def exchange(self) -> str:
+        return self.batch.exchanges[self.i]
+
+    @property
+    def currency(self) -> str:
+        return self.batch.currencies[self.i]
+
+    @property
+    def qt(self) -> QT:
+        return self.batch.qt
+
+    def __repr__(self) -> str:
+        return f"HandlerView({self.batch.tickers['yf'][self.i]}, {self.exchange})"
+
+
+class DataHandlerBatch:
+    """A class to organize N symbols as parallel tuples and fetch their data with bulk source calls"""
+
+    __slots__ = ("tickers", "exchanges", "currencies", "qt", "qids")
+
+    def __init__(
+        self,
+        tickers: Dict[str, Sequence[str]],
+        exchanges: Sequence[str],
+        currencies: Sequence[str],
+        qt: QT = None,
+    ) -> None:
+        """Constructor method
+
+        :param tickers: dict of {source: tickers} aligned by index - must include "yf" (e.g. {"yf": [...], "qt": [...], "nq": [...]})
+        :param exchanges: exchange of each symbol
+        :param currencies: currency of each symbol
+        :param qt: QT instance used for Questrade calls, defaults to None
+        """
+
+        n = len(tickers["yf"])
+        if any(len(t) != n for t in tickers.values()) or not (
+            len(exchanges) == len(currencies) == n
+        ):
+            raise ValueError("All ticker, exchange and currency sequences must be aligned")
+
+        self.tickers = {src: tuple(t) for src, t in tickers.items()}
+        self.exchanges = tuple(exchanges)
+        self.currencies = tuple(currencies)
+        self.qt = qt
+        self.qids = None  # {yf_ticker: QT symbol id}, loaded once on first QT call
+
+    def __len__(self) -> int:
+        return len(self.exchanges)
+
+    def __getitem__(self, i: int) -> HandlerView:
+        if not -len(self) <= i < len(self):
+            raise IndexError(i)
+        return HandlerView(self, i % len(self))
+
+    def __iter__(self) -> Iterator[HandlerView]:
+        return (HandlerView(self, i) for i in range(len(self)))
+
+    def get_qids(self) -> dict:
+        """Obtains QT symbol ids for all symbols (single DB query, cached)
+
+        :return: dict of {yf_ticker: QT symbol id}
+        """
+
+        if self.qids is None:
+            self.qids = self.qt.get_qids(list(self))
+
+        return self.qids
+
+    def get_mkt_quote(self, info: List[str]) -> List[List]:
+        """Obtains QT market quotes for all symbols (see QT.get_mkt_quote)
+
+        :param info: list of desired attributes available in QT JSON response
+        :return: list of value lists, aligned with batch
+        """
+
+        return self.qt.get_mkt_quote_batch(list(self), info, self.get_qids())
+
+    def get_symbol_info(self, info: List[str]) -> List[List]:
+        """Obtains QT symbol info for all symbols (see QT.get_symbol_info)
+
+        :param info: list of desired attributes available in QT JSON response
+        :return: list of value lists, aligned with batch
+        """
+
+        return self.qt.get_symbol_info_batch(list(self), info, self.get_qids())
+
+    def get_quote_nq(self, info: List[str], max_workers: int = 16) -> List[List]:
+        """Obtains nasdaq.com quote info for all symbols (see get_quote_nq)
+
+        :param info: list of attributes to extract from response object
+        :param max_workers: max number of concurrent requests, defaults to 16
+        :return: list of value lists, aligned with batch
+        """
+
+        return get_quote_nq_batch(list(self), info, max_workers)
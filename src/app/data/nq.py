@@ -3,13 +3,17 @@ nq.py - Contains functions for data extraction from https://www.nasdaq.com
 """
 
 from app.utils.scrape import extract_json, get_user_agent
+from app.utils.breaker import get_breaker, is_failure_status
+from app.utils import transport
 
-import requests
+import os
 from typing import List, Literal
-import traceback
+import concurrent.futures
 import logging
 
 logger = logging.getLogger(__name__)
+_BREAKER = get_breaker("nq")
+_BASE_URL = os.environ.get("NQ_BASE_URL", "https://api.nasdaq.com")
 
 
 def get_quote_nq(
@@ -44,27 +48,64 @@ def get_quote_nq(
     :return: list of info contained from GET request
     """
 
-    if handler.currency == "USD":
+    if handler.currency == "USD" and _BREAKER.allow():
         ticker = handler.tickers["nq"]
-        url = f"https://api.nasdaq.com/api/quote/{ticker}/summary?assetclass=stocks"
+        url = f"{_BASE_URL}/api/quote/{ticker}/summary?assetclass=stocks"
 
+        # every allowed call records exactly one outcome, whatever happens
+        success = False
         try:
-            res = requests.get(
-                url, headers={"User-Agent": get_user_agent()}, timeout=30
+            res = transport.get(
+                "nq.summary",
+                url,
+                hedge=True,
+                headers={"User-Agent": get_user_agent()},
             )
 
             if res.status_code == 200:
                 results = res.json()
+                success = True
                 if results["data"]:
                     return [extract_json(ref, results) for ref in info]
+            else:
+                success = not is_failure_status(res.status_code)
 
         except Exception as e:
-            logger.error(f"Nasdaq API failed for {url} - looking for {info}: {e}")
-            logger.error(traceback.format_exc())
+            logger.error(
+                "Nasdaq API failed for %s - looking for %s: %s", url, info, e, exc_info=True
+            )
+        finally:
+            _BREAKER.record(success)
 
     return [None] * len(info)
 
 
+def get_quote_nq_batch(
+    handlers: List[object], info: List[str], max_workers: int = 16
+) -> List[List]:
+    """Obtains quote info from nasdaq.com for many handlers concurrently
+
+    :param handlers: DataHandler objects (or DataHandlerBatch views)
+    :param info: list of attributes to extract from response object (see get_quote_nq)
+    :param max_workers: max number of concurrent requests, defaults to 16
+    :return: list of info lists, aligned with handlers
+    """
+
+    results = [[None] * len(info) for _ in handlers]
+    usd_idx = [i for i, handler in enumerate(handlers) if handler.currency == "USD"]
+    if not usd_idx:
+        return results
+
+    with concurrent.futures.ThreadPoolExecutor(max_workers=max_workers) as executor:
+        futures = {
+            executor.submit(get_quote_nq, handlers[i], info): i for i in usd_idx
+        }
+        for future in concurrent.futures.as_completed(futures):
+            results[futures[future]] = future.result()
+
+    return results
+
+
 def get_exchange_nq(
     handler: object,
     info: List[Literal["data.summaryData.Exchange.value"]],
@@ -80,16 +121,21 @@ def get_exchange_nq(
     :return: single item array - [exchange]
     """
 
-    if currency == "USD":
-        url = f"https://api.nasdaq.com/api/quote/{prefix}/summary?assetclass=stocks"
+    if currency == "USD" and _BREAKER.allow():
+        url = f"{_BASE_URL}/api/quote/{prefix}/summary?assetclass=stocks"
 
+        success = False
         try:
-            res = requests.get(
-                url, headers={"User-Agent": get_user_agent()}, timeout=30
+            res = transport.get(
+                "nq.summary",
+                url,
+                hedge=True,
+                headers={"User-Agent": get_user_agent()},
             )
 
             if res.status_code == 200:
                 results = res.json()
+                success = True
                 if results["data"]:
                     res_exchange = extract_json(
                         "data.summaryData.Exchange.value", results
@@ -101,9 +147,14 @@ def get_exchange_nq(
                             return ["nasdaq"]
                         elif "nyse" in res_exchange:
                             return ["nyse"]
+            else:
+                success = not is_failure_status(res.status_code)
 
         except Exception as e:
-            logger.error(f"Nasdaq API failed for {url} - looking for {info}: {e}")
-            logger.error(traceback.format_exc())
+            logger.error(
+                "Nasdaq API failed for %s - looking for %s: %s", url, info, e, exc_info=True
+            )
+        finally:
+            _BREAKER.record(success)
 
     return [None] * len(info)
@@ -0,0 +1,234 @@
+"""
+planner.py - Contains the FieldPlanner class which picks the cheapest source for each requested field and coalesces fetches
+
+Fields are requested by logical name. A field only lists alternative sources that report the same
+quantity, and numeric fields are converted to one type whichever source provides them (nasdaq.com
+reports numbers as formatted strings such as "$1,234.50" or "0.6%"), so a field's value never
+depends on which other fields were requested alongside it.
+"""
+
+from app.data.qt import QT
+from app.data.nq import get_quote_nq_batch
+
+from typing import Dict, List, Literal, Tuple
+import logging
+
+logger = logging.getLogger(__name__)
+
+_SOURCE_COSTS = {"qt_quote": 1, "qt_symbol": 1, "nq": 3}
+
+# {logical field: [(source, source field)]}
+_FIELD_SOURCES = {
+    "symbol": [("qt_quote", "symbol"), ("qt_symbol", "symbol")],
+    "symbolId": [("qt_quote", "symbolId"), ("qt_symbol", "symbolId")],
+    "bidPrice": [("qt_quote", "bidPrice")],
+    "bidSize": [("qt_quote", "bidSize")],
+    "askPrice": [("qt_quote", "askPrice")],
+    "askSize": [("qt_quote", "askSize")],
+    "lastTradePrice": [("qt_quote", "lastTradePrice")],
+    "lastTradePriceTrHrs": [("qt_quote", "lastTradePriceTrHrs")],
+    "lastTradeSize": [("qt_quote", "lastTradeSize")],
+    "lastTradeTime": [("qt_quote", "lastTradeTime")],
+    "volume": [("qt_quote", "volume"), ("nq", "data.summaryData.ShareVolume.value")],
+    "openPrice": [("qt_quote", "openPrice")],
+    "highPrice": [("qt_quote", "highPrice")],
+    "lowPrice": [("qt_quote", "lowPrice")],
+    "isHalted": [("qt_quote", "isHalted")],
+    "prevDayClosePrice": [
+        ("qt_symbol", "prevDayClosePrice"),
+        ("nq", "data.summaryData.PreviousClose.value"),
+    ],
+    "averageVol3Months": [
+        ("qt_symbol", "averageVol3Months"),
+        ("nq", "data.summaryData.AverageVolume.value"),
+    ],
+    "marketCap": [
+        ("qt_symbol", "marketCap"),
+        ("nq", "data.summaryData.MarketCap.value"),
+    ],
+    "outstandingShares": [("qt_symbol", "outstandingShares")],
+    "eps": [("qt_symbol", "eps"), ("nq", "data.summaryData.EarningsPerShare.value")],
+    "pe": [("qt_symbol", "pe"), ("nq", "data.summaryData.PERatio.value")],
+    # QT reports the per-payment dividend, nasdaq.com the annualized one
+    "dividend": [("qt_symbol", "dividend")],
+    "annualizedDividend": [("nq", "data.summaryData.AnnualizedDividend.value")],
+    # date formats and exchange/sector naming differ between sources
+    "exDate": [("qt_symbol", "exDate")],
+    "listingExchange": [("qt_symbol", "listingExchange")],
+    "description": [("qt_symbol", "description")],
+    "securityType": [("qt_symbol", "securityType")],
+    "isQuotable": [("qt_symbol", "isQuotable")],
+    "currency": [("qt_symbol", "currency")],
+    "industrySector": [("qt_symbol", "industrySector")],
+    "industry": [("nq", "data.summaryData.Industry.value")],
+    "oneYrTarget": [("nq", "data.summaryData.OneYrTarget.value")],
+    "forwardPE": [("nq", "data.summaryData.ForwardPE1Yr.value")],
+    "dividendPaymentDate": [("nq", "data.summaryData.DividendPaymentDate.value")],
+    "yield": [("nq", "data.summaryData.Yield.value")],
+    "beta": [("nq", "data.summaryData.Beta.value")],
+}
+
+# canonical type of numeric fields (values of every source are converted to it)
+_NUMERIC_FIELDS = {
+    "bidPrice": float,
+    "bidSize": int,
+    "askPrice": float,
+    "askSize": int,
+    "lastTradePrice": float,
+    "lastTradePriceTrHrs": float,
+    "lastTradeSize": int,
+    "volume": int,
+    "openPrice": float,
+    "highPrice": float,
+    "lowPrice": float,
+    "prevDayClosePrice": float,
+    "averageVol3Months": int,
+    "marketCap": float,
+    "outstandingShares": int,
+    "eps": float,
+    "pe": float,
+    "dividend": float,
+    "annualizedDividend": float,
+    "oneYrTarget": float,
+    "forwardPE": float,
+    "yield": float,
+    "beta": float,
+}
+_MISSING = {"", "N/A", "NA", "--"}
+
+
+def _normalize(field: str, value: object) -> object:
+    """Converts a source value of a field to the field's canonical type
+
+    :param field: logical field name
+    :param value: value as provided by a source
+    :return: converted value, None if missing or unparsable
+    """
+
+    cast = _NUMERIC_FIELDS.get(field)
+    if cast is None or value is None or isinstance(value, bool):
+        return value
+
+    if isinstance(value, str):
+        value = value.strip().replace("$", "").replace(",", "").replace("%", "")
+        if value in _MISSING:
+            return None
+
+    try:
+        return cast(float(value))
+    except (TypeError, ValueError):
+        logger.debug("Unparsable %s value: %r", field, value)
+        return None
+
+
+class FieldPlanner:
+    """A class to organize fetching of fields across QT and nasdaq.com with one call per source per ticker"""
+
+    def __init__(self, qt: QT) -> None:
+        """Constructor method
+
+        :param qt: QT instance used for Questrade calls
+        """
+
+        self.qt = qt
+
+    def plan(
+        self, fields: List[str], currency: Literal["CAD", "USD"]
+    ) -> Dict[str, Dict[str, str]]:
+        """Picks a source for each field, preferring sources that are already required
+
+        :param fields: logical field names (keys of _FIELD_SOURCES)
+        :param currency: currency of tickers (nasdaq.com only covers USD)
+        :raises ValueError: raised when a field is unknown or unavailable for the currency
+        :return: dict of {source: {source field: logical field}}
+        """
+
+        candidates = {}
+        for field in dict.fromkeys(fields):
+            if field not in _FIELD_SOURCES:
+                raise ValueError(f"Unknown field: {field}")
+
+            options = [
+                (src, src_field)
+                for src, src_field in _FIELD_SOURCES[field]
+                if src != "nq" or currency == "USD"
+            ]
+            if not options:
+                raise ValueError(f"No source provides {field} for {currency}")
+            candidates[field] = options
+
+        # fields with a single option force their source, the rest join a chosen
+        # source when possible (free ride) or else the cheapest available one
+        plan = {}
+        for field, options in sorted(candidates.items(), key=lambda x: len(x[1])):
+            chosen = [option for option in options if option[0] in plan]
+            src, src_field = (chosen or sorted(options, key=lambda o: _SOURCE_COSTS[o[0]]))[0]
+            plan.setdefault(src, {})[src_field] = field
+
+        logger.debug("Field plan for %s: %s", fields, plan)
+        return plan
+
+    def fetch(self, handler: object, fields: List[str]) -> Dict[str, object]:
+        """Fetches fields for a single ticker
+
+        :param handler: DataHandler object
+        :param fields: logical field names
+        :raises ValueError: raised when a field is unknown or unavailable for the ticker's currency
+        :return: dict of {field: value}
+        """
+
+        results, errors = self.fetch_batch([handler], fields)
+        if errors:
+            raise ValueError(errors[handler.currency])
+
+        return results[0]
+
+    def fetch_batch(
+        self, handlers: List[object], fields: List[str]
+    ) -> Tuple[List[Dict[str, object]], Dict[str, str]]:
+        """Fetches fields for many tickers, one bulk call per source (and one QID lookup)
+
+        Tickers are grouped by currency; a group whose fields cannot be planned is left
+        unfetched (all None) without affecting the other groups.
+
+        :param handlers: DataHandler objects (or DataHandlerBatch views)
+        :param fields: logical field names
+        :return: tuple of (list of {field: value} dicts aligned with handlers, dict of {currency: error})
+        """
+
+        results = [dict.fromkeys(fields) for _ in handlers]
+        errors = {}
+
+        # currencies can differ in availability of nasdaq.com
+        by_currency = {}
+        for i, handler in enumerate(handlers):
+            by_currency.setdefault(handler.currency, []).append(i)
+
+        for currency, idx in by_currency.items():
+            try:
+                plan = self.plan(fields, currency)
+            except ValueError as e:
+                logger.error("Skipping %d %s tickers: %s", len(idx), currency, e)
+                errors[currency] = str(e)
+                continue
+
+            group = [handlers[i] for i in idx]
+            qids = None
+            if "qt_quote" in plan or "qt_symbol" in plan:
+                qids = self.qt.get_qids(group)
+
+            for src, field_map in plan.items():
+                src_fields = list(field_map)
+                if src == "qt_quote":
+                    values = self.qt.get_mkt_quote_batch(group, src_fields, qids)
+                elif src == "qt_symbol":
+                    values = self.qt.get_symbol_info_batch(group, src_fields, qids)
+                else:
+                    values = get_quote_nq_batch(group, src_fields)
+
+                for i, row in zip(idx, values):
+                    for src_field, value in zip(src_fields, row):
+                        field = field_map[src_field]
+                        results[i][field] = _normalize(field, value)
+
+        return results, errors
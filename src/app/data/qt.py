@@ -4,16 +4,51 @@ qt.py - Contains functions for data extraction from Questrade
 
 from app.utils.db import DB
 from app.config import _EXCHANGES_LITERAL, _YF_EXCHANGE_MAP
+from app.utils.breaker import get_breaker, is_failure_status
+from app.utils import transport
+from app.utils.cassette import get_cassette
+from app.utils.scheduler import get_clock
 
 from typing import List, Literal, Tuple
-import requests
+import os
 import time
-import traceback
 import logging
 import re
 
 logger = logging.getLogger(__name__)
 
+_BATCH_SIZE = 100  # max ids per bulk QT request
+_TOKEN_CHECK_INTERVAL = 300  # seconds a validated access token of unknown age is trusted
+_TOKEN_EXPIRY_MARGIN = 60  # seconds before expiry a refreshed access token is considered stale
+_BREAKER = get_breaker("qt")
+_REPLAY_SERVER = "https://replay/"  # api server while replaying a cassette (host is not keyed)
+
+
+def _is_replaying() -> bool:
+    """Determines whether QT responses are replayed from a cassette (see app.utils.cassette)
+
+    :return: True if replaying
+    """
+
+    cassette = get_cassette()
+    return cassette is not None and cassette.mode == "replay"
+
+
+def _listing_exchange(symbol_info: dict) -> str:
+    """Normalizes QT listingExchange to our exchange names
+
+    :param symbol_info: QT symbol info
+    :return: lowercase exchange name
+    """
+
+    res_exchange = symbol_info["listingExchange"].lower()
+    if res_exchange == "nyseam":
+        res_exchange = "nyse"
+    elif res_exchange == "cnsx":
+        res_exchange = "cse"
+
+    return res_exchange
+
 
 class QT:
     """A class to organize interaction with Questrade's API
@@ -32,31 +67,45 @@ class QT:
         :return: tuple of (access token, refresh token, api server)
         """
 
-        # obtain credentials from DB
-        db = DB()
-        rows = dict(db.get_temp_info(("QT_REFRESH", "QT_ACCESS", "QT_API_SERVER")))
+        # PC_BENCH_QT_SERVER points QT at a local stand-in (benchmarks/replays) - no DB or OAuth
+        offline_server = os.environ.get("PC_BENCH_QT_SERVER")
+        if offline_server:
+            self.access, self.refresh, self.api_server = "offline", None, offline_server
+            self.expires_at = float("inf")
+            return
+
+        # obtain credentials from DB (cassette replays ignore host/credentials - no DB needed)
+        if _is_replaying():
+            rows = {"QT_REFRESH": None, "QT_ACCESS": "replay", "QT_API_SERVER": _REPLAY_SERVER}
+        else:
+            db = DB()
+            rows = dict(db.get_temp_info(("QT_REFRESH", "QT_ACCESS", "QT_API_SERVER")))
+            db.close()
         access_token = rows["QT_ACCESS"]
         api_server = rows["QT_API_SERVER"]
         refresh_token = rows["QT_REFRESH"]
+        expires_at = time.time() + _TOKEN_CHECK_INTERVAL
 
         try:
             # attempt using credentials to get QT time
             headers = {"Authorization": f"Bearer {access_token}"}
             url = "v1/time"
             time.sleep(0.01)
-            res = requests.get(f"{api_server}{url}", headers=headers)
+            res = transport.get("qt.auth", f"{api_server}{url}", headers=headers)
             res = res.json()
             logger.info(f'Valid QT access token - time: {res["time"]}')
         except Exception as e:
             # if invalid, refresh credentials
             logger.error(f"Invalid QT access token - refreshing: {e}")
             access_token, refresh_token, api_server = self.update_tokens(refresh_token)
+            expires_at = self.expires_at
 
         self.access, self.refresh, self.api_server = (
             access_token,
             refresh_token,
             api_server,
         )
+        self.expires_at = expires_at
 
     def update_tokens(self, refresh_token: str) -> Tuple:
         """Obtains new credentials via QT OAuth and upserts new refresh to DB.
@@ -66,35 +115,50 @@ class QT:
         """
 
         # obtain new credentials
-        db = DB()
         url = "https://login.questrade.com/oauth2/token"
         params = {"grant_type": "refresh_token", "refresh_token": refresh_token}
-        res = requests.post(url, params=params)
+        res = transport.post("qt.oauth", url, params=params)
         access_token, refresh_token, api_server = None, None, None
+        self.expires_at = 0
 
         if res.status_code == 200:
             res = res.json()
             access_token = res["access_token"]
             refresh_token = res["refresh_token"]
             api_server = res["api_server"]
-
-            # upsert to DB
-            db.upsert(
-                "_temp",
-                [
-                    ("QT_REFRESH", refresh_token),
-                    ("QT_ACCESS", access_token),
-                    ("QT_API_SERVER", api_server),
-                ],
-            )
+            self.expires_at = time.time() + res.get("expires_in", 1800) - _TOKEN_EXPIRY_MARGIN
+
+            # upsert to DB (replayed tokens must not replace live ones)
+            if not _is_replaying():
+                db = DB()
+                db.upsert(
+                    "_temp",
+                    [
+                        ("QT_REFRESH", refresh_token),
+                        ("QT_ACCESS", access_token),
+                        ("QT_API_SERVER", api_server),
+                    ],
+                )
+                db.close()
             logger.debug("QT API tokens successfully updated!")
         else:
             logger.error(f"QT API token failed to refresh: {res.content}")
 
         # return results
-        db.close()
         return access_token, refresh_token, api_server
 
+    def is_healthy(self) -> bool:
+        """Checks whether credentials can still be used without a network call
+
+        :return: False if credentials are missing or (about to be) expired
+        """
+
+        return (
+            self.access is not None
+            and self.api_server is not None
+            and time.time() < self.expires_at
+        )
+
     def get_req(
         self,
         url: str,
@@ -111,29 +175,45 @@ class QT:
         :return: JSON response from GET request
         """
 
+        # latencies are tracked per endpoint, not per symbol id
+        endpoint = "qt." + re.sub(r"/\d+", "/id", url)
+
         num_retries = 0
         while num_retries < max_retries:
-            if self.api_server is None or self.access is None:
-                self.get_auth()
+            # fail fast while QT is degraded
+            if not _BREAKER.allow():
+                return None
+
+            # every allowed call records exactly one outcome, whatever happens
+            success = False
             try:
+                if self.api_server is None or self.access is None:
+                    self.get_auth()
+
                 headers = {"Authorization": f"Bearer {self.access}"}
-                res = requests.get(
+                res = transport.get(
+                    endpoint,
                     f"{self.api_server}{url}",
                     headers=headers,
                     params=params,
-                    timeout=30,
                 )
 
                 if res.status_code == 200:
-                    return res.json()
+                    data = res.json()
+                    success = True
+                    return data
 
+                success = not is_failure_status(res.status_code)
                 if res.status_code == 429:
                     logger.debug(f"QT RATE LIMIT - wait a sec.")
                     time.sleep(retry_interval)
 
             except Exception as e:
-                logger.error(f"QT API FAILED url:[{url}] params:[{params}]: {e}")
-                logger.error(traceback.format_exc())
+                logger.error(
+                    "QT API FAILED url:[%s] params:[%s]: %s", url, params, e, exc_info=True
+                )
+            finally:
+                _BREAKER.record(success)
 
             num_retries += 1
 
@@ -145,12 +225,13 @@ class QT:
         :return: tuple of (hour, minute)
         """
 
-        ts = self.get_req("v1/time", {})["time"]
-        groups = re.search(r"T(\d*):(\d*)", ts).groups()
-        if len(groups) == 2:
-            return (int(groups[0]), int(groups[1]))
+        # QT time is read from the local clock, calibrated against v1/time once in a while
+        clock = get_clock()
+        if not clock.is_calibrated():
+            clock.calibrate(self)
 
-        return None
+        now = clock.now()
+        return (now.hour, now.minute)
 
     def get_mkt_quote(
         self,
@@ -209,8 +290,9 @@ class QT:
                         return [quote[i] if i in quote else None for i in info]
 
             except Exception as e:
-                logger.error(f"QT quote extraction error for {url}: {e}")
-                logger.error(traceback.format_exc())
+                logger.error(
+                    "QT quote extraction error for %s: %s", url, e, exc_info=True
+                )
 
         return [None] * len(info)
 
@@ -275,12 +357,7 @@ class QT:
                         and symbol_info["securityType"] == "Stock"
                     ):
                         # exchange check
-                        res_exchange = symbol_info["listingExchange"].lower()
-                        if res_exchange == "nyseam":
-                            res_exchange = "nyse"
-                        elif res_exchange == "cnsx":
-                            res_exchange = "cse"
-
+                        res_exchange = _listing_exchange(symbol_info)
                         exchange = handler.exchange.lower()
                         if exchange == res_exchange:
                             return [
@@ -288,11 +365,115 @@ class QT:
                                 for i in info
                             ]
         except Exception as e:
-            logger.error(f"QT symbol info extraction error for {params}: {e}")
-            logger.error(traceback.format_exc())
+            logger.error(
+                "QT symbol info extraction error for %s: %s", params, e, exc_info=True
+            )
 
         return [None] * len(info)
 
+    def get_qids(self, handlers: List[object]) -> dict:
+        """Obtains QT symbol ids for many handlers with a single DB query
+
+        :param handlers: DataHandler objects (or DataHandlerBatch views)
+        :return: dict of {yf_ticker: QT symbol id}
+        """
+
+        db = DB()
+        qids = db.get_qids([handler.tickers["yf"] for handler in handlers])
+        db.close()
+
+        return qids
+
+    def get_mkt_quote_batch(
+        self, handlers: List[object], info: List[str], qids: dict = None
+    ) -> List[List]:
+        """Bulk equivalent of get_mkt_quote - one request per 100 symbols
+
+        :param handlers: DataHandler objects (or DataHandlerBatch views)
+        :param info: list of desired attributes available in QT JSON response
+        :param qids: dict of {yf_ticker: QT symbol id}, defaults to looking up in DB
+        :return: list of value lists matching request, aligned with handlers
+        """
+
+        qids = self.get_qids(handlers) if qids is None else qids
+        ids = list(dict.fromkeys(qids.values()))
+        url = "v1/markets/quotes"
+
+        quotes = {}
+        for i in range(0, len(ids), _BATCH_SIZE):
+            params = {"ids": ",".join(ids[i : i + _BATCH_SIZE])}
+            try:
+                res = self.get_req(url, params)
+                if res:
+                    for quote in res["quotes"]:
+                        quotes[str(quote["symbolId"])] = quote
+            except Exception as e:
+                logger.error(
+                    "QT batch quote extraction error for %s: %s", params, e, exc_info=True
+                )
+
+        results = []
+        for handler in handlers:
+            quote = quotes.get(qids.get(handler.tickers["yf"]))
+            if quote:
+                results.append([quote[i] if i in quote else None for i in info])
+            else:
+                results.append([None] * len(info))
+
+        return results
+
+    def get_symbol_info_batch(
+        self, handlers: List[object], info: List[str], qids: dict = None
+    ) -> List[List]:
+        """Bulk equivalent of get_symbol_info - one request per 100 symbols
+
+        Handlers without a stored QT symbol id fall back to get_symbol_info (name search).
+
+        :param handlers: DataHandler objects (or DataHandlerBatch views)
+        :param info: list of desired attributes available in QT JSON response
+        :param qids: dict of {yf_ticker: QT symbol id}, defaults to looking up in DB
+        :return: list of value lists matching request, aligned with handlers
+        """
+
+        qids = self.get_qids(handlers) if qids is None else qids
+        ids = list(dict.fromkeys(qids.values()))
+        url = "v1/symbols"
+
+        symbols = {}
+        for i in range(0, len(ids), _BATCH_SIZE):
+            params = {"ids": ",".join(ids[i : i + _BATCH_SIZE])}
+            try:
+                res = self.get_req(url, params)
+                if res:
+                    for symbol_info in res["symbols"]:
+                        symbols[str(symbol_info["symbolId"])] = symbol_info
+            except Exception as e:
+                logger.error(
+                    "QT batch symbol info extraction error for %s: %s", params, e, exc_info=True
+                )
+
+        results = []
+        for handler in handlers:
+            qid = qids.get(handler.tickers["yf"])
+            if qid is None:
+                results.append(self.get_symbol_info(handler, info, force_search=True))
+                continue
+
+            symbol_info = symbols.get(qid)
+            if (
+                symbol_info
+                and symbol_info["isQuotable"]
+                and symbol_info["securityType"] == "Stock"
+                and _listing_exchange(symbol_info) == handler.exchange.lower()
+            ):
+                results.append(
+                    [symbol_info[i] if i in symbol_info else None for i in info]
+                )
+            else:
+                results.append([None] * len(info))
+
+        return results
+
     def get_exchange(
         self,
         handler: object,
@@ -320,11 +501,7 @@ class QT:
                 for symbol_info in symbols:
 
                     # exchange check
-                    res_exchange = symbol_info["listingExchange"].lower()
-                    if res_exchange == "nyseam":
-                        res_exchange = "nyse"
-                    elif res_exchange == "cnsx":
-                        res_exchange = "cse"
+                    res_exchange = _listing_exchange(symbol_info)
 
                     if (
                         currency == symbol_info["currency"]
@@ -334,7 +511,6 @@ class QT:
                     ):
                         return [res_exchange]
         except Exception as e:
-            logger.error(f"QT extraction error for {params}: {e}")
-            logger.error(traceback.format_exc())
+            logger.error("QT extraction error for %s: %s", params, e, exc_info=True)
 
         return [None] * len(info)
@@ -0,0 +1,372 @@
+"""
+qt_backfill.py - Contains the CandleBackfill class which bulk-loads historical QT candles
+
+Long ranges are split into windows of at most _MAX_CANDLES candles (QT's per-request cap) which
+are fetched concurrently under per-second and hourly request limits. Each window is written as
+its own zstd Parquet file and recorded in its ticker's checkpoint by its (start, end), so
+interrupted backfills resume where they left off and concurrent backfills of other tickers do not
+overwrite each other's progress. Windows reaching into the present are never checkpointed since
+more candles may still be published for them.
+
+Layout: {root}/interval={interval}/ticker={ticker}/{window start}.parquet
+        {root}/interval={interval}/ticker={ticker}/_checkpoint.json
+"""
+
+from app.data.qt import QT
+from app.utils.tsstore import TSStore, _to_utc
+
+import pyarrow as pa
+import pandas as pd
+from botocore.exceptions import ClientError
+from datetime import datetime, timedelta, timezone
+from collections import deque
+from typing import Dict, List, Literal
+import concurrent.futures
+import json
+import os
+import threading
+import time
+import logging
+
+logger = logging.getLogger(__name__)
+
+_MAX_CANDLES = 2000  # max candles returned by a single v1/markets/candles request
+_RATE_LIMIT = 15  # max candle requests per second (QT allows 20/s for market data)
+_HOURLY_LIMIT = 14000  # max candle requests per hour (QT allows 15000/h for market data)
+
+# approximate length of each QT candle interval
+_INTERVALS = {
+    "OneMinute": timedelta(minutes=1),
+    "TwoMinutes": timedelta(minutes=2),
+    "ThreeMinutes": timedelta(minutes=3),
+    "FourMinutes": timedelta(minutes=4),
+    "FiveMinutes": timedelta(minutes=5),
+    "TenMinutes": timedelta(minutes=10),
+    "FifteenMinutes": timedelta(minutes=15),
+    "TwentyMinutes": timedelta(minutes=20),
+    "HalfHour": timedelta(minutes=30),
+    "OneHour": timedelta(hours=1),
+    "TwoHours": timedelta(hours=2),
+    "FourHours": timedelta(hours=4),
+    "OneDay": timedelta(days=1),
+    "OneWeek": timedelta(weeks=1),
+    "OneMonth": timedelta(days=28),
+    "OneYear": timedelta(days=365),
+}
+_SCHEMA = pa.schema(
+    [
+        ("ts", pa.timestamp("ns", "UTC")),
+        ("open", pa.float64()),
+        ("high", pa.float64()),
+        ("low", pa.float64()),
+        ("close", pa.float64()),
+        ("volume", pa.float64()),
+        ("vwap", pa.float64()),
+    ]
+)
+
+
+class _RateLimiter:
+    """Spaces out requests shared by all worker threads, also keeping within an hourly budget"""
+
+    def __init__(self, rate: float, hourly_limit: int = _HOURLY_LIMIT) -> None:
+        self.interval = 1 / rate
+        self.next_ts = 0
+        self.sent = deque(maxlen=hourly_limit)  # monotonic times of the most recent requests
+        self.lock = threading.Lock()
+
+    def wait(self) -> None:
+        with self.lock:
+            now = time.monotonic()
+            ts = max(now, self.next_ts)
+            # hourly budget spent - wait for the oldest request of the last hour to age out
+            if len(self.sent) == self.sent.maxlen:
+                ts = max(ts, self.sent[0] + 3600)
+            self.sent.append(ts)
+            self.next_ts = ts + self.interval
+
+        if ts > now:
+            time.sleep(ts - now)
+
+
+class CandleBackfill:
+    """A class to organize resumable, concurrent backfills of QT candles"""
+
+    def __init__(
+        self,
+        qt: QT,
+        backend: Literal["s3", "local"] = "s3",
+        root: str = None,
+        max_workers: int = 8,
+        rate_limit: float = _RATE_LIMIT,
+        hourly_limit: int = _HOURLY_LIMIT,
+    ) -> None:
+        """Constructor method
+
+        :param qt: QT instance
+        :param backend: where candle files/checkpoints are stored, defaults to "s3"
+        :param root: S3 key prefix or local directory, defaults to CANDLE_STORE_ROOT env var
+        :param max_workers: number of windows fetched concurrently, defaults to 8
+        :param rate_limit: max requests per second, defaults to 15
+        :param hourly_limit: max requests per hour, defaults to 14000
+        """
+
+        self.qt = qt
+        default_root = "candles" if backend == "s3" else "/tmp/candles"
+        self.store = TSStore(
+            backend, root or os.environ.get("CANDLE_STORE_ROOT", default_root)
+        )
+        self.max_workers = max_workers
+        self.limiter = _RateLimiter(rate_limit, hourly_limit)
+        self.lock = threading.Lock()
+
+    def windows(self, start: datetime, end: datetime, interval: str) -> List[tuple]:
+        """Splits a time range into request-sized windows
+
+        :param start: start of range
+        :param end: end of range (exclusive)
+        :param interval: QT candle interval (e.g. "OneDay")
+        :return: list of (window start, window end) in UTC
+        """
+
+        start, end = _to_utc(start), _to_utc(end)
+        step = _INTERVALS[interval] * _MAX_CANDLES
+        windows = []
+        while start < end:
+            windows.append((start, min(start + step, end)))
+            start += step
+
+        return windows
+
+    def run(
+        self,
+        qids: Dict[str, str],
+        start: datetime,
+        end: datetime,
+        interval: str = "OneDay",
+    ) -> dict:
+        """Backfills candles of tickers, skipping windows completed by earlier runs
+
+        :param qids: dict of {ticker: QT symbol id}
+        :param start: start of range
+        :param end: end of range (exclusive)
+        :param interval: QT candle interval, defaults to "OneDay"
+        :return: dict of counts of windows fetched/skipped/failed and candles written
+        """
+
+        checkpoints = {ticker: self.load_checkpoint(interval, ticker) for ticker in qids}
+        done = {ticker: set(keys) for ticker, keys in checkpoints.items()}
+        dirty = set()  # tickers with windows completed since their checkpoint was saved
+        windows = self.windows(start, end, interval)
+        tasks = [
+            (ticker, qid, w_start, w_end)
+            for ticker, qid in qids.items()
+            for w_start, w_end in windows
+            if _window_key(w_start, w_end) not in done.get(ticker, ())
+        ]
+        stats = {
+            "windows": len(tasks),
+            "skipped": len(qids) * len(windows) - len(tasks),
+            "failed": 0,
+            "candles": 0,
+        }
+        logger.info(
+            "Backfilling %s candles: %s windows (%s already done).",
+            interval,
+            stats["windows"],
+            stats["skipped"],
+        )
+
+        now = datetime.now(timezone.utc)
+
+        def fetch_window(task: tuple) -> int:
+            ticker, qid, w_start, w_end = task
+            num_candles = self.fetch_window(ticker, qid, w_start, w_end, interval)
+
+            # windows whose last candle may still be forming are refetched by the next run
+            if w_end + _INTERVALS[interval] <= now:
+                with self.lock:
+                    checkpoints[ticker].append(_window_key(w_start, w_end))
+                    dirty.add(ticker)
+            return num_candles
+
+        def save_checkpoints() -> None:
+            with self.lock:
+                tickers = list(dirty)
+                dirty.clear()
+            for ticker in tickers:
+                self.save_checkpoint(interval, ticker, checkpoints[ticker])
+
+        completed = 0
+        with concurrent.futures.ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            futures = {executor.submit(fetch_window, task): task for task in tasks}
+            for future in concurrent.futures.as_completed(futures):
+                try:
+                    stats["candles"] += future.result()
+                    completed += 1
+                except Exception as e:
+                    stats["failed"] += 1
+                    logger.error(
+                        "Candle backfill failed for %s: %s", futures[future][:3], e, exc_info=True
+                    )
+                    continue
+
+                # checkpoint regularly so interrupted runs lose little work
+                if completed % 50 == 0:
+                    save_checkpoints()
+
+        save_checkpoints()
+        logger.info("Candle backfill complete: %s", stats)
+        return stats
+
+    def fetch_window(
+        self, ticker: str, qid: str, start: datetime, end: datetime, interval: str
+    ) -> int:
+        """Fetches and stores the candles of a single window
+
+        :param ticker: ticker of symbol
+        :param qid: QT symbol id
+        :param start: start of window
+        :param end: end of window
+        :param interval: QT candle interval
+        :raises RuntimeError: raised when QT returns no response
+        :raises IOError: raised when the candles could not be written
+        :return: number of candles written
+        """
+
+        self.limiter.wait()
+        params = {
+            "startTime": start.isoformat(),
+            "endTime": end.isoformat(),
+            "interval": interval,
+        }
+        res = self.qt.get_req(f"v1/markets/candles/{qid}", params)
+        if res is None:
+            raise RuntimeError(f"No QT response for candles of {ticker} {params}")
+
+        candles = res.get("candles", [])
+        if candles:
+            table = pa.Table.from_pydict(
+                {
+                    "ts": pd.to_datetime([c["start"] for c in candles], utc=True),
+                    "open": [c["open"] for c in candles],
+                    "high": [c["high"] for c in candles],
+                    "low": [c["low"] for c in candles],
+                    "close": [c["close"] for c in candles],
+                    "volume": [c["volume"] for c in candles],
+                    "vwap": [c.get("VWAP") for c in candles],
+                },
+                schema=_SCHEMA,
+            )
+            self.store.write_table(table.sort_by("ts"), self._path(ticker, interval, start))
+
+        return len(candles)
+
+    def read(self, ticker: str, interval: str = "OneDay") -> pd.DataFrame:
+        """Reads all backfilled candles of a ticker
+
+        :param ticker: ticker of symbol
+        :param interval: QT candle interval, defaults to "OneDay"
+        :return: dataframe of candles sorted by ts
+        """
+
+        prefix = f"{self.store.root}/interval={interval}/ticker={ticker}/"
+        tables = [self.store.read_table(path) for path in self.store.list_files(prefix)]
+        if not tables:
+            return _SCHEMA.empty_table().to_pandas()
+
+        df = pa.concat_tables(tables).to_pandas()
+        return df.drop_duplicates("ts").sort_values("ts").reset_index(drop=True)
+
+    def load_checkpoint(self, interval: str, ticker: str) -> List[str]:
+        """Loads completed windows of a ticker
+
+        :param interval: QT candle interval
+        :param ticker: ticker of symbol
+        :return: list of completed window keys
+        """
+
+        path = self._checkpoint_path(interval, ticker)
+        try:
+            if self.store.backend == "s3":
+                try:
+                    s3_res = self.store.s3.op_client("get_object").get_object(
+                        Bucket=os.environ.get("BUCKET_NAME"), Key=path
+                    )
+                    return json.loads(s3_res["Body"].read())
+                except ClientError as e:
+                    if e.response["Error"]["Code"] in ("NoSuchKey", "404"):
+                        return []
+                    raise e
+
+            if os.path.exists(path):
+                with open(path, "r") as f:
+                    return json.load(f)
+        except Exception as e:
+            logger.error(
+                "Candle checkpoint %s could not be loaded - starting over: %s",
+                path,
+                e,
+                exc_info=True,
+            )
+
+        return []
+
+    def save_checkpoint(self, interval: str, ticker: str, keys: List[str]) -> None:
+        """Persists completed windows of a ticker
+
+        :param interval: QT candle interval
+        :param ticker: ticker of symbol
+        :param keys: completed window keys
+        """
+
+        path = self._checkpoint_path(interval, ticker)
+        with self.lock:
+            data = json.dumps(keys, separators=(",", ":"))
+
+        if self.store.backend == "s3":
+            self.store.s3.op_client("upload_file").put_object(
+                Bucket=os.environ.get("BUCKET_NAME"), Key=path, Body=data.encode()
+            )
+            return
+
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, "w") as f:
+            f.write(data)
+        os.replace(tmp_path, path)
+
+    def _path(self, ticker: str, interval: str, start: datetime) -> str:
+        """Builds path/key of a window's file
+
+        :param ticker: ticker of symbol
+        :param interval: QT candle interval
+        :param start: start of window
+        :return: path/key
+        """
+
+        return (
+            f"{self.store.root}/interval={interval}/ticker={ticker}/"
+            f"{start.strftime('%Y%m%dT%H%M%S')}.parquet"
+        )
+
+    def _checkpoint_path(self, interval: str, ticker: str) -> str:
+        """Builds path/key of a ticker's checkpoint
+
+        :param interval: QT candle interval
+        :param ticker: ticker of symbol
+        :return: path/key
+        """
+
+        return f"{self.store.root}/interval={interval}/ticker={ticker}/_checkpoint.json"
+
+
+def _window_key(start: datetime, end: datetime) -> str:
+    """Builds checkpoint key of a window
+
+    :param start: start of window
+    :param end: end of window
+    :return: key in {start}/{end} ISO format
+    """
+
+    return f"{start.isoformat()}/{end.isoformat()}"
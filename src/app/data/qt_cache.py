@@ -0,0 +1,229 @@
+"""
+qt_cache.py - Contains the SymbolInfoCache class which caches QT symbol info per field based on how often each field changes
+"""
+
+from app.data.qt import QT
+from app.utils.db import DB
+from app.utils.scheduler import get_clock
+
+from datetime import datetime
+from typing import List, Literal
+import json
+import os
+import threading
+import time
+import logging
+
+logger = logging.getLogger(__name__)
+
+# TTL class of each v1/symbols field (unlisted fields are intraday)
+_FIELD_CLASSES = {
+    "symbol": "static",
+    "symbolId": "static",
+    "description": "static",
+    "securityType": "static",
+    "listingExchange": "static",
+    "currency": "static",
+    "industrySector": "static",
+    "prevDayClosePrice": "daily",
+    "averageVol3Months": "daily",
+    "outstandingShares": "daily",
+    "eps": "daily",
+    "pe": "daily",
+    "dividend": "daily",
+    "exDate": "daily",
+    "marketCap": "daily",
+    "isQuotable": "daily",
+}
+_STATIC_TTL = 30 * 24 * 60 * 60
+_INTRADAY_TTL = 60
+_DB_KEY = "QT_SYMBOL_CACHE"
+
+
+class SymbolInfoCache:
+    """A class to organize per-field caching of QT symbol info in front of QT.get_symbol_info
+
+    static fields expire after 30 days, daily fields when the exchange date changes and intraday
+    fields after a minute. attach() routes a QT instance's get_symbol_info through the cache.
+    save() only writes after fetches and merges with the stored copy, so concurrent containers
+    sharing the "db" backend keep each other's symbols.
+    """
+
+    def __init__(
+        self,
+        qt: QT,
+        backend: Literal["file", "db"] = "file",
+        path: str = "/tmp/qt_symbol_cache.json",
+    ) -> None:
+        """Constructor method
+
+        :param qt: QT instance used on cache misses
+        :param backend: where the cache is persisted between runs, defaults to "file"
+        :param path: file path used by the file backend, defaults to "/tmp/qt_symbol_cache.json"
+        """
+
+        self.qt = qt
+        self.fetch = qt.get_symbol_info
+        self.backend = backend
+        self.path = path
+        self.lock = threading.Lock()
+        self.entries = {}  # {"ticker|exchange": {field: [value, fetched epoch]}}
+        self.dirty = False  # entries fetched since last load/save
+        self.load()
+
+    def attach(self, qt: QT) -> None:
+        """Serves get_symbol_info of a QT instance from the cache (e.g. after QT was rebuilt)
+
+        :param qt: QT instance
+        """
+
+        if getattr(qt.get_symbol_info, "__self__", None) is self:
+            return
+
+        with self.lock:
+            self.qt, self.fetch = qt, qt.get_symbol_info
+        qt.get_symbol_info = self.get_symbol_info
+
+    def is_fresh(self, field: str, fetched: float, now: float) -> bool:
+        """Determines whether a cached field value is still valid
+
+        :param field: name of field
+        :param fetched: epoch time the value was fetched
+        :param now: current epoch time
+        :return: whether the value can be served from cache
+        """
+
+        ttl_class = _FIELD_CLASSES.get(field, "intraday")
+        if ttl_class == "static":
+            return now - fetched < _STATIC_TTL
+        elif ttl_class == "daily":
+            # days roll over at midnight exchange time, not in the container's timezone
+            tz = get_clock().tz
+            return (
+                datetime.fromtimestamp(fetched, tz).date()
+                == datetime.fromtimestamp(now, tz).date()
+            )
+
+        return now - fetched < _INTRADAY_TTL
+
+    def get_symbol_info(
+        self, handler: object, info: List[str], force_search: bool = False
+    ) -> List:
+        """Drop-in replacement for QT.get_symbol_info which only hits v1/symbols when a requested field expired
+
+        On a miss every field is refreshed, since v1/symbols returns them all in one response.
+
+        :param handler: DataHandler object
+        :param info: list of desired attributes available in QT JSON response
+        :param force_search: passed through to QT.get_symbol_info, defaults to False
+        :return: list of values matching request
+        """
+
+        key = f"{handler.tickers['yf']}|{handler.exchange.lower()}"
+        now = time.time()
+
+        with self.lock:
+            entry = self.entries.get(key, {})
+            if all(
+                field in entry and self.is_fresh(field, entry[field][1], now)
+                for field in info
+            ):
+                return [entry[field][0] for field in info]
+
+        fields = list(dict.fromkeys(list(_FIELD_CLASSES) + list(info)))
+        values = self.fetch(handler, fields, force_search)
+        if all(value is None for value in values):
+            return [None] * len(info)
+
+        result = dict(zip(fields, values))
+        with self.lock:
+            self.entries[key] = {field: [value, now] for field, value in result.items()}
+            self.dirty = True
+
+        return [result[field] for field in info]
+
+    def load(self) -> None:
+        """Loads persisted cache entries"""
+
+        try:
+            entries = self._read()
+            if entries:
+                with self.lock:
+                    self.entries = entries
+                logger.info("Loaded QT symbol cache with %s symbols.", len(entries))
+        except Exception as e:
+            logger.error(
+                "QT symbol cache could not be loaded - starting empty: %s", e, exc_info=True
+            )
+
+    def save(self) -> None:
+        """Persists cache entries merged with the stored copy, dropping intraday values and expired
+        entries (skipped if nothing was fetched since the last load/save)
+        """
+
+        with self.lock:
+            if not self.dirty:
+                return
+            self.dirty = False
+
+        try:
+            stored = self._read()
+        except Exception as e:
+            logger.error("QT symbol cache could not be read before saving: %s", e, exc_info=True)
+            stored = {}
+
+        now = time.time()
+        with self.lock:
+            # newest value of each field wins
+            for key, stored_entry in stored.items():
+                entry = self.entries.setdefault(key, {})
+                for field, value in stored_entry.items():
+                    if field not in entry or entry[field][1] < value[1]:
+                        entry[field] = value
+
+            entries = {}
+            for key, entry in self.entries.items():
+                kept = {
+                    field: value
+                    for field, value in entry.items()
+                    if _FIELD_CLASSES.get(field, "intraday") != "intraday"
+                    and self.is_fresh(field, value[1], now)
+                }
+                if kept:
+                    entries[key] = kept
+            data = json.dumps(entries, separators=(",", ":"), default=str)
+
+        try:
+            if self.backend == "db":
+                db = DB()
+                db.upsert("_temp", [(_DB_KEY, data)])
+                db.close()
+            else:
+                tmp_path = f"{self.path}.tmp"
+                with open(tmp_path, "w") as f:
+                    f.write(data)
+                os.replace(tmp_path, self.path)
+            logger.info("Saved QT symbol cache with %s symbols.", len(entries))
+        except Exception as e:
+            with self.lock:
+                self.dirty = True
+            logger.error("QT symbol cache could not be saved: %s", e, exc_info=True)
+
+    def _read(self) -> dict:
+        """Reads persisted cache entries from the backend
+
+        :return: dict of entries, empty if nothing was persisted
+        """
+
+        if self.backend == "db":
+            db = DB()
+            rows = dict(db.get_temp_info((_DB_KEY,)))
+            db.close()
+            data = rows.get(_DB_KEY)
+        elif os.path.exists(self.path):
+            with open(self.path, "r") as f:
+                data = f.read()
+        else:
+            data = None
+
+        return json.loads(data) if data else {}
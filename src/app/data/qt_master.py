@@ -0,0 +1,369 @@
+"""
+qt_master.py - Contains the SymbolMaster class which keeps a local directory of QT symbols
+
+The directory is harvested in bulk from v1/symbols/search and stored as sorted columns
+(symbol, symbolId, listingExchange, currency, securityType, isQuotable), so prefix searches,
+QID resolution and exchange checks are answered locally by binary search instead of a
+round trip per symbol. Refreshed by the "symbols" script (scheduled daily).
+"""
+
+from app.data.qt import QT, _listing_exchange
+from app.config import _EXCHANGES_LITERAL, _YF_EXCHANGE_MAP
+from app.utils.aws import AWSClient
+
+from bisect import bisect_left
+from botocore.exceptions import ClientError
+from typing import Dict, List, Literal
+import numpy as np
+import concurrent.futures
+import gzip
+import json
+import os
+import string
+import threading
+import time
+import logging
+
+logger = logging.getLogger(__name__)
+
+_HARVEST_PREFIXES = list(string.ascii_uppercase + string.digits)
+_MAX_PAGES = 500  # safety cap on search pages per prefix
+_REFRESH_INTERVAL = 24 * 60 * 60
+_CODED_FIELDS = ("listingExchange", "currency", "securityType")  # low-cardinality strings
+
+
+class SymbolMaster:
+    """A class to organize a local, prefix-indexed directory of QT symbols"""
+
+    def __init__(
+        self,
+        qt: QT = None,
+        backend: Literal["s3", "local"] = "s3",
+        path: str = None,
+    ) -> None:
+        """Constructor method
+
+        :param qt: QT instance used for harvesting and lookup fallbacks, defaults to None
+        :param backend: where the directory is persisted, defaults to "s3"
+        :param path: S3 key or local file path, defaults to QT_SYMBOL_MASTER_PATH env var
+        """
+
+        self.qt = qt
+        self.backend = backend
+        default_path = (
+            "qt/symbol_master.json.gz"
+            if backend == "s3"
+            else "/tmp/qt_symbol_master.json.gz"
+        )
+        self.path = path or os.environ.get("QT_SYMBOL_MASTER_PATH", default_path)
+        self.s3 = AWSClient("s3") if backend == "s3" else None
+        self.lock = threading.Lock()
+        self.harvested_at = 0
+        self._build({})
+
+    def __len__(self) -> int:
+        return len(self.symbols)
+
+    def search(self, prefix: str, limit: int = None) -> List[dict]:
+        """Finds symbols starting with a prefix (exact match first, then alphabetical)
+
+        :param prefix: starting characters of symbol
+        :param limit: max number of results, defaults to None (all)
+        :return: list of symbol info dicts
+        """
+
+        prefix = prefix.upper()
+        with self.lock:
+            start = bisect_left(self.symbols, prefix)
+            end = bisect_left(self.symbols, prefix + "\uffff", lo=start)
+            if limit is not None:
+                end = min(end, start + limit)
+            return [self._record(i) for i in range(start, end)]
+
+    def get(self, symbol: str) -> List[dict]:
+        """Finds every listing of an exact symbol
+
+        :param symbol: QT symbol
+        :return: list of symbol info dicts (empty if unknown)
+        """
+
+        symbol = symbol.upper()
+        return [r for r in self.search(symbol) if r["symbol"] == symbol]
+
+    def get_qids(
+        self, symbols: List[str], exchanges: List[str], currencies: List[str]
+    ) -> Dict[str, str]:
+        """Resolves QT symbol ids of symbols on their exchange (cross-listed symbols share names)
+
+        :param symbols: QT symbols
+        :param exchanges: exchange of each symbol (e.g. "nasdaq")
+        :param currencies: currency of each symbol
+        :return: dict of {symbol: QT symbol id} (symbols without a matching listing are omitted)
+        """
+
+        qids = {}
+        for symbol, exchange, currency in zip(symbols, exchanges, currencies):
+            for listing in self.get(symbol):
+                if (
+                    _listing_exchange(listing) == exchange.lower()
+                    and listing["currency"] == currency
+                ):
+                    qids[symbol] = str(listing["symbolId"])
+                    break
+
+        return qids
+
+    def get_exchange(
+        self,
+        handler: object,
+        info: List[Literal["listingExchange"]],
+        prefix: str,
+        currency: Literal["CAD", "USD"],
+        fallback: bool = True,
+    ) -> List[_EXCHANGES_LITERAL]:
+        """Local equivalent of QT.get_exchange
+
+        :param handler: unused - provided to allow for use in DataHandler
+        :param info: hardcode to single item - ["listingExchange"]
+        :param prefix: starting characters in ticker search query
+        :param currency: currency ticker is associated with
+        :param fallback: set to False to skip QT.get_exchange when nothing matches locally, defaults to True
+        :return: single item array - [exchange]
+        """
+
+        for symbol_info in self.search(prefix):
+            res_exchange = _listing_exchange(symbol_info)
+            if (
+                currency == symbol_info["currency"]
+                and symbol_info["isQuotable"]
+                and symbol_info["securityType"] == "Stock"
+                and res_exchange in _YF_EXCHANGE_MAP.keys()
+            ):
+                return [res_exchange]
+
+        if fallback and self.qt is not None:
+            return self.qt.get_exchange(handler, info, prefix, currency)
+
+        return [None] * len(info)
+
+    def add(self, symbol_infos: List[dict]) -> None:
+        """Merges QT symbol info records (e.g. from search or v1/symbols) into the directory
+
+        :param symbol_infos: list of QT symbol info dicts
+        """
+
+        with self.lock:
+            records = {
+                r["symbolId"]: r for r in map(self._record, range(len(self.symbols)))
+            }
+        for symbol_info in symbol_infos:
+            records[symbol_info["symbolId"]] = symbol_info
+        self._build(records)
+
+    def harvest(self, prefixes: List[str] = None, max_workers: int = 8) -> int:
+        """Rebuilds the directory from QT symbol search results
+
+        If any prefix fails, symbols of that prefix are kept from the current directory and
+        harvested_at is left unchanged so the next refresh retries.
+
+        :param prefixes: search prefixes to page through, defaults to A-Z and 0-9
+        :param max_workers: number of prefixes searched concurrently, defaults to 8
+        :return: number of symbols harvested
+        """
+
+        records = {}
+        records_lock = threading.Lock()
+
+        def harvest_prefix(prefix: str) -> None:
+            offset = 0
+            for _ in range(_MAX_PAGES):
+                params = {"prefix": prefix, "offset": offset}
+                res = self.qt.get_req("v1/symbols/search", params)
+                if res is None:
+                    raise ConnectionError(f"QT symbol search failed for {params}")
+
+                # pages may repeat symbols found by other prefixes - only an empty page ends
+                symbols = res["symbols"]
+                if not symbols:
+                    return
+                with records_lock:
+                    records.update((s["symbolId"], s) for s in symbols)
+                offset += len(symbols)
+
+        prefixes = prefixes or _HARVEST_PREFIXES
+        failed = []
+        with concurrent.futures.ThreadPoolExecutor(max_workers=max_workers) as executor:
+            futures = {executor.submit(harvest_prefix, prefix): prefix for prefix in prefixes}
+            for future in concurrent.futures.as_completed(futures):
+                try:
+                    future.result()
+                except Exception as e:
+                    failed.append(futures[future])
+                    logger.error("QT symbol harvest error: %s", e, exc_info=True)
+
+        if failed:
+            # keep what we had for failed prefixes rather than dropping them from the directory
+            logger.error("QT symbol harvest failed for prefixes %s - merging.", sorted(failed))
+            with self.lock:
+                kept = [
+                    self._record(i)
+                    for i, symbol in enumerate(self.symbols)
+                    if symbol.startswith(tuple(failed))
+                ]
+            records.update((r["symbolId"], r) for r in kept if r["symbolId"] not in records)
+
+        if records:
+            self._build(records)
+            if not failed:
+                self.harvested_at = time.time()
+        logger.info("Harvested %s QT symbols from %s prefixes.", len(records), len(prefixes))
+
+        return len(records)
+
+    def maybe_refresh(self, max_age: float = _REFRESH_INTERVAL) -> bool:
+        """Re-harvests and saves the directory if it is older than max_age
+
+        :param max_age: max seconds since last harvest, defaults to 1 day
+        :return: whether the directory was refreshed
+        """
+
+        if time.time() - self.harvested_at < max_age:
+            return False
+
+        if self.harvest():
+            self.save()
+            return True
+
+        return False
+
+    def load(self) -> None:
+        """Loads persisted directory"""
+
+        try:
+            data = self._read()
+            if data is None:
+                return
+
+            doc = json.loads(gzip.decompress(data))
+            codes = {
+                field: [doc["vocab"][field][c] for c in doc[field]] for field in _CODED_FIELDS
+            }
+            records = {
+                qid: {
+                    "symbol": symbol,
+                    "symbolId": qid,
+                    "isQuotable": bool(quotable),
+                    **{field: codes[field][i] for field in _CODED_FIELDS},
+                }
+                for i, (symbol, qid, quotable) in enumerate(
+                    zip(doc["symbol"], doc["symbolId"], doc["isQuotable"])
+                )
+            }
+            self._build(records)
+            self.harvested_at = doc["harvested_at"]
+            logger.info("Loaded QT symbol master with %s symbols.", len(records))
+        except Exception as e:
+            logger.error(
+                "QT symbol master could not be loaded - starting empty: %s", e, exc_info=True
+            )
+
+    def save(self) -> None:
+        """Persists directory"""
+
+        with self.lock:
+            doc = {
+                "harvested_at": self.harvested_at,
+                "symbol": list(self.symbols),
+                "symbolId": self.ids.tolist(),
+                "isQuotable": self.quotable.astype(np.uint8).tolist(),
+            }
+            for field in _CODED_FIELDS:
+                doc[field] = self.codes[field].tolist()
+            doc["vocab"] = {field: list(self.vocab[field]) for field in _CODED_FIELDS}
+
+        data = gzip.compress(json.dumps(doc, separators=(",", ":")).encode())
+        try:
+            self._write(data)
+            logger.info(
+                f"Saved QT symbol master with {len(doc['symbol'])} symbols ({len(data)} bytes)."
+            )
+        except Exception as e:
+            logger.error("QT symbol master could not be saved: %s", e, exc_info=True)
+
+    def _build(self, records: Dict[int, dict]) -> None:
+        """Replaces directory with sorted columns built from records
+
+        :param records: dict of {symbolId: symbol info}
+        """
+
+        ordered = sorted(records.values(), key=lambda r: (r["symbol"].upper(), r["symbolId"]))
+        vocab = {field: sorted({str(r[field]) for r in ordered}) for field in _CODED_FIELDS}
+        lookup = {field: {v: i for i, v in enumerate(vocab[field])} for field in _CODED_FIELDS}
+
+        symbols = [r["symbol"].upper() for r in ordered]
+        ids = np.array([r["symbolId"] for r in ordered], dtype=np.int64)
+        quotable = np.array([bool(r["isQuotable"]) for r in ordered], dtype=bool)
+        codes = {
+            field: np.array([lookup[field][str(r[field])] for r in ordered], dtype=np.uint16)
+            for field in _CODED_FIELDS
+        }
+
+        with self.lock:
+            self.symbols, self.ids, self.quotable = symbols, ids, quotable
+            self.codes, self.vocab = codes, vocab
+
+    def _record(self, i: int) -> dict:
+        """Builds symbol info dict at a position (lock must be held)
+
+        :param i: position in directory
+        :return: symbol info dict
+        """
+
+        record = {
+            "symbol": self.symbols[i],
+            "symbolId": int(self.ids[i]),
+            "isQuotable": bool(self.quotable[i]),
+        }
+        for field in _CODED_FIELDS:
+            record[field] = self.vocab[field][self.codes[field][i]]
+
+        return record
+
+    def _read(self) -> bytes:
+        """Reads persisted directory bytes from the backend
+
+        :return: bytes, None if missing
+        """
+
+        if self.backend == "s3":
+            try:
+                s3_res = self.s3.op_client("get_object").get_object(
+                    Bucket=os.environ.get("BUCKET_NAME"), Key=self.path
+                )
+                return s3_res["Body"].read()
+            except ClientError as e:
+                if e.response["Error"]["Code"] in ("NoSuchKey", "404"):
+                    return None
+                raise e
+
+        if not os.path.exists(self.path):
+            return None
+        with open(self.path, "rb") as f:
+            return f.read()
+
+    def _write(self, data: bytes) -> None:
+        """Writes directory bytes to the backend
+
+        :param data: bytes to persist
+        """
+
+        if self.backend == "s3":
+            self.s3.op_client("upload_file").put_object(
+                Bucket=os.environ.get("BUCKET_NAME"), Key=self.path, Body=data
+            )
+            return
+
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, "wb") as f:
+            f.write(data)
+        os.replace(tmp_path, self.path)
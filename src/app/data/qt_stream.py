@@ -0,0 +1,243 @@
+"""
+qt_stream.py - Contains the QTStream class which maintains live quotes via Questrade's streaming port
+https://www.questrade.com/api/documentation/streaming
+"""
+
+from app.data.qt import QT
+
+from typing import Dict, List, Literal
+import websocket
+import json
+import threading
+import time
+import logging
+
+logger = logging.getLogger(__name__)
+
+_CHUNK_SIZE = 100  # max ids per streaming subscription
+_RECV_TIMEOUT = 5  # seconds between checks for token refresh/stop requests
+_MAX_BACKOFF = 30
+# seconds without any frame (quote or pong) after which a subscription is considered dead -
+# quotes are only pushed on change, so the age of a quote says nothing about its freshness
+_HEARTBEAT_TIMEOUT = 3 * _RECV_TIMEOUT
+
+
+class QTStream:
+    """A class to organize streaming of level 1 quotes from Questrade into an in-memory latest-quote table"""
+
+    def __init__(
+        self,
+        qt: QT,
+        qids: Dict[str, str],
+        chunk_size: int = _CHUNK_SIZE,
+        heartbeat_timeout: float = _HEARTBEAT_TIMEOUT,
+    ) -> None:
+        """Constructor method
+
+        :param qt: authenticated QT instance (used for stream port requests and token refreshes)
+        :param qids: dict of {yf_ticker: QT symbol id} to subscribe to
+        :param chunk_size: max number of ids per subscription, defaults to 100
+        :param heartbeat_timeout: seconds without frames after which a subscription is dead,
+            defaults to 15
+        """
+
+        self.qt = qt
+        self.qids = {ticker: str(qid) for ticker, qid in qids.items() if qid}
+        self.chunk_size = chunk_size
+        self.heartbeat_timeout = heartbeat_timeout
+
+        self.quotes = {}  # {symbolId: latest quote}
+        self.chunks = {}  # {symbolId: index of chunk subscribing to it}
+        self.heartbeats = {}  # {chunk index: monotonic time of last frame} for live subscriptions
+        self.lock = threading.Lock()
+        self.auth_lock = threading.Lock()
+        self.stop_event = threading.Event()
+        self.threads = []
+
+    def start(self) -> None:
+        """Subscribes to all ids, one background thread per chunk"""
+
+        ids = list(dict.fromkeys(self.qids.values()))
+        for n, i in enumerate(range(0, len(ids), self.chunk_size)):
+            chunk = ids[i : i + self.chunk_size]
+            self.chunks.update((qid, n) for qid in chunk)
+            thread = threading.Thread(
+                target=self._run_chunk, args=(n, chunk), daemon=True
+            )
+            thread.start()
+            self.threads.append(thread)
+
+        logger.info("QT stream started for %s ids in %s chunks.", len(ids), len(self.threads))
+
+    def stop(self) -> None:
+        """Closes all subscriptions"""
+
+        self.stop_event.set()
+        for thread in self.threads:
+            thread.join(timeout=_RECV_TIMEOUT * 2)
+        self.threads = []
+        logger.info("QT stream stopped.")
+
+    def get_quote(self, qid: str) -> dict:
+        """Obtains latest streamed quote for a symbol id
+
+        :param qid: QT symbol id
+        :return: latest quote, None if none received yet or its subscription is down/silent
+        """
+
+        qid = str(qid)
+        with self.lock:
+            heartbeat = self.heartbeats.get(self.chunks.get(qid))
+            if heartbeat is None or time.monotonic() - heartbeat > self.heartbeat_timeout:
+                return None
+            return self.quotes.get(qid)
+
+    def get_mkt_quote(
+        self,
+        handler: object,
+        info: List[
+            Literal[
+                "symbol",
+                "symbolId",
+                "tier",
+                "bidPrice",
+                "bidSize",
+                "askPrice",
+                "askSize",
+                "lastTradePriceTrHrs",
+                "lastTradePrice",
+                "lastTradeSize",
+                "lastTradeTick",
+                "lastTradeTime",
+                "volume",
+                "openPrice",
+                "highPrice",
+                "lowPrice",
+                "delay",
+                "isHalted",
+            ]
+        ],
+    ) -> List:
+        """Drop-in replacement for QT.get_mkt_quote served from the streamed quote table
+
+        Falls back to polling QT if no quote has been streamed for the symbol yet or its
+        subscription is reconnecting/silent. Quotes of live subscriptions are served however old
+        they are, since QT only pushes changes.
+
+        :param handler: DataHandler object
+        :param info: list of desired attributes available in QT JSON response
+        :return: list of values matching request
+        """
+
+        qid = self.qids.get(handler.tickers["yf"])
+        quote = self.get_quote(qid) if qid else None
+        if quote is None:
+            return self.qt.get_mkt_quote(handler, info)
+
+        return [quote[i] if i in quote else None for i in info]
+
+    def _run_chunk(self, n: int, chunk: List[str]) -> None:
+        """Keeps a subscription for a chunk of ids alive until stopped, reconnecting as needed
+
+        :param n: index of chunk
+        :param chunk: list of QT symbol ids
+        """
+
+        backoff = 1
+        while not self.stop_event.is_set():
+            access = self.qt.access
+            try:
+                self._subscribe(n, chunk, access)
+                backoff = 1
+            except Exception as e:
+                logger.error(
+                    "QT stream error for %s ids - reconnecting: %s", len(chunk), e, exc_info=True
+                )
+
+                # stream failures are usually caused by expired access tokens - only
+                # the first chunk to notice re-authenticates (refresh tokens are single use)
+                try:
+                    with self.auth_lock:
+                        if self.qt.access == access:
+                            self.qt.get_auth()
+                except Exception as e:
+                    logger.error("QT re-authentication failed - retrying: %s", e, exc_info=True)
+                self.stop_event.wait(backoff)
+                backoff = min(backoff * 2, _MAX_BACKOFF)
+
+    def _subscribe(self, n: int, chunk: List[str], access: str) -> None:
+        """Opens a single streaming connection and processes messages until it closes
+
+        Idle connections are pinged every _RECV_TIMEOUT seconds; every frame received (quotes
+        or pongs) counts as a heartbeat of the subscription.
+
+        :param n: index of chunk
+        :param chunk: list of QT symbol ids
+        :param access: QT access token to authenticate the stream with
+        """
+
+        res = self.qt.get_req(
+            "v1/markets/quotes",
+            {"ids": ",".join(chunk), "stream": "true", "mode": "WebSocket"},
+        )
+        if not res or "streamPort" not in res:
+            raise ConnectionError(f"No stream port received: {res}")
+
+        ws = websocket.create_connection(
+            self._stream_url(res["streamPort"]), timeout=_RECV_TIMEOUT
+        )
+        try:
+            ws.send(access)
+            with self.lock:
+                self.heartbeats[n] = time.monotonic()
+
+            while not self.stop_event.is_set():
+                # token was refreshed elsewhere - resubscribe with new credentials
+                if self.qt.access != access:
+                    logger.info("QT access token changed - resubscribing.")
+                    return
+
+                try:
+                    opcode, data = ws.recv_data(control_frame=True)
+                except websocket.WebSocketTimeoutException:
+                    ws.ping()
+                    continue
+
+                if opcode == websocket.ABNF.OPCODE_CLOSE:
+                    raise ConnectionError("QT stream closed by server")
+
+                with self.lock:
+                    self.heartbeats[n] = time.monotonic()
+                if opcode == websocket.ABNF.OPCODE_TEXT:
+                    self._handle_msg(json.loads(data))
+        finally:
+            with self.lock:
+                self.heartbeats.pop(n, None)
+            ws.close()
+
+    def _handle_msg(self, msg: dict) -> None:
+        """Merges streamed quotes into the latest-quote table
+
+        :param msg: decoded stream message
+        """
+
+        if "code" in msg:
+            raise ConnectionError(f"QT stream error message: {msg}")
+
+        quotes = msg.get("quotes", [])
+        with self.lock:
+            for quote in quotes:
+                qid = str(quote["symbolId"])
+                # streamed updates can be partial - keep previously received fields
+                self.quotes[qid] = {**self.quotes.get(qid, {}), **quote}
+
+    def _stream_url(self, port: int) -> str:
+        """Builds streaming url for a port on the QT api server
+
+        :param port: stream port returned by QT
+        :return: websocket url
+        """
+
+        scheme, host = self.qt.api_server.split("://")
+        host = host.strip("/").split(":")[0]
+        return f"{'wss' if scheme == 'https' else 'ws'}://{host}:{port}/"
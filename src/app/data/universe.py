@@ -0,0 +1,279 @@
+"""
+universe.py - Contains the UniverseIndex class which keeps _point in memory as indexed NumPy columns
+
+Loaded once per container and refreshed incrementally from _point.mod_date, so repeated
+universe queries within and across warm invocations don't go back to the DB.
+"""
+
+from app.strategy.batch import Universe, _to_column
+
+from collections import defaultdict
+from typing import List, Tuple
+import numpy as np
+import threading
+import time
+import logging
+
+logger = logging.getLogger(__name__)
+
+_INDEX_COLS = ("currency", "exchange", "sector")  # secondary indexes (symbol is always indexed)
+_REFRESH_INTERVAL = 60  # seconds between incremental refreshes
+_FULL_REFRESH_INTERVAL = 3600  # seconds between full reloads (picks up deleted rows)
+_EMPTY = np.empty(0, dtype=np.int64)
+
+
+class UniverseIndex:
+    """A class to organize an in-memory columnar copy of _point with secondary indexes
+
+    Filters passed to query() are composable (all must match):
+        scalar -> equality, list/set -> membership, (low, high) tuple -> inclusive range
+        (None for an open bound)
+    """
+
+    def __init__(self, index_cols: Tuple[str] = _INDEX_COLS, ts_col: str = "mod_date") -> None:
+        """Constructor method
+
+        :param index_cols: columns with secondary indexes, defaults to currency, exchange and sector
+        :param ts_col: modification timestamp column used for incremental refreshes, defaults to mod_date
+        """
+
+        self.index_cols = index_cols
+        self.ts_col = ts_col
+        self.lock = threading.RLock()
+
+        self.col_names = []
+        self.tickers = np.empty(0, dtype=object)
+        self.columns = {}  # {column name: array aligned with tickers}
+        self.positions = {}  # {symbol: row position}
+        self.indexes = {}  # {column name: {value: row positions}}
+        self.last_mod = None
+        self.loaded_at = 0
+        self.refreshed_at = 0
+
+    def __len__(self) -> int:
+        return len(self.tickers)
+
+    def refresh(self, db: object, full: bool = False) -> int:
+        """Loads rows of _point modified since the last refresh
+
+        :param db: DB instance
+        :param full: set to True to reload every row, defaults to False
+        :return: number of rows loaded
+        """
+
+        full = (
+            full
+            or not self.positions
+            or self.ts_col not in self.columns
+            or time.time() - self.loaded_at > _FULL_REFRESH_INTERVAL
+        )
+        col_names, rows = db.get_point_since(None if full else self.last_mod)
+
+        with self.lock:
+            if full:
+                self._load(col_names, rows)
+            elif rows:
+                self._merge(col_names, rows)
+            self.refreshed_at = time.time()
+
+        logger.debug("Universe %s: %s rows.", 'loaded' if full else 'refreshed', len(rows))
+        return len(rows)
+
+    def maybe_refresh(self, db: object, max_age: float = _REFRESH_INTERVAL) -> int:
+        """Refreshes index if it is older than max_age
+
+        :param db: DB instance
+        :param max_age: max seconds since last refresh, defaults to 60
+        :return: number of rows loaded
+        """
+
+        if time.time() - self.refreshed_at < max_age:
+            return 0
+
+        return self.refresh(db)
+
+    def query(self, **filters) -> np.ndarray:
+        """Finds rows matching all filters, e.g. query(currency="USD", market_cap=(1e9, None))
+
+        :raises KeyError: raised when filtering on an unknown column
+        :return: sorted row positions
+        """
+
+        with self.lock:
+            candidates = None
+            remaining = {}
+            for name, cond in filters.items():
+                if name == "symbol":
+                    symbols = cond if isinstance(cond, (list, set, frozenset)) else [cond]
+                    pos = np.array(
+                        sorted(self.positions[s] for s in symbols if s in self.positions),
+                        dtype=np.int64,
+                    )
+                elif name in self.indexes and not isinstance(cond, tuple):
+                    values = cond if isinstance(cond, (list, set, frozenset)) else [cond]
+                    index = self.indexes[name]
+                    pos = np.unique(np.concatenate([index.get(v, _EMPTY) for v in values]))
+                else:
+                    remaining[name] = cond
+                    continue
+
+                candidates = (
+                    pos
+                    if candidates is None
+                    else np.intersect1d(candidates, pos, assume_unique=True)
+                )
+
+            if candidates is None:
+                candidates = np.arange(len(self.tickers))
+
+            # unindexed/range filters only scan the remaining candidates
+            for name, cond in remaining.items():
+                if name not in self.columns:
+                    raise KeyError(f"Unknown _point column {name}")
+
+                col = self.columns[name][candidates]
+                if isinstance(cond, tuple):
+                    low, high = cond
+                    mask = np.ones(len(col), dtype=bool)
+                    if low is not None:
+                        mask &= col >= low
+                    if high is not None:
+                        mask &= col <= high
+                elif isinstance(cond, (list, set, frozenset)):
+                    mask = np.isin(col, list(cond))
+                else:
+                    mask = col == cond
+                candidates = candidates[mask]
+
+            return candidates
+
+    def symbols(self, **filters) -> List[str]:
+        """Finds symbols of rows matching all filters (see query)
+
+        :return: list of symbols
+        """
+
+        return self.tickers[self.query(**filters)].tolist()
+
+    def rows(self, positions: np.ndarray) -> List[Tuple]:
+        """Builds _point rows (as returned by the DB, numeric values as floats) at row positions
+
+        :param positions: row positions (e.g. from query)
+        :return: list of row tuples in col_names order
+        """
+
+        with self.lock:
+            cols = [
+                self.tickers[positions].tolist()
+                if name == "symbol"
+                else [
+                    None if isinstance(v, float) and v != v else v
+                    for v in self.columns[name][positions].tolist()
+                ]
+                for name in self.col_names
+            ]
+
+        return list(zip(*cols))
+
+    def universe(self, positions: np.ndarray) -> Universe:
+        """Builds a scoring Universe of rows at row positions
+
+        :param positions: row positions (e.g. from query)
+        :return: Universe instance
+        """
+
+        with self.lock:
+            return Universe(
+                self.tickers[positions].tolist(),
+                {name: col[positions] for name, col in self.columns.items()},
+            )
+
+    def _load(self, col_names: List[str], rows: List[Tuple]) -> None:
+        """Replaces contents of index (lock must be held)
+
+        :param col_names: column names of rows
+        :param rows: _point rows
+        """
+
+        symbol_idx = col_names.index("symbol")
+        self.col_names = list(col_names)
+        self.tickers = np.array([row[symbol_idx] for row in rows], dtype=object)
+        self.columns = {
+            name: _to_column([row[j] for row in rows])
+            for j, name in enumerate(col_names)
+            if name != "symbol"
+        }
+        self.positions = {ticker: i for i, ticker in enumerate(self.tickers)}
+        self.loaded_at = time.time()
+        self._update_last_mod(self.columns.get(self.ts_col))
+        self._build_indexes()
+
+    def _merge(self, col_names: List[str], rows: List[Tuple]) -> None:
+        """Updates changed rows in place and appends new rows (lock must be held)
+
+        :param col_names: column names of rows
+        :param rows: modified _point rows
+        """
+
+        symbol_idx = col_names.index("symbol")
+        updates = [
+            (self.positions[row[symbol_idx]], row)
+            for row in rows
+            if row[symbol_idx] in self.positions
+        ]
+        new_rows = [row for row in rows if row[symbol_idx] not in self.positions]
+
+        for j, name in enumerate(col_names):
+            if name == "symbol":
+                continue
+
+            col = self.columns.get(name)
+            if col is None:
+                self.col_names.append(name)
+                col = np.full(len(self.tickers), None, dtype=object)
+            for pos, row in updates:
+                value = row[j]
+                try:
+                    col[pos] = np.nan if value is None and col.dtype == np.float64 else value
+                except (TypeError, ValueError):
+                    col = col.astype(object)
+                    col[pos] = value
+            if new_rows:
+                col = np.concatenate([col, _to_column([row[j] for row in new_rows])])
+            self.columns[name] = col
+
+        for row in new_rows:
+            self.positions[row[symbol_idx]] = len(self.positions)
+        if new_rows:
+            self.tickers = np.concatenate(
+                [self.tickers, np.array([row[symbol_idx] for row in new_rows], dtype=object)]
+            )
+
+        self._update_last_mod(self.columns.get(self.ts_col))
+        self._build_indexes()
+
+    def _update_last_mod(self, col: np.ndarray) -> None:
+        """Tracks latest modification timestamp (lock must be held)
+
+        :param col: modification timestamp column
+        """
+
+        values = [v for v in (col.tolist() if col is not None else []) if v is not None]
+        if values:
+            self.last_mod = max(values)
+
+    def _build_indexes(self) -> None:
+        """Rebuilds secondary indexes (lock must be held)"""
+
+        self.indexes = {}
+        for name in self.index_cols:
+            if name not in self.columns:
+                continue
+
+            groups = defaultdict(list)
+            for i, value in enumerate(self.columns[name].tolist()):
+                if value is not None and value == value:  # skip None/NaN
+                    groups[value].append(i)
+            self.indexes[name] = {
+                value: np.array(pos, dtype=np.int64) for value, pos in groups.items()
+            }
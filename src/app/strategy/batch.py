@@ -0,0 +1,195 @@
+"""
+batch.py - Contains the Universe and BatchScorer classes which score all stocks at once over NumPy columns
+
+Factors are expressions over named columns that work on both NumPy arrays (batch path)
+and NumPy scalars (per-stock path), so both paths share a single definition.
+"""
+
+import numpy as np
+from collections import defaultdict
+from typing import Callable, Dict, List, Tuple
+import logging
+
+logger = logging.getLogger(__name__)
+
+_QUOTE_FIELDS = ("lastTradePrice", "bidPrice", "askPrice", "volume", "isHalted")
+
+
+class Universe:
+    """A class to organize a struct-of-arrays view of the stock universe"""
+
+    def __init__(self, tickers: List[str], columns: Dict[str, np.ndarray]) -> None:
+        """Constructor method
+
+        :param tickers: tickers in row order
+        :param columns: dict of {column name: array aligned with tickers}
+        """
+
+        self.tickers = np.asarray(tickers, dtype=object)
+        self.columns = columns
+        self.index = {ticker: i for i, ticker in enumerate(tickers)}
+
+    def __len__(self) -> int:
+        return len(self.tickers)
+
+    @classmethod
+    def from_point(
+        cls,
+        rows: List[Tuple],
+        col_names: List[str],
+        quotes: Dict[str, dict] = None,
+        quote_fields: Tuple[str] = _QUOTE_FIELDS,
+    ) -> "Universe":
+        """Builds universe from _point rows (e.g. DB.get_point_by_currency) overlaid with fresh quotes
+
+        :param rows: _point rows
+        :param col_names: column names of rows (first column must be symbol)
+        :param quotes: dict of {ticker: QT quote}, defaults to None
+        :param quote_fields: quote fields to load as columns, defaults to price/volume fields
+        :return: Universe instance
+        """
+
+        quotes = quotes or {}
+        symbol_idx = col_names.index("symbol")
+        tickers = [row[symbol_idx] for row in rows]
+
+        columns = {}
+        for j, name in enumerate(col_names):
+            if name == "symbol":
+                continue
+            columns[name] = _to_column([row[j] for row in rows])
+
+        for field in quote_fields:
+            values = [quotes.get(ticker, {}).get(field) for ticker in tickers]
+            if field in columns:
+                # fresh quote values take precedence over stored values
+                stored = columns[field]
+                columns[field] = _to_column(
+                    [v if v is not None else s for v, s in zip(values, stored)]
+                )
+            else:
+                columns[field] = _to_column(values)
+
+        return cls(tickers, columns)
+
+    def row(self, ticker: str) -> Dict[str, object]:
+        """Obtains the column values of a single stock
+
+        :param ticker: ticker of stock
+        :return: dict of {column name: scalar value}
+        """
+
+        i = self.index[ticker]
+        return {name: col[i] for name, col in self.columns.items()}
+
+
+class BatchScorer:
+    """A class to organize vectorized scoring of a Universe"""
+
+    def __init__(
+        self,
+        factors: Dict[str, Tuple[Callable, float]],
+        buy_threshold: float = 0.05,
+        sell_threshold: float = -0.05,
+    ) -> None:
+        """Constructor method
+
+        :param factors: dict of {factor name: (expression over columns, weight)}
+        :param buy_threshold: min score for a buy signal, defaults to 0.05
+        :param sell_threshold: max score for a sell signal, defaults to -0.05
+        """
+
+        self.factors = factors
+        self.buy_threshold = buy_threshold
+        self.sell_threshold = sell_threshold
+
+    def score(self, universe: Universe) -> Dict[str, np.ndarray]:
+        """Scores every stock in one pass
+
+        Stocks with missing inputs or halted trading get a NaN score (no signal, unranked).
+
+        :param universe: Universe to score
+        :return: dict with score, buy/sell masks, ranks (1 = best, -1 = unranked) and each factor array
+        """
+
+        n = len(universe)
+        score = np.zeros(n)
+        results = {}
+        with np.errstate(divide="ignore", invalid="ignore"):
+            for name, (fx, weight) in self.factors.items():
+                factor = np.asarray(fx(universe.columns), dtype=float)
+                factor[~np.isfinite(factor)] = np.nan
+                results[name] = factor
+                score += weight * factor
+
+        if "isHalted" in universe.columns:
+            score[universe.columns["isHalted"] == 1] = np.nan
+
+        valid = ~np.isnan(score)
+        ranks = np.full(n, -1)
+        valid_idx = np.flatnonzero(valid)
+        order = valid_idx[np.argsort(-score[valid_idx], kind="stable")]
+        ranks[order] = np.arange(1, len(order) + 1)
+
+        results["score"] = score
+        results["buy"] = valid & (score >= self.buy_threshold)
+        results["sell"] = valid & (score <= self.sell_threshold)
+        results["rank"] = ranks
+
+        logger.info(
+            f"Batch scored {n} stocks: {results['buy'].sum()} buy, {results['sell'].sum()} sell."
+        )
+        return results
+
+    def score_one(self, row: Dict[str, object]) -> float:
+        """Scores a single stock (per-handler path)
+
+        :param row: dict of {column name: value} for the stock
+        :return: score of stock (NaN if it cannot be scored)
+        """
+
+        if row.get("isHalted") == 1:
+            return np.nan
+
+        # missing inputs behave like the NaN entries of a batch column
+        row = defaultdict(
+            lambda: np.float64(np.nan), {k: _to_scalar(v) for k, v in row.items()}
+        )
+        score = 0.0
+        with np.errstate(divide="ignore", invalid="ignore"):
+            for fx, weight in self.factors.values():
+                factor = float(fx(row))
+                if not np.isfinite(factor):
+                    return np.nan
+                score += weight * factor
+
+        return score
+
+
+def _to_column(values: List) -> np.ndarray:
+    """Converts list of values to a contiguous float column (None -> NaN)
+
+    :param values: list of values
+    :return: float64 array, object array if values are not numeric
+    """
+
+    try:
+        return np.array(
+            [np.nan if value is None else float(value) for value in values],
+            dtype=np.float64,
+        )
+    except (TypeError, ValueError):
+        return np.array(values, dtype=object)
+
+
+def _to_scalar(value: object) -> object:
+    """Converts a single value to the NumPy scalar equivalent of its column representation
+
+    :param value: value to convert
+    :return: float64 scalar (None -> NaN), value unchanged if not numeric
+    """
+
+    try:
+        return np.float64(np.nan if value is None else float(value))
+    except (TypeError, ValueError):
+        return value
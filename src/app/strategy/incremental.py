@@ -0,0 +1,115 @@
+"""
+incremental.py - Contains the IncrementalScorer class which only re-scores stocks whose quotes changed since the last cycle
+"""
+
+from typing import Callable, Dict, Iterable, Set, Tuple
+import threading
+import logging
+
+logger = logging.getLogger(__name__)
+
+# QT quote fields which indicate a stock's scoring inputs have changed
+_DIRTY_FIELDS = ("lastTradeTime", "lastTradePrice", "volume")
+
+
+class IncrementalScorer:
+    """A class to organize dirty-tracking and memoisation of per-ticker scoring results"""
+
+    def __init__(
+        self,
+        score_fx: Callable[[str, dict], object],
+        dirty_fields: Tuple[str] = _DIRTY_FIELDS,
+    ) -> None:
+        """Constructor method
+
+        :param score_fx: scoring function taking (ticker, quote) and returning the ticker's result
+        :param dirty_fields: quote fields compared between cycles, defaults to lastTradeTime, lastTradePrice, volume
+        """
+
+        self.score_fx = score_fx
+        self.dirty_fields = dirty_fields
+
+        self.fingerprints = {}  # {ticker: tuple of dirty_fields values}
+        self.results = {}  # {ticker: memoised result of score_fx}
+        self.lock = threading.Lock()
+
+    def fingerprint(self, quote: dict) -> Tuple:
+        """Extracts values of the fields used for change detection
+
+        :param quote: QT quote (dict of get_mkt_quote fields)
+        :return: tuple of field values
+        """
+
+        return tuple(quote.get(field) for field in self.dirty_fields)
+
+    def mark_dirty(self, quotes: Dict[str, dict]) -> Set[str]:
+        """Determines which tickers' inputs changed since the previous cycle
+
+        :param quotes: dict of {ticker: quote}
+        :return: set of tickers to re-score
+        """
+
+        with self.lock:
+            return {
+                ticker
+                for ticker, quote in quotes.items()
+                if ticker not in self.results
+                or self.fingerprints.get(ticker) != self.fingerprint(quote)
+            }
+
+    def evict(self, universe: Iterable[str]) -> Set[str]:
+        """Drops memoised state for tickers no longer in the universe (e.g. removed from _point)
+
+        :param universe: tickers currently tracked
+        :return: set of evicted tickers
+        """
+
+        universe = set(universe)
+        with self.lock:
+            evicted = set(self.results) - universe
+            for ticker in evicted:
+                self.results.pop(ticker, None)
+                self.fingerprints.pop(ticker, None)
+
+        if evicted:
+            logger.info("Evicted %s tickers from scoring cache.", len(evicted))
+
+        return evicted
+
+    def invalidate(self, ticker: str = None) -> None:
+        """Forces a ticker (or all tickers) to be re-scored next cycle
+
+        :param ticker: ticker to invalidate, defaults to None (all)
+        """
+
+        with self.lock:
+            if ticker is None:
+                self.results.clear()
+                self.fingerprints.clear()
+            else:
+                self.results.pop(ticker, None)
+                self.fingerprints.pop(ticker, None)
+
+    def score(self, quotes: Dict[str, dict]) -> Dict[str, object]:
+        """Runs a scoring cycle, only re-scoring tickers whose quotes changed
+
+        Tickers absent from quotes are treated as dropped from the universe and evicted.
+
+        :param quotes: dict of {ticker: quote} for every tracked ticker
+        :return: dict of {ticker: result} for every tracked ticker
+        """
+
+        self.evict(quotes.keys())
+        dirty = self.mark_dirty(quotes)
+
+        for ticker in dirty:
+            quote = quotes[ticker]
+            result = self.score_fx(ticker, quote)
+            with self.lock:
+                self.results[ticker] = result
+                self.fingerprints[ticker] = self.fingerprint(quote)
+
+        logger.info("Re-scored %s/%s tickers.", len(dirty), len(quotes))
+
+        with self.lock:
+            return {ticker: self.results[ticker] for ticker in quotes}
@@ -0,0 +1,502 @@
+"""
+indicators.py - Contains the IndicatorEngine class which updates technical indicators in O(1) per quote or bar
+
+Each indicator keeps a few floats of state per ticker instead of the ticker's history, so an
+update costs the same regardless of how much history has been seen. State is persisted between
+invocations (gzip JSON in S3 or a local file) and resumes exactly where it left off.
+
+Definitions (matching full recomputation with pandas):
+    EMA: ewm(span=n, adjust=False) of close
+    RSI: Wilder smoothing - ewm(alpha=1/n, adjust=False) of gains/losses of close
+    ATR: Wilder smoothing of true range (first true range is high - low)
+    VWAP: cumulative sum(typical price * volume) / sum(volume), reset every session
+    vol_avg: rolling(n).mean() of volume (None until n bars are seen)
+"""
+
+from app.utils.aws import AWSClient
+
+from botocore.exceptions import ClientError
+from collections import deque
+from typing import Dict, Literal
+import gzip
+import json
+import os
+import threading
+import logging
+
+logger = logging.getLogger(__name__)
+
+# {indicator name: (kind, *params)}
+_DEFAULT_SPEC = {
+    "ema_12": ("ema", 12),
+    "ema_26": ("ema", 26),
+    "rsi_14": ("rsi", 14),
+    "atr_14": ("atr", 14),
+    "vwap": ("vwap",),
+    "vol_avg_20": ("vol_avg", 20),
+}
+
+
+class EMA:
+    """Exponential moving average"""
+
+    __slots__ = ("alpha", "value")
+
+    def __init__(self, period: int = None, alpha: float = None) -> None:
+        self.alpha = alpha if alpha is not None else 2 / (period + 1)
+        self.value = None
+
+    def update(self, x: float) -> float:
+        self.value = x if self.value is None else self.value + self.alpha * (x - self.value)
+        return self.value
+
+    def state(self) -> list:
+        return [self.value]
+
+    def load(self, state: list) -> None:
+        (self.value,) = state
+
+
+class RSI:
+    """Relative strength index with Wilder smoothing"""
+
+    __slots__ = ("gain", "loss", "prev", "value")
+
+    def __init__(self, period: int) -> None:
+        self.gain = EMA(alpha=1 / period)
+        self.loss = EMA(alpha=1 / period)
+        self.prev = None
+        self.value = None
+
+    def update(self, close: float) -> float:
+        if self.prev is not None:
+            change = close - self.prev
+            gain = self.gain.update(max(change, 0.0))
+            loss = self.loss.update(max(-change, 0.0))
+            self.value = 100.0 if loss == 0 else 100 - 100 / (1 + gain / loss)
+        self.prev = close
+        return self.value
+
+    def state(self) -> list:
+        return [self.gain.value, self.loss.value, self.prev, self.value]
+
+    def load(self, state: list) -> None:
+        self.gain.value, self.loss.value, self.prev, self.value = state
+
+
+class ATR:
+    """Average true range with Wilder smoothing"""
+
+    __slots__ = ("tr", "prev_close", "value")
+
+    def __init__(self, period: int) -> None:
+        self.tr = EMA(alpha=1 / period)
+        self.prev_close = None
+        self.value = None
+
+    def update(self, high: float, low: float, close: float) -> float:
+        true_range = high - low
+        if self.prev_close is not None:
+            true_range = max(
+                true_range, abs(high - self.prev_close), abs(low - self.prev_close)
+            )
+        self.value = self.tr.update(true_range)
+        self.prev_close = close
+        return self.value
+
+    def state(self) -> list:
+        return [self.tr.value, self.prev_close]
+
+    def load(self, state: list) -> None:
+        self.tr.value, self.prev_close = state
+        self.value = self.tr.value
+
+
+class VWAP:
+    """Session volume-weighted average price"""
+
+    __slots__ = ("session", "pv", "volume", "value")
+
+    def __init__(self) -> None:
+        self.session = None
+        self.pv = 0.0
+        self.volume = 0.0
+        self.value = None
+
+    def update(self, price: float, volume: float, session: str = None) -> float:
+        if session != self.session:
+            self.session, self.pv, self.volume, self.value = session, 0.0, 0.0, None
+        if volume > 0:
+            self.pv += price * volume
+            self.volume += volume
+            self.value = self.pv / self.volume
+        return self.value
+
+    def state(self) -> list:
+        return [self.session, self.pv, self.volume]
+
+    def load(self, state: list) -> None:
+        self.session, self.pv, self.volume = state
+        self.value = self.pv / self.volume if self.volume else None
+
+
+class RollingMean:
+    """Simple moving average over the last n values"""
+
+    __slots__ = ("window", "total", "value")
+
+    def __init__(self, period: int) -> None:
+        self.window = deque(maxlen=period)
+        self.total = 0.0
+        self.value = None
+
+    def update(self, x: float) -> float:
+        if len(self.window) == self.window.maxlen:
+            self.total -= self.window[0]
+        self.window.append(x)
+        self.total += x
+        if len(self.window) == self.window.maxlen:
+            self.value = self.total / len(self.window)
+        return self.value
+
+    def state(self) -> list:
+        return list(self.window)
+
+    def load(self, state: list) -> None:
+        self.window.clear()
+        self.total = 0.0
+        self.value = None
+        for x in state:
+            self.update(x)
+
+
+class _TickerState:
+    """Indicators of a ticker plus the last quote needed to derive bars from quote snapshots"""
+
+    __slots__ = (
+        "indicators",
+        "last_price",
+        "day_volume",
+        "day_high",
+        "day_low",
+        "session",
+        "last_trade_time",
+    )
+
+    def __init__(self, spec: Dict[str, tuple]) -> None:
+        self.indicators = {name: _build(params) for name, params in spec.items()}
+        self.last_price = None
+        self.day_volume = None
+        self.day_high = None
+        self.day_low = None
+        self.session = None
+        self.last_trade_time = None
+
+
+def _build(params: tuple) -> object:
+    """Builds an indicator from its spec
+
+    :param params: tuple of (kind, *params)
+    :return: indicator instance
+    """
+
+    kind, *args = params
+    return {
+        "ema": EMA,
+        "rsi": RSI,
+        "atr": ATR,
+        "vwap": VWAP,
+        "vol_avg": RollingMean,
+    }[kind](*args)
+
+
+class IndicatorEngine:
+    """A class to organize per-ticker incremental indicator state"""
+
+    def __init__(self, spec: Dict[str, tuple] = None) -> None:
+        """Constructor method
+
+        :param spec: dict of {indicator name: (kind, *params)}, defaults to _DEFAULT_SPEC
+        """
+
+        self.spec = spec or _DEFAULT_SPEC
+        self.states = {}  # {ticker: _TickerState}
+        self.lock = threading.Lock()
+
+    def update_bar(self, ticker: str, bar: dict) -> Dict[str, float]:
+        """Updates indicators of a ticker with a new OHLCV bar
+
+        :param ticker: ticker of bar
+        :param bar: dict with high, low, close and volume (and optionally ts for VWAP sessions)
+        :return: dict of {indicator name: value}
+        """
+
+        session = str(bar["ts"])[:10] if "ts" in bar else None
+        state = self._state(ticker)
+
+        return self._apply(
+            state, bar["high"], bar["low"], bar["close"], bar["volume"], session
+        )
+
+    def update_quote(self, ticker: str, quote: dict) -> Dict[str, float]:
+        """Updates indicators of a ticker with a QT quote snapshot
+
+        The snapshot is turned into a bar covering the time since the previous snapshot:
+        volume is the change in day volume, and the bar's high/low are the new day
+        high/low if one was set in between, otherwise the range of the two last prices.
+        Snapshots without a new trade (same lastTradeTime and volume) are skipped, so values
+        don't depend on how often quotes are polled.
+
+        :param ticker: ticker of quote
+        :param quote: QT quote with lastTradePrice, volume, highPrice and lowPrice
+        :return: dict of {indicator name: value}, unchanged values if the quote has no price or new trade
+        """
+
+        price = quote.get("lastTradePrice")
+        state = self._state(ticker)
+        if price is None:
+            return self.values(ticker)
+
+        day_volume = quote.get("volume") or 0
+        day_high = quote.get("highPrice") or price
+        day_low = quote.get("lowPrice") or price
+        last_trade_time = quote.get("lastTradeTime")
+        session = (last_trade_time or "")[:10] or None
+
+        if (
+            state.day_volume is not None
+            and last_trade_time == state.last_trade_time
+            and day_volume == state.day_volume
+        ):
+            # repeated snapshot - no trades since the previous one
+            return self.values(ticker)
+
+        if session and state.session:
+            new_day = session != state.session
+        else:
+            new_day = state.day_volume is not None and day_volume < state.day_volume
+
+        if state.day_volume is None or new_day:
+            # first snapshot of the ticker or of a new day
+            volume, high, low = day_volume, day_high, day_low
+        else:
+            prev = state.last_price
+            volume = day_volume - state.day_volume
+            high = day_high if day_high > state.day_high else max(prev, price)
+            low = day_low if day_low < state.day_low else min(prev, price)
+
+        state.last_price, state.day_volume = price, day_volume
+        state.day_high, state.day_low = day_high, day_low
+        state.session, state.last_trade_time = session, last_trade_time
+
+        return self._apply(state, high, low, price, volume, session)
+
+    def update_quotes(self, quotes: Dict[str, dict]) -> Dict[str, Dict[str, float]]:
+        """Updates indicators of many tickers with QT quote snapshots
+
+        :param quotes: dict of {ticker: quote}
+        :return: dict of {ticker: {indicator name: value}}
+        """
+
+        return {ticker: self.update_quote(ticker, quote) for ticker, quote in quotes.items()}
+
+    def values(self, ticker: str) -> Dict[str, float]:
+        """Obtains current indicator values of a ticker
+
+        :param ticker: ticker
+        :return: dict of {indicator name: value} (None for unknown tickers/unseeded indicators)
+        """
+
+        state = self.states.get(ticker)
+        if state is None:
+            return {name: None for name in self.spec}
+
+        return {name: ind.value for name, ind in state.indicators.items()}
+
+    def to_state(self) -> dict:
+        """Exports state of every ticker
+
+        :return: JSON serializable dict
+        """
+
+        with self.lock:
+            return {
+                "spec": {name: list(params) for name, params in self.spec.items()},
+                "tickers": {
+                    ticker: {
+                        "quote": [
+                            s.last_price,
+                            s.day_volume,
+                            s.day_high,
+                            s.day_low,
+                            s.session,
+                            s.last_trade_time,
+                        ],
+                        "indicators": {
+                            name: ind.state() for name, ind in s.indicators.items()
+                        },
+                    }
+                    for ticker, s in self.states.items()
+                },
+            }
+
+    @classmethod
+    def from_state(cls, doc: dict, spec: Dict[str, tuple] = None) -> "IndicatorEngine":
+        """Restores engine from exported state
+
+        Only indicators with the same name and params in both specs are restored - indicators
+        new to the spec start empty and ones dropped from it are discarded.
+
+        :param doc: dict from to_state
+        :param spec: spec of restored engine, defaults to the exported spec
+        :return: IndicatorEngine instance
+        """
+
+        saved_spec = {name: tuple(params) for name, params in doc["spec"].items()}
+        engine = cls(spec or saved_spec)
+        restored = {name for name, params in engine.spec.items() if saved_spec.get(name) == params}
+        for ticker, ticker_doc in doc["tickers"].items():
+            state = _TickerState(engine.spec)
+            # states saved before sessions were tracked have 4 entries
+            quote = ticker_doc["quote"] + [None] * (6 - len(ticker_doc["quote"]))
+            (
+                state.last_price,
+                state.day_volume,
+                state.day_high,
+                state.day_low,
+                state.session,
+                state.last_trade_time,
+            ) = quote
+            for name, ind_state in ticker_doc["indicators"].items():
+                if name in restored:
+                    state.indicators[name].load(ind_state)
+            engine.states[ticker] = state
+
+        return engine
+
+    def save(self, backend: Literal["s3", "local"] = "s3", path: str = None) -> None:
+        """Persists state of engine
+
+        :param backend: where state is stored, defaults to "s3"
+        :param path: S3 key or local file path, defaults to INDICATOR_STATE_PATH env var
+        """
+
+        path = path or _default_path(backend)
+        data = gzip.compress(json.dumps(self.to_state(), separators=(",", ":")).encode())
+        try:
+            if backend == "s3":
+                AWSClient("s3").op_client("upload_file").put_object(
+                    Bucket=os.environ.get("BUCKET_NAME"), Key=path, Body=data
+                )
+            else:
+                tmp_path = f"{path}.tmp"
+                with open(tmp_path, "wb") as f:
+                    f.write(data)
+                os.replace(tmp_path, path)
+            logger.info("Saved indicator state of %s tickers to %s.", len(self.states), path)
+        except Exception as e:
+            logger.error("Indicator state could not be saved to %s: %s", path, e, exc_info=True)
+
+    @classmethod
+    def load(
+        cls,
+        backend: Literal["s3", "local"] = "s3",
+        path: str = None,
+        spec: Dict[str, tuple] = None,
+    ) -> "IndicatorEngine":
+        """Restores engine from persisted state
+
+        :param backend: where state is stored, defaults to "s3"
+        :param path: S3 key or local file path, defaults to INDICATOR_STATE_PATH env var
+        :param spec: spec of engine (state is restored for indicators also in the persisted spec),
+            defaults to _DEFAULT_SPEC
+        :return: IndicatorEngine instance (empty if no state could be loaded)
+        """
+
+        path = path or _default_path(backend)
+        try:
+            if backend == "s3":
+                try:
+                    s3_res = AWSClient("s3").op_client("get_object").get_object(
+                        Bucket=os.environ.get("BUCKET_NAME"), Key=path
+                    )
+                    data = s3_res["Body"].read()
+                except ClientError as e:
+                    if e.response["Error"]["Code"] not in ("NoSuchKey", "404"):
+                        raise e
+                    data = None
+            elif os.path.exists(path):
+                with open(path, "rb") as f:
+                    data = f.read()
+            else:
+                data = None
+
+            if data:
+                engine = cls.from_state(json.loads(gzip.decompress(data)), spec or _DEFAULT_SPEC)
+                logger.info("Loaded indicator state of %s tickers.", len(engine.states))
+                return engine
+        except Exception as e:
+            logger.error("Indicator state could not be loaded from %s: %s", path, e, exc_info=True)
+
+        return cls(spec)
+
+    def _state(self, ticker: str) -> _TickerState:
+        """Obtains state of a ticker, creating it on first use
+
+        :param ticker: ticker
+        :return: state of ticker
+        """
+
+        with self.lock:
+            state = self.states.get(ticker)
+            if state is None:
+                state = self.states[ticker] = _TickerState(self.spec)
+            return state
+
+    def _apply(
+        self,
+        state: _TickerState,
+        high: float,
+        low: float,
+        close: float,
+        volume: float,
+        session: str,
+    ) -> Dict[str, float]:
+        """Feeds a bar to every indicator of a ticker
+
+        :param state: state of ticker
+        :param high: high of bar
+        :param low: low of bar
+        :param close: close of bar
+        :param volume: volume of bar
+        :param session: session (date) of bar for VWAP resets
+        :return: dict of {indicator name: value}
+        """
+
+        values = {}
+        for name, ind in state.indicators.items():
+            if isinstance(ind, ATR):
+                values[name] = ind.update(high, low, close)
+            elif isinstance(ind, VWAP):
+                values[name] = ind.update((high + low + close) / 3, volume, session)
+            elif isinstance(ind, RollingMean):
+                values[name] = ind.update(volume)
+            else:
+                values[name] = ind.update(close)
+
+        return values
+
+
+def _default_path(backend: Literal["s3", "local"]) -> str:
+    """Builds default location of persisted state
+
+    :param backend: where state is stored
+    :return: S3 key or local file path
+    """
+
+    default = (
+        "indicators/state.json.gz"
+        if backend == "s3"
+        else "/tmp/indicator_state.json.gz"
+    )
+    return os.environ.get("INDICATOR_STATE_PATH", default)
@@ -3,59 +3,173 @@ aws.py - Contains the AWSClient class which handles Lambda/S3 usage
 """
 
 from app.config import _IS_LAMBDA_ENV
+from app.utils.codec import unpack_result
 
-from typing import Literal
+from typing import Dict, Iterator, List, Literal, Optional, Union
 import boto3
 import botocore
+from boto3.s3.transfer import TransferConfig
 import os
 import json
+import threading
 import traceback
 import logging
 
 logger = logging.getLogger(__name__)
 
+# (connect_timeout, read_timeout) in seconds for each client operation
+_DEFAULT_TIMEOUTS = (10, 60)
+_OPERATION_TIMEOUTS = {
+    "invoke": (10, 900),  # synchronous lambda call can run for the full 15 min
+    "get_object": (10, 120),
+    "upload_file": (10, 300),
+    "delete_object": (10, 30),
+    "delete_objects": (10, 60),
+}
 
-class AWSClient:
-    """A class to organize AWS functionality for PC"""
+# timeouts of AWSClient.client - lambda clients only invoke, so callers using .client directly
+# keep the invoke timeout
+_CLIENT_TIMEOUTS = {"lambda": _OPERATION_TIMEOUTS["invoke"]}
 
-    def __init__(self, client_type: Literal["s3", "lambda"]) -> None:
-        """Constructor method
+_S3_DELETE_BATCH_SIZE = 1000  # max keys accepted by a single delete_objects call
 
-        :param client_type: type of boto3 AWS client to instantiate
-        """
+# clients are cached per container and shared between threads (boto3 clients are
+# thread-safe, sessions are not - hence the lock around creation)
+_CLIENT_CACHE = {}
+_CLIENT_LOCK = threading.Lock()
+_SESSION = None
+
+
+def get_client(
+    client_type: Literal["s3", "lambda"],
+    max_pool_connections: int = 10,
+    connect_timeout: float = _DEFAULT_TIMEOUTS[0],
+    read_timeout: float = _DEFAULT_TIMEOUTS[1],
+) -> object:
+    """Obtains a cached boto3 client, creating it on first use
+
+    :param client_type: type of boto3 AWS client to instantiate
+    :param max_pool_connections: max number of pooled connections, defaults to 10
+    :param connect_timeout: connection timeout in seconds, defaults to 10
+    :param read_timeout: read timeout in seconds, defaults to 60
+    :return: boto3 client
+    """
+
+    global _SESSION
+
+    key = (client_type, max_pool_connections, connect_timeout, read_timeout)
+    client = _CLIENT_CACHE.get(key)
+    if client is not None:
+        return client
+
+    with _CLIENT_LOCK:
+        client = _CLIENT_CACHE.get(key)
+        if client is not None:
+            return client
+
+        if _SESSION is None:
+            _SESSION = boto3.Session()
 
         config = botocore.config.Config(
-            read_timeout=900,
-            connect_timeout=900,
+            read_timeout=read_timeout,
+            connect_timeout=connect_timeout,
+            max_pool_connections=max_pool_connections,
             retries={"max_attempts": 0},
         )
-        session = boto3.Session()
+
+        # S3_ENDPOINT_URL allows pointing at a local S3-compatible stand-in
+        endpoint_url = None
+        if client_type == "s3":
+            endpoint_url = os.environ.get("S3_ENDPOINT_URL")
 
         if _IS_LAMBDA_ENV:
-            client = session.client(client_type, config=config)
+            client = _SESSION.client(
+                client_type, endpoint_url=endpoint_url, config=config
+            )
         else:
-            client = session.client(
+            client = _SESSION.client(
                 client_type,
                 aws_access_key_id=os.environ.get("USER_AWS_ACCESS_ID"),
                 aws_secret_access_key=os.environ.get("USER_AWS_SECRET_KEY"),
                 region_name=os.environ.get("AWS_REGION"),
+                endpoint_url=endpoint_url,
                 config=config,
             )
 
-        self.client = client
+        _CLIENT_CACHE[key] = client
+        logger.debug(f"Created {client_type} client: {key}")
+
+    return client
+
+
+def _iter_chunks(body: object, chunk_size: int) -> Iterator[bytes]:
+    """Yields chunks of a StreamingBody, closing it once exhausted (or abandoned)
+
+    :param body: botocore StreamingBody
+    :param chunk_size: max size of each yielded chunk in bytes
+    :return: iterator of binary chunks
+    """
+
+    try:
+        yield from body.iter_chunks(chunk_size)
+    finally:
+        body.close()
+
+
+class AWSClient:
+    """A class to organize AWS functionality for PC"""
+
+    def __init__(
+        self, client_type: Literal["s3", "lambda"], max_pool_connections: int = 10
+    ) -> None:
+        """Constructor method
+
+        :param client_type: type of boto3 AWS client to instantiate
+        :param max_pool_connections: max number of pooled connections, defaults to 10
+        """
+
         self.client_type = client_type
+        self.max_pool_connections = max_pool_connections
+        self.client = get_client(
+            client_type,
+            max_pool_connections,
+            *_CLIENT_TIMEOUTS.get(client_type, _DEFAULT_TIMEOUTS),
+        )
+
+    def op_client(self, operation: str, min_pool_connections: int = 0) -> object:
+        """Obtains the cached client configured with the timeouts for an operation
+
+        :param operation: name of boto3 client operation (e.g. "invoke")
+        :param min_pool_connections: min pool size required by the operation, defaults to 0
+        :return: boto3 client
+        """
 
-    def pc_lambda(self, payload: dict) -> dict:
+        connect_timeout, read_timeout = _OPERATION_TIMEOUTS.get(
+            operation, _DEFAULT_TIMEOUTS
+        )
+        return get_client(
+            self.client_type,
+            max(self.max_pool_connections, min_pool_connections),
+            connect_timeout,
+            read_timeout,
+        )
+
+    def pc_lambda(self, payload: Union[dict, str]) -> dict:
         """Calls this lambda function (recursively)
 
-        :param payload: dict of params for lambda execution
+        Dict payloads request a compact encoded result (see codec.py), which is decoded
+        (and read back from S3 if it was spilled) before being returned.
+
+        :param payload: dict of params for lambda execution (or a JSON string for a plain JSON result)
         :return: body of lambda call results
         """
 
         lambda_arn = os.environ.get("LAMBDA_ARN")
+        if isinstance(payload, dict):
+            payload = json.dumps({**payload, "resultCodec": True})
 
         try:
-            res = self.client.invoke(
+            res = self.op_client("invoke").invoke(
                 FunctionName=lambda_arn,
                 InvocationType="RequestResponse",
                 Payload=payload,
@@ -63,7 +177,7 @@ class AWSClient:
             data = json.loads(res.get("Payload").read())
 
             if ("statusCode" in data) and (data["statusCode"] == 200):
-                return data["body"]
+                return unpack_result(data["body"], AWSClient("s3"))
             else:
                 logger.error(f"Failed status for lambda call - output: {data}")
         except Exception as e:
@@ -81,7 +195,7 @@ class AWSClient:
 
         bucket = os.environ.get("BUCKET_NAME")
         try:
-            s3_res = self.client.get_object(Bucket=bucket, Key=s3_key)
+            s3_res = self.op_client("get_object").get_object(Bucket=bucket, Key=s3_key)
             return s3_res["Body"].read()
         except Exception as e:
             logger.error(f"S3 GET error for {bucket}: {e}")
@@ -89,6 +203,67 @@ class AWSClient:
 
         return None
 
+    def pc_s3_open(self, s3_key: str, byte_range: tuple = None) -> object:
+        """Opens object in S3 storage for streaming without reading it into memory
+
+        :param s3_key: key of file to retrieve
+        :param byte_range: inclusive (start, end) byte offsets to retrieve, end may be None, defaults to None
+        :return: file-like botocore StreamingBody (supports read(n), iter_chunks, close), None if
+            object could not be retrieved - not a context manager in botocore 1.24, so close it
+            (or wrap it with contextlib.closing) when done
+        """
+
+        bucket = os.environ.get("BUCKET_NAME")
+        kwargs = {"Bucket": bucket, "Key": s3_key}
+        if byte_range:
+            start, end = byte_range
+            kwargs["Range"] = f"bytes={start}-{'' if end is None else end}"
+
+        try:
+            s3_res = self.op_client("get_object").get_object(**kwargs)
+            return s3_res["Body"]
+        except Exception as e:
+            logger.error(
+                "S3 GET error for %s/%s %s: %s", bucket, s3_key, byte_range, e, exc_info=True
+            )
+
+        return None
+
+    def pc_s3_iter(
+        self, s3_key: str, chunk_size: int = 1024 * 1024, byte_range: tuple = None
+    ) -> Optional[Iterator[bytes]]:
+        """Streams object from S3 storage in chunks
+
+        :param s3_key: key of file to retrieve
+        :param chunk_size: max size of each yielded chunk in bytes, defaults to 1MB
+        :param byte_range: inclusive (start, end) byte offsets to retrieve, defaults to None
+        :return: iterator of binary chunks, None if object could not be retrieved
+        """
+
+        body = self.pc_s3_open(s3_key, byte_range)
+        if body is None:
+            return None
+
+        return _iter_chunks(body, chunk_size)
+
+    def pc_s3_get_range(self, s3_key: str, start: int, end: int) -> object:
+        """Gets a byte range of an object from S3 storage
+
+        :param s3_key: key of file to retrieve
+        :param start: first byte offset to retrieve
+        :param end: last byte offset to retrieve (inclusive)
+        :return: binary of retrieved range
+        """
+
+        body = self.pc_s3_open(s3_key, (start, end))
+        if body is None:
+            return None
+
+        try:
+            return body.read()
+        finally:
+            body.close()
+
     def pc_s3_del(self, s3_key: str) -> None:
         """Deletes object from PC's S3 storage
 
@@ -97,21 +272,80 @@ class AWSClient:
 
         bucket = os.environ.get("BUCKET_NAME")
         try:
-            self.client.delete_object(Bucket=bucket, Key=s3_key)
+            self.op_client("delete_object").delete_object(Bucket=bucket, Key=s3_key)
         except Exception as e:
             logger.error(f"S3 DELETE error for {bucket}: {e}")
             logger.error(traceback.format_exc())
 
-    def pc_s3_upload(self, upload_path: str, s3_key: str) -> None:
-        """Uploads object to PC's S3 storage
+    def pc_s3_del_batch(self, s3_keys: List[str]) -> Dict[str, str]:
+        """Deletes objects from PC's S3 storage in batches of up to 1000 keys
+
+        :param s3_keys: keys of files to delete
+        :return: dict of {key: error message} for keys that failed to delete
+        """
+
+        bucket = os.environ.get("BUCKET_NAME")
+        client = self.op_client("delete_objects")
+        failed = {}
+
+        for i in range(0, len(s3_keys), _S3_DELETE_BATCH_SIZE):
+            batch = s3_keys[i : i + _S3_DELETE_BATCH_SIZE]
+            try:
+                res = client.delete_objects(
+                    Bucket=bucket,
+                    Delete={
+                        "Objects": [{"Key": key} for key in batch],
+                        "Quiet": True,
+                    },
+                )
+                for err in res.get("Errors", []):
+                    failed[err["Key"]] = f'{err.get("Code")}: {err.get("Message")}'
+            except Exception as e:
+                logger.error("S3 BATCH DELETE error for %s: %s", bucket, e, exc_info=True)
+                for key in batch:
+                    failed[key] = str(e)
+
+        if failed:
+            logger.error("S3 BATCH DELETE failed for %s/%s keys", len(failed), len(s3_keys))
+
+        return failed
 
-        :param upload_path: path where file to upload is located
+    def pc_s3_upload(
+        self,
+        upload_path: Union[str, object],
+        s3_key: str,
+        part_size: int = 8 * 1024 * 1024,
+        max_concurrency: int = 10,
+    ) -> bool:
+        """Uploads object to PC's S3 storage (multipart for objects over part_size)
+
+        :param upload_path: path where file to upload is located, or a binary file-like object
         :param s3_key: upload file key
+        :param part_size: size of each multipart upload part in bytes, defaults to 8MB
+        :param max_concurrency: max number of parts uploaded in parallel, defaults to 10
+        :return: whether the upload succeeded
         """
 
         bucket = os.environ.get("BUCKET_NAME")
+        transfer_config = TransferConfig(
+            multipart_threshold=part_size,
+            multipart_chunksize=part_size,
+            max_concurrency=max_concurrency,
+            use_threads=max_concurrency > 1,
+        )
         try:
-            self.client.upload_file(upload_path, bucket, s3_key)
+            client = self.op_client("upload_file", max_concurrency)
+            if isinstance(upload_path, str):
+                client.upload_file(
+                    upload_path, bucket, s3_key, Config=transfer_config
+                )
+            else:
+                client.upload_fileobj(
+                    upload_path, bucket, s3_key, Config=transfer_config
+                )
+            return True
         except Exception as e:
             logger.error(f"S3 UPLOAD error for {bucket}: {e}")
             logger.error(traceback.format_exc())
+
+        return False
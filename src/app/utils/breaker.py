@@ -0,0 +1,224 @@
+"""
+breaker.py - Contains the CircuitBreaker class which stops calls to a data source while it is failing
+"""
+
+from collections import deque
+from typing import Callable, Dict, Literal, Tuple
+import threading
+import time
+import logging
+
+logger = logging.getLogger(__name__)
+
+_BREAKERS = {}
+_REGISTRY_LOCK = threading.Lock()
+# client errors that signal a struggling/blocking source rather than a bad request
+_FAILURE_STATUSES = {403, 408, 429}
+
+
+class CircuitBreaker:
+    """A class to organize the closed/open/half-open state of a data source
+
+    closed: calls allowed, outcomes recorded over a sliding window
+    open: calls fail fast until the cooldown elapses
+    half_open: a limited number of trial calls decide whether to close or re-open - any failure
+        re-opens, all trials succeeding closes (trial slots are handed out again after the
+        cooldown in case a trial never records its outcome)
+
+    Listeners are called after the breaker's lock is released, so they may use the breaker.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        failure_rate: float = 0.5,
+        min_calls: int = 20,
+        window: int = 50,
+        cooldown: float = 30,
+        half_open_calls: int = 3,
+    ) -> None:
+        """Constructor method
+
+        :param name: name of data source
+        :param failure_rate: failure rate over the window which opens the breaker, defaults to 0.5
+        :param min_calls: min calls in window before the failure rate is evaluated, defaults to 20
+        :param window: number of most recent calls considered, defaults to 50
+        :param cooldown: seconds to stay open before allowing trial calls, defaults to 30
+        :param half_open_calls: number of trial calls allowed while half open, defaults to 3
+        """
+
+        self.name = name
+        self.failure_rate = failure_rate
+        self.min_calls = min_calls
+        self.cooldown = cooldown
+        self.half_open_calls = half_open_calls
+
+        self.state = "closed"
+        self.outcomes = deque(maxlen=window)  # True for failures
+        self.opened_at = 0
+        self.trials = 0
+        self.trial_successes = 0
+        self.trial_at = 0
+        self.transitions = deque(maxlen=20)  # recent (epoch, from state, to state)
+        self.listeners = []
+        self.lock = threading.Lock()
+
+    def allow(self) -> bool:
+        """Determines whether a call to the source may proceed
+
+        :return: False if caller should fail fast
+        """
+
+        change = None
+        with self.lock:
+            if self.state == "open":
+                if time.time() - self.opened_at < self.cooldown:
+                    return False
+                change = self._transition("half_open")
+
+            allowed = True
+            if self.state == "half_open":
+                if self.trials >= self.half_open_calls:
+                    if time.time() - self.trial_at < self.cooldown:
+                        allowed = False
+                    else:
+                        logger.warning(
+                            "Circuit breaker %s: trial calls unanswered - retrying", self.name
+                        )
+                        self.trials = self.trial_successes
+                if allowed:
+                    self.trials += 1
+                    self.trial_at = time.time()
+
+        self._notify(change)
+        return allowed
+
+    def record(self, success: bool) -> None:
+        """Records the outcome of a call to the source
+
+        :param success: whether the call succeeded
+        """
+
+        change = None
+        with self.lock:
+            if self.state == "half_open":
+                if not success:
+                    change = self._transition("open")
+                else:
+                    self.trial_successes += 1
+                    if self.trial_successes >= self.half_open_calls:
+                        change = self._transition("closed")
+            else:
+                self.outcomes.append(not success)
+                if (
+                    self.state == "closed"
+                    and len(self.outcomes) >= self.min_calls
+                    and sum(self.outcomes) / len(self.outcomes) >= self.failure_rate
+                ):
+                    change = self._transition("open")
+
+        self._notify(change)
+
+    def reset(self) -> None:
+        """Returns breaker to the closed state and forgets recorded outcomes"""
+
+        with self.lock:
+            self.state = "closed"
+            self.outcomes.clear()
+            self.trials = 0
+            self.trial_successes = 0
+
+    def add_listener(self, fx: Callable[[str, str, str], None]) -> None:
+        """Registers a function called with (name, from state, to state) on every state change
+
+        :param fx: listener function
+        """
+
+        self.listeners.append(fx)
+
+    def stats(self) -> dict:
+        """Exports current state of breaker
+
+        :return: dict of state, failure rate over window and recent transitions
+        """
+
+        with self.lock:
+            return {
+                "state": self.state,
+                "calls": len(self.outcomes),
+                "failure_rate": sum(self.outcomes) / len(self.outcomes)
+                if self.outcomes
+                else 0,
+                "transitions": list(self.transitions),
+            }
+
+    def _transition(self, state: Literal["closed", "open", "half_open"]) -> Tuple[str, str]:
+        """Changes state of breaker (lock must be held)
+
+        :param state: new state
+        :return: tuple of (from state, to state) to pass to _notify once the lock is released
+        """
+
+        prev_state, self.state = self.state, state
+        self.trials = 0
+        self.trial_successes = 0
+        if state == "open":
+            self.opened_at = time.time()
+        elif state == "closed":
+            self.outcomes.clear()
+
+        self.transitions.append((time.time(), prev_state, state))
+        return prev_state, state
+
+    def _notify(self, change: Tuple[str, str]) -> None:
+        """Logs a state change and calls listeners (lock must not be held)
+
+        :param change: tuple of (from state, to state) returned by _transition, None if unchanged
+        """
+
+        if change is None:
+            return
+
+        prev_state, state = change
+        logger.warning("Circuit breaker %s: %s -> %s", self.name, prev_state, state)
+        for fx in self.listeners:
+            try:
+                fx(self.name, prev_state, state)
+            except Exception as e:
+                logger.error("Circuit breaker listener failed for %s: %s", self.name, e)
+
+
+def is_failure_status(status_code: int) -> bool:
+    """Determines whether an HTTP status counts as a failure of the source
+
+    :param status_code: HTTP status of response
+    :return: True for server errors, timeouts, rate limiting and blocking (403)
+    """
+
+    return status_code >= 500 or status_code in _FAILURE_STATUSES
+
+
+def get_breaker(name: str, **kwargs) -> CircuitBreaker:
+    """Obtains the process-wide breaker for a data source, creating it on first use
+
+    :param name: name of data source
+    :return: CircuitBreaker shared by all threads
+    """
+
+    with _REGISTRY_LOCK:
+        if name not in _BREAKERS:
+            _BREAKERS[name] = CircuitBreaker(name, **kwargs)
+
+        return _BREAKERS[name]
+
+
+def breaker_stats() -> Dict[str, dict]:
+    """Exports state of all breakers
+
+    :return: dict of {source name: stats}
+    """
+
+    with _REGISTRY_LOCK:
+        breakers = list(_BREAKERS.values())
+
+    return {breaker.name: breaker.stats() for breaker in breakers}
@@ -0,0 +1,204 @@
+"""
+cassette.py - Contains the Cassette class which records/replays HTTP responses of data sources
+
+Enabled through environment variables:
+    PC_CASSETTE_MODE: "record" or "replay" (unset/anything else disables the layer)
+    PC_CASSETTE_PATH: cassette file, defaults to cassette.jsonl.gz
+    PC_CASSETTE_LATENCY: set to 1 to sleep for the recorded latency when replaying
+
+Responses are keyed by method, URL path and sorted params (host, headers and credential params
+are ignored so rotating QT api servers and tokens replay the same way). Repeated requests for
+the same key replay in recorded order, repeating the last response once exhausted. Recording
+replaces any existing cassette at the path so each file holds a single run. Credentials in
+recorded JSON bodies (OAuth tokens) are redacted.
+"""
+
+from urllib.parse import urlencode, urlparse, parse_qsl
+from typing import Literal
+import requests
+import atexit
+import gzip
+import json
+import os
+import threading
+import time
+import logging
+
+logger = logging.getLogger(__name__)
+
+_FLUSH_EVERY = 500  # recorded responses buffered before writing to disk
+_KEY_IGNORED_PARAMS = {"refresh_token"}  # rotate between runs
+_REDACTED_FIELDS = {"access_token", "refresh_token"}
+
+
+class Cassette:
+    """A class to organize recording and replaying of HTTP responses"""
+
+    def __init__(self, path: str, mode: Literal["record", "replay"], latency: bool = False) -> None:
+        """Constructor method
+
+        :param path: cassette file (gzipped JSON lines)
+        :param mode: whether responses are recorded or replayed
+        :param latency: set to True to simulate recorded latency on replay, defaults to False
+        """
+
+        self.path = path
+        self.mode = mode
+        self.latency = latency
+        self.lock = threading.Lock()
+        self.buffer = []
+        self.entries = {}  # {key: [recorded responses]}
+        self.positions = {}  # {key: index of next response to replay}
+        self.flushed = False  # first flush of a recording truncates the file
+
+        if mode == "replay":
+            self.load()
+        else:
+            atexit.register(self.flush)
+
+    @staticmethod
+    def key(method: str, url: str, params: dict = None) -> str:
+        """Builds cassette key of a request
+
+        :param method: HTTP method
+        :param url: request url (may include a query string)
+        :param params: request params, defaults to None
+        :return: key
+        """
+
+        parsed = urlparse(url)
+        query = [
+            (str(k), str(v))
+            for k, v in parse_qsl(parsed.query) + list((params or {}).items())
+            if k not in _KEY_IGNORED_PARAMS
+        ]
+        return f"{method.upper()} {parsed.path} {urlencode(sorted(query))}"
+
+    @staticmethod
+    def redact(body: str) -> str:
+        """Replaces credentials in a JSON response body
+
+        :param body: response body
+        :return: body with values of _REDACTED_FIELDS replaced (non-JSON bodies unchanged)
+        """
+
+        try:
+            doc = json.loads(body)
+        except ValueError:
+            return body
+
+        if not isinstance(doc, dict) or not _REDACTED_FIELDS & doc.keys():
+            return body
+
+        return json.dumps({k: "redacted" if k in _REDACTED_FIELDS else v for k, v in doc.items()})
+
+    def load(self) -> None:
+        """Loads recorded responses"""
+
+        with gzip.open(self.path, "rt") as f:
+            for line in f:
+                entry = json.loads(line)
+                self.entries.setdefault(entry["key"], []).append(entry)
+
+        logger.info("Loaded cassette %s with %s keys.", self.path, len(self.entries))
+
+    def record(self, method: str, url: str, params: dict, res: requests.Response, latency: float) -> None:
+        """Buffers a response to be written to the cassette
+
+        :param method: HTTP method
+        :param url: request url
+        :param params: request params
+        :param res: response received
+        :param latency: seconds taken by request
+        """
+
+        entry = {
+            "key": self.key(method, url, params),
+            "ts": time.time(),
+            "status": res.status_code,
+            "content_type": res.headers.get("Content-Type"),
+            "body": self.redact(res.text),
+            "latency": round(latency, 4),
+        }
+        with self.lock:
+            self.buffer.append(entry)
+            flush = len(self.buffer) >= _FLUSH_EVERY
+
+        if flush:
+            self.flush()
+
+    def flush(self) -> None:
+        """Writes buffered responses to the cassette"""
+
+        with self.lock:
+            buffer, self.buffer = self.buffer, []
+            if not buffer:
+                return
+
+            # later flushes append a gzip member - readers see a single stream
+            with gzip.open(self.path, "at" if self.flushed else "wt") as f:
+                for entry in buffer:
+                    f.write(json.dumps(entry, separators=(",", ":")) + "\n")
+            self.flushed = True
+
+        logger.debug("Flushed %s responses to cassette %s.", len(buffer), self.path)
+
+    def replay(self, method: str, url: str, params: dict = None) -> requests.Response:
+        """Obtains the next recorded response of a request
+
+        :param method: HTTP method
+        :param url: request url
+        :param params: request params, defaults to None
+        :raises requests.exceptions.ConnectionError: raised when the request was never recorded
+        :return: recorded response
+        """
+
+        key = self.key(method, url, params)
+        with self.lock:
+            entries = self.entries.get(key)
+            if not entries:
+                raise requests.exceptions.ConnectionError(f"No recorded response for {key}")
+            i = self.positions.get(key, 0)
+            self.positions[key] = i + 1
+            entry = entries[min(i, len(entries) - 1)]
+
+        if self.latency:
+            time.sleep(entry["latency"])
+
+        res = requests.models.Response()
+        res.status_code = entry["status"]
+        res._content = entry["body"].encode()
+        res.encoding = "utf-8"
+        res.url = url
+        if entry["content_type"]:
+            res.headers["Content-Type"] = entry["content_type"]
+
+        return res
+
+
+_CASSETTE = None
+_CASSETTE_LOCK = threading.Lock()
+
+
+def get_cassette() -> Cassette:
+    """Obtains the process-wide cassette configured via environment variables
+
+    :return: Cassette, None if record/replay is disabled
+    """
+
+    global _CASSETTE
+
+    mode = os.environ.get("PC_CASSETTE_MODE")
+    if mode not in ("record", "replay"):
+        return None
+
+    with _CASSETTE_LOCK:
+        if _CASSETTE is None or _CASSETTE.mode != mode:
+            _CASSETTE = Cassette(
+                os.environ.get("PC_CASSETTE_PATH", "cassette.jsonl.gz"),
+                mode,
+                latency=os.environ.get("PC_CASSETTE_LATENCY") == "1",
+            )
+            logger.info("HTTP cassette enabled: %s %s", mode, _CASSETTE.path)
+
+        return _CASSETTE
@@ -0,0 +1,130 @@
+"""
+codec.py - Compact binary encoding of partition results with S3 spill-over for large results
+
+Results are packed with msgpack and compressed with zstd (pyarrow's codec). Lambda responses
+must be JSON, so encoded results travel base64-encoded inside a small envelope:
+    {"codec": "msgpack+zstd", "data": "<base64>"}
+Results larger than PC_RESULT_SPILL_BYTES once encoded are written to S3 instead and only a
+pointer is returned, keeping responses under Lambda's payload cap:
+    {"codec": "msgpack+zstd", "s3_key": "results/<uuid>.msgpack.zst", "size": 1234}
+Spilled results are deleted by unpack_result once read. Results whose caller never reads them
+(e.g. the invoking Lambda timed out) are left behind, so the bucket should expire the results/
+prefix with an S3 lifecycle rule (1 day is plenty).
+"""
+
+from datetime import date, datetime
+from decimal import Decimal
+import pyarrow as pa
+import msgpack
+import base64
+import io
+import os
+import struct
+import uuid
+import logging
+
+logger = logging.getLogger(__name__)
+
+_CODEC = "msgpack+zstd"
+_SPILL_BYTES = int(os.environ.get("PC_RESULT_SPILL_BYTES", 4 * 1024 * 1024))
+_SPILL_PREFIX = "results/"
+_HEADER = struct.Struct("<Q")  # uncompressed size (zstd decompression needs it up front)
+
+
+def _default(obj: object) -> object:
+    """Converts types msgpack does not support natively
+
+    :param obj: object to convert
+    :return: msgpack serializable equivalent
+    """
+
+    if isinstance(obj, (datetime, date)):
+        return obj.isoformat()
+    if isinstance(obj, Decimal):
+        return float(obj)
+    if hasattr(obj, "tolist"):  # NumPy arrays/scalars
+        return obj.tolist()
+
+    return str(obj)
+
+
+def encode(obj: object) -> bytes:
+    """Encodes an object as zstd-compressed msgpack
+
+    :param obj: object to encode
+    :return: encoded bytes
+    """
+
+    packed = msgpack.packb(obj, default=_default, use_bin_type=True)
+    return _HEADER.pack(len(packed)) + pa.compress(packed, codec="zstd", asbytes=True)
+
+
+def decode(data: bytes) -> object:
+    """Decodes bytes produced by encode
+
+    :param data: encoded bytes
+    :return: decoded object
+    """
+
+    (size,) = _HEADER.unpack_from(data)
+    packed = pa.decompress(data[_HEADER.size :], size, codec="zstd", asbytes=True)
+    return msgpack.unpackb(packed, raw=False, strict_map_key=False)
+
+
+def is_envelope(obj: object) -> bool:
+    """Determines whether an object is an encoded result envelope
+
+    :param obj: object to check
+    :return: whether obj was produced by pack_result
+    """
+
+    return isinstance(obj, dict) and obj.get("codec") == _CODEC
+
+
+def pack_result(obj: object, s3: object, spill_bytes: int = None) -> dict:
+    """Encodes a result into an envelope, spilling it to S3 if too large
+
+    :param obj: result to encode
+    :param s3: AWSClient for s3 used for spill-over
+    :param spill_bytes: encoded size above which results spill to S3, defaults to PC_RESULT_SPILL_BYTES
+    :return: envelope dict (JSON serializable)
+    :raises RuntimeError: if a result too large to return inline could not be spilled to S3
+    """
+
+    data = encode(obj)
+    if len(data) <= (_SPILL_BYTES if spill_bytes is None else spill_bytes):
+        return {"codec": _CODEC, "data": base64.b64encode(data).decode()}
+
+    s3_key = f"{_SPILL_PREFIX}{uuid.uuid4().hex}.msgpack.zst"
+    if not s3.pc_s3_upload(io.BytesIO(data), s3_key):
+        # returning it inline could exceed Lambda's 6 MB response limit
+        raise RuntimeError(f"Could not spill {len(data)} byte result to {s3_key}")
+    logger.info("Spilled %s byte result to %s.", len(data), s3_key)
+
+    return {"codec": _CODEC, "s3_key": s3_key, "size": len(data)}
+
+
+def unpack_result(obj: object, s3: object) -> object:
+    """Decodes an envelope produced by pack_result (other objects are returned unchanged)
+
+    Spilled results are deleted from S3 once read.
+
+    :param obj: envelope or plain result
+    :param s3: AWSClient for s3 used to read spilled results
+    :return: decoded result, None if a spilled result could not be read
+    """
+
+    if not is_envelope(obj):
+        return obj
+
+    if "data" in obj:
+        return decode(base64.b64decode(obj["data"]))
+
+    data = s3.pc_s3_get(obj["s3_key"])
+    if data is None:
+        return None
+
+    try:
+        return decode(data)
+    finally:
+        s3.pc_s3_del(obj["s3_key"])
@@ -6,6 +6,7 @@ NOTE: this file has had many functions removed from it
 
 from app.config import _TABLES, _SOURCES_BONDS, _SOURCES_INDICES
 from app.utils.decorators import retry_db
+from app.utils.dbstats import InstrumentedCursor
 
 from datetime import datetime, timedelta
 import json
@@ -32,7 +33,9 @@ class DB:
             "keepalives_interval": 5,
             "keepalives_count": 5,
         }
-        self.conn = psycopg2.connect(conn_string, **keepalive_kwargs)
+        self.conn = psycopg2.connect(
+            conn_string, cursor_factory=InstrumentedCursor, **keepalive_kwargs
+        )
         logger.debug("DB connection initiated.")
 
     @retry_db
@@ -119,6 +122,27 @@ class DB:
 
         return str(row[0]) if row else None
 
+    @retry_db
+    def get_qids(self, yf_tickers: List[str]) -> dict:
+        """Extracts QT symbol ids for many yf_tickers in a single query
+
+        :param yf_tickers: tickers in YF format
+        :return: dict of {yf_ticker: QT symbol id} (tickers without an id are omitted)
+        """
+
+        with self.conn.cursor() as cur:
+            cur.execute(
+                """
+                SELECT symbol, q_id
+                FROM public."_point"
+                WHERE symbol = ANY(%s) AND q_id IS NOT NULL
+                """,
+                [list(yf_tickers)],
+            )
+            rows = cur.fetchall()
+
+        return {symbol: str(q_id) for symbol, q_id in rows}
+
     @retry_db
     def get_point_by_currency(self, currency: Literal["CAD", "USD"]) -> List:
         """Extracts point symbols based on their currency.
@@ -142,6 +166,51 @@ class DB:
 
         return rows
 
+    @retry_db
+    def get_point_since(self, mod_date: datetime = None) -> Tuple[List[str], List[Tuple]]:
+        """Extracts point rows modified after a timestamp
+
+        :param mod_date: only rows with a later mod_date are returned, defaults to None (all rows)
+        :return: tuple of (column names, rows)
+        """
+
+        with self.conn.cursor() as cur:
+            if mod_date is None:
+                cur.execute('SELECT * FROM public."_point"')
+            else:
+                cur.execute(
+                    """
+                    SELECT *
+                    FROM public."_point"
+                    WHERE mod_date > %s
+                    """,
+                    [mod_date],
+                )
+            col_names = [col[0] for col in cur.description]
+            rows = cur.fetchall()
+
+        self.conn.commit()
+
+        return col_names, rows
+
+    def ping(self) -> bool:
+        """Checks whether the connection is still usable
+
+        :return: False if the connection is closed or a trivial query fails
+        """
+
+        if self.conn.closed:
+            return False
+
+        try:
+            with self.conn.cursor() as cur:
+                cur.execute("SELECT 1")
+            self.conn.rollback()
+            return True
+        except psycopg2.Error as e:
+            logger.warning("DB connection unhealthy: %s", e)
+            return False
+
     def close(self):
         """Terminates database connection"""
 
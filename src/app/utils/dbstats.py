@@ -0,0 +1,199 @@
+"""
+dbstats.py - Instrumentation of DB queries: per-query-shape latency, rows and retries with N+1 detection
+"""
+
+from typing import List
+import psycopg2
+import psycopg2.extensions
+import re
+import threading
+import time
+import logging
+
+logger = logging.getLogger(__name__)
+
+_N_PLUS_ONE_THRESHOLD = 10  # identical query shapes per invocation before flagging
+
+_LOCAL = threading.local()
+
+
+def fingerprint(query: object) -> str:
+    """Normalizes a query to its shape (literals and whitespace removed)
+
+    :param query: SQL query (str, bytes or psycopg2 Composable)
+    :return: normalized query
+    """
+
+    if isinstance(query, bytes):
+        query = query.decode()
+    query = str(query)
+
+    query = re.sub(r"'(?:[^']|'')*'", "?", query)  # string literals
+    query = re.sub(r"\b\d+(\.\d+)?\b", "?", query)  # numeric literals
+    query = re.sub(r"\(\s*(?:\?|%s)(?:\s*,\s*(?:\?|%s))*\s*\)", "(...)", query)  # value lists
+    return re.sub(r"\s+", " ", query).strip().lower()
+
+
+class QueryStats:
+    """A class to organize query statistics for the current invocation"""
+
+    def __init__(self) -> None:
+        """Constructor method"""
+
+        self.lock = threading.Lock()
+        self.reset()
+
+    def reset(self) -> None:
+        """Clears statistics (call at the start of each invocation)"""
+
+        with self.lock:
+            self.started = time.time()
+            self.queries = {}  # {fingerprint: stats}
+            self.retries = {}  # {method: stats}
+
+    def record_query(self, query: object, latency: float, rows: int) -> None:
+        """Records an executed query
+
+        :param query: SQL query
+        :param latency: seconds taken by execute
+        :param rows: rows returned/affected (-1 if unknown)
+        """
+
+        fp = fingerprint(query)
+        method = getattr(_LOCAL, "method", None)
+        with self.lock:
+            stats = self.queries.setdefault(
+                fp,
+                {"count": 0, "total_s": 0.0, "max_s": 0.0, "rows": 0, "methods": set()},
+            )
+            stats["count"] += 1
+            stats["total_s"] += latency
+            stats["max_s"] = max(stats["max_s"], latency)
+            stats["rows"] += max(rows, 0)
+            if method:
+                stats["methods"].add(method)
+
+    def record_retry(self, method: str, backoff: float) -> None:
+        """Records a retry_db retry
+
+        :param method: name of DB method retried
+        :param backoff: seconds slept before retrying
+        """
+
+        with self.lock:
+            stats = self.retries.setdefault(method, {"retries": 0, "backoff_s": 0.0})
+            stats["retries"] += 1
+            stats["backoff_s"] += backoff
+
+    def n_plus_one(self, threshold: int = _N_PLUS_ONE_THRESHOLD) -> List[dict]:
+        """Flags query shapes repeated often enough to be N+1 candidates
+
+        :param threshold: min executions of a shape, defaults to 10
+        :return: list of {query, count, total_s, methods} sorted by count
+        """
+
+        with self.lock:
+            candidates = [
+                {
+                    "query": fp,
+                    "count": stats["count"],
+                    "total_s": round(stats["total_s"], 4),
+                    "methods": sorted(stats["methods"]),
+                }
+                for fp, stats in self.queries.items()
+                if stats["count"] >= threshold
+            ]
+
+        return sorted(candidates, key=lambda c: -c["count"])
+
+    def summary(self, top: int = 10) -> dict:
+        """Summarizes statistics of the invocation
+
+        :param top: number of slowest query shapes to include, defaults to 10
+        :return: dict of totals, top query shapes, retries and N+1 candidates
+        """
+
+        with self.lock:
+            queries = sorted(self.queries.items(), key=lambda q: -q[1]["total_s"])
+            total_count = sum(stats["count"] for _, stats in queries)
+            total_s = sum(stats["total_s"] for _, stats in queries)
+            top_queries = [
+                {
+                    "query": fp[:200],
+                    "count": stats["count"],
+                    "total_s": round(stats["total_s"], 4),
+                    "max_s": round(stats["max_s"], 4),
+                    "rows": stats["rows"],
+                }
+                for fp, stats in queries[:top]
+            ]
+            retries = {method: dict(stats) for method, stats in self.retries.items()}
+
+        return {
+            "queries": total_count,
+            "query_s": round(total_s, 4),
+            "shapes": len(queries),
+            "top": top_queries,
+            "retries": retries,
+            "n_plus_one": self.n_plus_one(),
+        }
+
+    def log_summary(self) -> None:
+        """Logs summary of the invocation, warning about N+1 candidates"""
+
+        summary = self.summary()
+        logger.info(
+            "DB: %s queries (%s shapes) in %ss, retries: %s",
+            summary["queries"],
+            summary["shapes"],
+            summary["query_s"],
+            summary["retries"],
+        )
+        for query in summary["top"]:
+            logger.info("DB query: %s", query)
+        for candidate in summary["n_plus_one"]:
+            logger.warning("DB N+1 candidate: %s", candidate)
+
+
+_STATS = QueryStats()
+
+
+def get_stats() -> QueryStats:
+    """Obtains the process-wide query statistics
+
+    :return: QueryStats
+    """
+
+    return _STATS
+
+
+class method_scope:
+    """Context manager attributing queries on this thread to a DB method"""
+
+    def __init__(self, method: str) -> None:
+        self.method = method
+
+    def __enter__(self) -> None:
+        self.prev = getattr(_LOCAL, "method", None)
+        _LOCAL.method = self.method
+
+    def __exit__(self, *args) -> None:
+        _LOCAL.method = self.prev
+
+
+class InstrumentedCursor(psycopg2.extensions.cursor):
+    """psycopg2 cursor recording latency and rows of every executed query"""
+
+    def execute(self, query: object, vars: object = None) -> None:
+        start = time.perf_counter()
+        try:
+            return super().execute(query, vars)
+        finally:
+            _STATS.record_query(query, time.perf_counter() - start, self.rowcount)
+
+    def executemany(self, query: object, vars_list: object) -> None:
+        start = time.perf_counter()
+        try:
+            return super().executemany(query, vars_list)
+        finally:
+            _STATS.record_query(query, time.perf_counter() - start, self.rowcount)
@@ -4,6 +4,7 @@ decorators.py - Contains decorators utilized throughout the script
 
 from app.utils.driver import terminate_driver
 from app.utils.notify import send_email
+from app.utils.dbstats import get_stats, method_scope
 
 import os
 from datetime import datetime
@@ -38,7 +39,8 @@ def retry_db(func: object) -> None:
                 raise ValueError(err_msg)
 
             try:
-                return func(*args, **kwargs)
+                with method_scope(func.__name__):
+                    return func(*args, **kwargs)
 
             except psycopg2.Error as e:
                 # check if error codes pertain to serialization errors
@@ -51,6 +53,7 @@ def retry_db(func: object) -> None:
                     logger.info("SERIALIZATION FAILURE: RETRYING TXN")
                     sleep_ms = (2**retries) * 0.1 * (random.random() + 0.5)
                     logger.info("Sleeping {} seconds".format(sleep_ms))
+                    get_stats().record_retry(func.__name__, sleep_ms)
                     time.sleep(sleep_ms)
                     continue
                 else:
@@ -0,0 +1,140 @@
+"""
+logs.py - Non-blocking structured logging: records are queued by the calling thread and
+formatted/written as JSON lines by a background listener thread
+
+Repetitive errors (e.g. the same per-ticker exception handler firing for thousands of
+tickers during a source outage) are rate limited per call site: the first _BURST records of
+a call site in each _WINDOW are kept, after that only 1 in _SAMPLE_EVERY, and the number of
+suppressed records is reported on the next record let through.
+"""
+
+from logging.handlers import QueueHandler, QueueListener
+from typing import List
+import json
+import logging
+import queue
+import threading
+import time
+
+_BURST = 20  # records per call site per window logged in full
+_WINDOW = 60  # seconds
+_SAMPLE_EVERY = 100  # 1 in N records logged once a call site exceeds its burst
+_RATE_LIMITED_LEVEL = logging.WARNING  # lower levels are never rate limited
+
+_LISTENER = None
+_LISTENER_LOCK = threading.Lock()
+
+
+class JSONFormatter(logging.Formatter):
+    """Formats records as single-line JSON documents"""
+
+    def format(self, record: logging.LogRecord) -> str:
+        doc = {
+            "ts": round(record.created, 3),
+            "level": record.levelname,
+            "logger": record.name,
+            "loc": f"{record.filename}:{record.funcName}:{record.lineno}",
+            "msg": record.getMessage(),
+        }
+        if record.exc_info:
+            doc["exc"] = self.formatException(record.exc_info)
+        elif record.exc_text:
+            doc["exc"] = record.exc_text
+        if getattr(record, "aws_request_id", None):
+            doc["request_id"] = record.aws_request_id
+        if getattr(record, "suppressed", 0):
+            doc["suppressed"] = record.suppressed
+
+        return json.dumps(doc, default=str)
+
+
+class RateLimitFilter(logging.Filter):
+    """Limits records of WARNING and above per call site, sampling once over the limit"""
+
+    def __init__(
+        self, burst: int = _BURST, window: float = _WINDOW, sample_every: int = _SAMPLE_EVERY
+    ) -> None:
+        super().__init__()
+        self.burst = burst
+        self.window = window
+        self.sample_every = sample_every
+        self.sites = {}  # {(pathname, lineno): [window start, count, suppressed]}
+        self.lock = threading.Lock()
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if record.levelno < _RATE_LIMITED_LEVEL:
+            return True
+
+        now = time.time()
+        with self.lock:
+            site = self.sites.get((record.pathname, record.lineno))
+            if site is None or now - site[0] >= self.window:
+                site = self.sites[(record.pathname, record.lineno)] = [now, 0, 0]
+
+            site[1] += 1
+            if site[1] > self.burst and (site[1] - self.burst) % self.sample_every:
+                site[2] += 1
+                return False
+
+            record.suppressed, site[2] = site[2], 0
+            return True
+
+
+class _LazyQueueHandler(QueueHandler):
+    """Queues records as-is so message/traceback formatting happens on the listener thread"""
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        return record
+
+
+def setup_logging(
+    level: int = logging.INFO, handlers: List[logging.Handler] = None
+) -> QueueListener:
+    """Routes root logger records through a queue to JSON-formatted handlers
+
+    Existing root handlers (e.g. the one installed by the Lambda runtime) are moved behind the queue.
+
+    :param level: root log level, defaults to logging.INFO
+    :param handlers: additional handlers to write to, defaults to None
+    :return: QueueListener writing queued records
+    """
+
+    global _LISTENER
+
+    root = logging.getLogger()
+    root.setLevel(level)
+
+    with _LISTENER_LOCK:
+        if _LISTENER is not None:
+            return _LISTENER
+
+        targets = [h for h in root.handlers if not isinstance(h, QueueHandler)]
+        targets += handlers or []
+        formatter = JSONFormatter()
+        for handler in targets:
+            handler.setFormatter(formatter)
+            root.removeHandler(handler)
+
+        log_queue = queue.SimpleQueue()
+        queue_handler = _LazyQueueHandler(log_queue)
+        queue_handler.addFilter(RateLimitFilter())
+        root.addHandler(queue_handler)
+
+        _LISTENER = QueueListener(log_queue, *targets, respect_handler_level=True)
+        _LISTENER.start()
+
+    return _LISTENER
+
+
+def flush_logs() -> None:
+    """Writes all queued records (call before returning from lambda_handler)"""
+
+    with _LISTENER_LOCK:
+        if _LISTENER is None:
+            return
+
+        # stop() drains the queue and joins the listener thread
+        _LISTENER.stop()
+        for handler in _LISTENER.handlers:
+            handler.flush()
+        _LISTENER.start()
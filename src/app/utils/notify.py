@@ -13,10 +13,12 @@ from sendgrid.helpers.mail import (
 )
 
 import pandas as pd
+import numpy as np
 import base64
 import os
 import magic
 from typing import List
+from functools import lru_cache
 import traceback
 import logging
 
@@ -101,31 +103,153 @@ def send_error(to: List, script_name: str, e: str, tb: str, extra: str = "") ->
     send_email(to, f"FAILED SCRIPT: {script_name.upper()}", html_content=html_content)
 
 
-def df_html_point(df_original: pd.DataFrame) -> str:
+@lru_cache(maxsize=32)
+def _html_row_template(num_cols: int) -> str:
+    """Builds (and caches) the html template for a single table row
+
+    :param num_cols: number of data columns in the table (excluding index)
+    :return: format string expecting the index followed by each column value
+    """
+
+    cells = "".join("\n      <td>{}</td>" for _ in range(num_cols))
+    return "    <tr>\n      <th>{}</th>" + cells + "\n    </tr>\n"
+
+
+def _format_number_col(col: pd.Series, comma: bool = False) -> pd.Series:
+    """Vectorized equivalent of mapping "{:.0f}" / "{:,.0f}" over a column
+
+    :param col: numeric column to format
+    :param comma: set to True to add thousands separators, defaults to False
+    :return: column of formatted strings
+    """
+
+    values = pd.to_numeric(col, errors="coerce")
+    is_na = values.isna()
+    formatted = values.fillna(0).round().astype("int64").astype(str)
+    if comma:
+        formatted = formatted.str.replace(r"\B(?=(\d{3})+$)", ",", regex=True)
+
+    return formatted.mask(is_na, "nan")
+
+
+def _format_float_col(values: np.ndarray, digits: int = 6) -> np.ndarray:
+    """Formats a float column like DataFrame.to_html (display.precision digits, trailing zeros
+    trimmed to a common precision, scientific notation for tiny or long values)
+
+    :param values: float values
+    :param digits: number of decimals, defaults to 6
+    :return: array of cell strings
+    """
+
+    is_na = np.isnan(values)
+    finite = np.isfinite(values)
+    cells = np.char.mod(f"% .{digits}f", values)
+
+    # drop the trailing zeros shared by all finite values, keeping at least one decimal
+    if finite.any():
+        lengths = np.char.str_len(cells[finite])
+        zeros = lengths - np.char.str_len(np.char.rstrip(cells[finite], "0"))
+        trim = min(int(zeros.min()), digits - 1)
+        if trim:
+            cells = np.char.mod(f"% .{digits - trim}f", values)
+
+    abs_values = np.abs(values[finite])
+    too_long = finite.any() and np.char.str_len(cells[finite]).max() > digits + 6
+    if ((abs_values < 10 ** -digits) & (abs_values > 0)).any() or (
+        too_long and (abs_values > 1e6).any()
+    ):
+        cells = np.char.mod(f"% .{digits}e", values)
+
+    cells = np.char.strip(cells)
+    return np.where(is_na, "NaN", cells).astype(object)
+
+
+def _format_col(col: pd.Series) -> np.ndarray:
+    """Formats a column the way DataFrame.to_html does (without escaping)
+
+    :param col: column to format
+    :return: array of cell strings
+    """
+
+    if pd.api.types.is_float_dtype(col.dtype):
+        return _format_float_col(col.to_numpy(dtype=float))
+
+    if pd.api.types.is_datetime64_any_dtype(col.dtype):
+        # dates only if every value is at midnight, like to_html
+        times = col.dropna()
+        fmt = "%Y-%m-%d"
+        if (times.dt.microsecond != 0).any():
+            fmt += " %H:%M:%S.%f"
+        elif (times != times.dt.normalize()).any():
+            fmt += " %H:%M:%S"
+        return col.dt.strftime(fmt).fillna("NaT").to_numpy(dtype=object)
+
+    # missing values other than None (kept as "None" by to_html) render as NaN
+    values = col.to_numpy(dtype=object)
+    return col.astype(str).mask(col.isna() & (values != None), "NaN").to_numpy(dtype=object)
+
+
+def df_html_point(
+    df_original: pd.DataFrame, max_rows: int = None, offset: int = 0
+) -> str:
     """Helper function to clean up and return html of point dataframes
 
     :param df_original: Dataframe to clean
+    :param max_rows: max number of rows to render (remaining rows are summarized), defaults to None
+    :param offset: first row to render - use with max_rows to paginate, defaults to 0
     :return: string representing html of dataframe table
     """
 
-    df = df_original.copy()
-    df = df.reset_index(drop=True)
+    total_rows = len(df_original)
+    offset = min(max(offset, 0), total_rows)
+    end = total_rows if max_rows is None else min(offset + max_rows, total_rows)
+    df = df_original.iloc[offset:end]
 
     number_cols = ["q_id"]  # number only: e.g. 4000
     number_comma_cols = ["volume", "market_cap"]  # num with comma: e.g. 10,000
 
-    for col in number_cols:
-        if col in df.columns:
-            df[col] = df[col].map("{:.0f}".format)
-
-    for col in number_comma_cols:
-        if col in df.columns:
-            df[col] = df[col].map("{:,.0f}".format)
+    # build each column as an array of strings
+    columns = [str(col) for col in df.columns]
+    col_arrays = []
+    for col in df.columns:
+        if col in number_cols:
+            col_arrays.append(_format_number_col(df[col]).to_numpy())
+        elif col in number_comma_cols:
+            col_arrays.append(_format_number_col(df[col], comma=True).to_numpy())
+        else:
+            col_arrays.append(_format_col(df[col]))
 
     if not df.empty:
-        df["link"] = df.apply(
-            lambda x: f'<a href="https://ca.finance.yahoo.com/quote/{x.symbol}" target="_blank">Link</a>',
-            axis=1,
+        columns.append("link")
+        col_arrays.append(
+            (
+                '<a href="https://ca.finance.yahoo.com/quote/'
+                + df["symbol"].astype(str)
+                + '" target="_blank">Link</a>'
+            ).to_numpy()
         )
 
-    return df.to_html(escape=False)
+    # write rows straight from column arrays
+    header = "".join(f"\n      <th>{col}</th>" for col in columns)
+    row_template = _html_row_template(len(columns))
+    body = "".join(
+        row_template.format(*row)
+        for row in zip(range(offset, end), *col_arrays)
+    )
+
+    footer = ""
+    if offset < end and end - offset < total_rows:
+        footer = f"\n<div>Showing rows {offset} to {end - 1} of {total_rows}.</div>"
+
+    return (
+        '<table border="1" class="dataframe">\n'
+        "  <thead>\n"
+        '    <tr style="text-align: right;">\n'
+        f"      <th></th>{header}\n"
+        "    </tr>\n"
+        "  </thead>\n"
+        "  <tbody>\n"
+        f"{body}"
+        "  </tbody>\n"
+        f"</table>{footer}"
+    )
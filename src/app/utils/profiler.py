@@ -0,0 +1,78 @@
+"""
+profiler.py - On-demand cProfile profiling of lambda invocations
+
+Enabled per invocation with "profile": true in the event, or for every invocation with the
+PC_PROFILE=1 environment variable. Disabled invocations call straight through (no profiler
+is created). Raw profiles are written to /tmp and uploaded to S3 under PC_PROFILE_PREFIX
+(defaults to profiles/) for inspection with pstats/snakeviz - uploaded profiles are removed
+from /tmp so they do not pile up across warm invocations.
+
+cProfile only sees the thread that called profile_call. Work fanned out to thread pools
+(e.g. partition scraping) shows up as time spent waiting on futures, not as the functions run
+by the workers - use the latency/breaker stats logged per invocation for those.
+"""
+
+from app.utils.aws import AWSClient
+
+from typing import Any, Callable
+import cProfile
+import io
+import os
+import pstats
+import re
+import time
+import logging
+
+logger = logging.getLogger(__name__)
+
+_PROFILE_DIR = "/tmp"
+_TOP_N = 25  # functions listed in logged summary
+
+
+def profiling_enabled(event: dict) -> bool:
+    """Determines whether an invocation should be profiled
+
+    :param event: lambda event
+    :return: True if requested by the event or the PC_PROFILE environment variable
+    """
+
+    return bool(event.get("profile")) or os.environ.get("PC_PROFILE") == "1"
+
+
+def profile_call(name: str, fx: Callable, *args, **kwargs) -> Any:
+    """Runs a function under cProfile, saving/uploading the profile and logging a summary
+
+    :param name: name of profiled work (used in the profile's file name and S3 key)
+    :param fx: function to profile
+    :return: return value of fx
+    """
+
+    profiler = cProfile.Profile()
+    start = time.time()
+    try:
+        return profiler.runcall(fx, *args, **kwargs)
+    finally:
+        elapsed = time.time() - start
+        try:
+            name = re.sub(r"[^\w.-]", "_", name)
+            stamp = time.strftime("%Y%m%d-%H%M%S", time.gmtime(start))
+            path = os.path.join(_PROFILE_DIR, f"{name}-{stamp}.prof")
+            profiler.dump_stats(path)
+
+            summary = io.StringIO()
+            stats = pstats.Stats(profiler, stream=summary)
+            stats.sort_stats("cumulative").print_stats(_TOP_N)
+            logger.info("Profile of %s (%.2fs) saved to %s", name, elapsed, path)
+            logger.info(summary.getvalue())
+
+            if os.environ.get("BUCKET_NAME"):
+                s3_key = f"{os.environ.get('PC_PROFILE_PREFIX', 'profiles/')}{name}/{stamp}.prof"
+                try:
+                    if AWSClient("s3").pc_s3_upload(path, s3_key, max_concurrency=1):
+                        logger.info("Profile of %s uploaded to %s", name, s3_key)
+                    else:
+                        logger.warning("Profile of %s could not be uploaded to %s", name, s3_key)
+                finally:
+                    os.remove(path)
+        except Exception as e:
+            logger.error("Failed to save profile of %s: %s", name, e, exc_info=True)
@@ -0,0 +1,161 @@
+"""
+runtime.py - Contains the RuntimeContext class which shares QT, DB and AWS resources across warm invocations
+"""
+
+from app.data.qt import QT
+from app.utils.db import DB
+from app.utils.aws import AWSClient
+from app.data.universe import UniverseIndex
+from app.data.qt_master import SymbolMaster
+from app.data.qt_cache import SymbolInfoCache
+
+import os
+import threading
+import logging
+
+logger = logging.getLogger(__name__)
+
+_RUNTIME = None
+_RUNTIME_LOCK = threading.Lock()
+
+
+class RuntimeContext:
+    """A class to organize resources created once per container and reused by warm invocations
+
+    Resources are created lazily on first access. check() validates existing resources cheaply
+    at the start of each invocation and drops unhealthy ones so they are rebuilt on next use.
+    """
+
+    def __init__(self) -> None:
+        """Constructor method"""
+
+        self.lock = threading.Lock()
+        self._qt = None
+        self._db = None
+        self._clients = {}  # {client type: AWSClient}
+        self._universe = None
+        self._symbols = None
+        self._symbol_cache = None
+        self.invocations = 0
+        self.rebuilds = {"qt": 0, "db": 0}
+
+    @property
+    def qt(self) -> QT:
+        """Shared QT instance (authenticated on first use)"""
+
+        with self.lock:
+            if self._qt is None:
+                self._qt = QT()
+                self.rebuilds["qt"] += 1
+
+                # symbol info lookups of every user of the shared QT go through the cache
+                if self._symbol_cache is None:
+                    self._symbol_cache = SymbolInfoCache(
+                        self._qt, os.environ.get("QT_SYMBOL_CACHE_BACKEND", "file")
+                    )
+                self._symbol_cache.attach(self._qt)
+            return self._qt
+
+    @property
+    def db(self) -> DB:
+        """Shared DB instance (connected on first use)"""
+
+        with self.lock:
+            if self._db is None:
+                self._db = DB()
+                self.rebuilds["db"] += 1
+            return self._db
+
+    @property
+    def universe(self) -> UniverseIndex:
+        """Shared index of _point (loaded on first use, refreshed incrementally once stale)"""
+
+        with self.lock:
+            if self._universe is None:
+                self._universe = UniverseIndex()
+            universe = self._universe
+
+        universe.maybe_refresh(self.db)
+        return universe
+
+    @property
+    def symbols(self) -> SymbolMaster:
+        """Shared QT symbol master (loaded from S3 on first use)"""
+
+        with self.lock:
+            if self._symbols is None:
+                self._symbols = SymbolMaster()
+                self._symbols.load()
+            symbols = self._symbols
+
+        # QT may have been rebuilt since the last invocation
+        symbols.qt = self.qt
+        return symbols
+
+    def aws(self, client_type: str) -> AWSClient:
+        """Obtains shared AWSClient of a type
+
+        :param client_type: AWS client type (s3, lambda, ...)
+        :return: AWSClient
+        """
+
+        with self.lock:
+            if client_type not in self._clients:
+                self._clients[client_type] = AWSClient(client_type)
+            return self._clients[client_type]
+
+    def check(self) -> None:
+        """Validates existing resources, dropping unhealthy ones to be rebuilt on next use"""
+
+        with self.lock:
+            self.invocations += 1
+
+            if self._qt is not None and not self._qt.is_healthy():
+                logger.info("QT credentials stale - re-authenticating on next use.")
+                self._qt = None
+
+            if self._db is not None and not self._db.ping():
+                logger.info("DB connection unhealthy - reconnecting on next use.")
+                try:
+                    self._db.close()
+                except Exception:
+                    logger.debug("DB connection could not be closed.", exc_info=True)
+                self._db = None
+
+        # AWSClients wrap the process-wide boto3 client cache - nothing to validate
+
+    def persist(self) -> None:
+        """Saves state worth keeping for the next invocation (call at the end of an invocation)"""
+
+        with self.lock:
+            symbol_cache = self._symbol_cache
+
+        if symbol_cache is not None:
+            symbol_cache.save()
+
+    def stats(self) -> dict:
+        """Exports reuse statistics of the container
+
+        :return: dict of invocations served and resources built
+        """
+
+        with self.lock:
+            return {"invocations": self.invocations, "rebuilds": dict(self.rebuilds)}
+
+
+def get_runtime() -> RuntimeContext:
+    """Obtains the process-wide runtime context, creating it on first use
+
+    Partition processing (app.utils.scrape.process_partition) and scripts obtain QT, DB and AWS
+    clients from here instead of constructing their own, so warm invocations reuse them.
+
+    :return: RuntimeContext shared by all invocations of the container
+    """
+
+    global _RUNTIME
+
+    with _RUNTIME_LOCK:
+        if _RUNTIME is None:
+            _RUNTIME = RuntimeContext()
+
+        return _RUNTIME
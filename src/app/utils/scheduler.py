@@ -0,0 +1,250 @@
+"""
+scheduler.py - Contains the MarketClock and SessionScheduler classes which decide which exchanges to process each cycle
+
+Session hours (including early closes and holidays) come from pandas_market_calendars, as in
+mktdays.py. The current time comes from the local clock corrected by an offset calibrated
+against QT's server time once per container, instead of a v1/time round trip per check, and is
+expressed in the exchanges' timezone (Toronto and New York share the same offset and DST rules).
+"""
+
+from datetime import datetime, timedelta, timezone
+from functools import lru_cache
+from typing import Dict, List, Literal, Tuple
+import pandas_market_calendars as mcal
+import threading
+import time
+import logging
+
+logger = logging.getLogger(__name__)
+
+# calendar each exchange trades on
+_EXCHANGE_CALENDARS = {
+    "nasdaq": "NYSE",
+    "nyse": "NYSE",
+    "tsx": "TSX",
+    "tsxv": "TSX",
+    "cse": "TSX",
+}
+_RECALIBRATE_INTERVAL = 6 * 60 * 60  # seconds before the QT clock offset is re-measured
+_CLOCK_CALENDAR = "TSX"  # calendar whose timezone (America/Toronto) the clock reports
+
+# minutes before open / after close during which exchanges are polled at the slow interval
+_PRE_OPEN_WINDOW = 15
+_POST_CLOSE_WINDOW = 15
+
+# seconds between runs of an exchange in each phase (None: skip)
+_PHASE_INTERVALS = {
+    "open": 60,
+    "pre_open": 300,
+    "post_close": 300,
+    "closed": None,
+}
+
+_PHASE_LITERAL = Literal["open", "pre_open", "post_close", "closed"]
+
+
+@lru_cache(maxsize=None)
+def _calendar(name: str) -> object:
+    """Obtains (cached) pandas_market_calendars calendar
+
+    :param name: calendar name
+    :return: MarketCalendar
+    """
+
+    return mcal.get_calendar(name)
+
+
+class MarketClock:
+    """A class to organize the local clock corrected to QT server time"""
+
+    def __init__(self) -> None:
+        """Constructor method"""
+
+        self.lock = threading.Lock()
+        self.offset = 0.0  # seconds to add to local time
+        self.tz = _calendar(_CLOCK_CALENDAR).tz
+        self.calibrated_at = 0
+
+    def calibrate(self, qt: object) -> None:
+        """Measures offset of local clock from QT server time
+
+        If QT is unavailable the previous offset is kept and the next check retries.
+
+        :param qt: QT instance
+        """
+
+        start = time.time()
+        res = qt.get_req("v1/time", {})
+        end = time.time()
+
+        if not res:
+            logger.warning("QT time unavailable - using uncalibrated local clock.")
+            return
+
+        qt_time = datetime.fromisoformat(res["time"])
+        with self.lock:
+            # QT stamped its time roughly halfway through the round trip
+            self.offset = qt_time.timestamp() - (start + end) / 2
+            self.calibrated_at = end
+        logger.info("Calibrated clock against QT: offset %.3fs", self.offset)
+
+    def is_calibrated(self) -> bool:
+        """Determines whether the offset was measured recently
+
+        :return: False if a (re-)calibration is due
+        """
+
+        return time.time() - self.calibrated_at < _RECALIBRATE_INTERVAL
+
+    def now(self) -> datetime:
+        """Obtains current QT time
+
+        :return: timezone-aware datetime in the exchanges' timezone
+        """
+
+        with self.lock:
+            return datetime.fromtimestamp(time.time() + self.offset, self.tz)
+
+
+_CLOCK = MarketClock()
+
+
+def get_clock() -> MarketClock:
+    """Obtains the process-wide market clock
+
+    :return: MarketClock
+    """
+
+    return _CLOCK
+
+
+@lru_cache(maxsize=64)
+def session(calendar: str, date: str) -> Tuple[datetime, datetime]:
+    """Obtains regular session hours of a calendar on a date
+
+    :param calendar: pandas_market_calendars calendar name (e.g. "NYSE")
+    :param date: date in YYYY-MM-DD format
+    :return: tuple of (open, close) in UTC, None if the market is closed that day
+    """
+
+    schedule = _calendar(calendar).schedule(start_date=date, end_date=date)
+    if schedule.empty:
+        return None
+
+    row = schedule.iloc[0]
+    return (
+        row["market_open"].to_pydatetime().astimezone(timezone.utc),
+        row["market_close"].to_pydatetime().astimezone(timezone.utc),
+    )
+
+
+class SessionScheduler:
+    """A class to organize per-cycle decisions of which exchanges to run and how often"""
+
+    def __init__(
+        self,
+        exchanges: List[str] = None,
+        intervals: Dict[str, int] = None,
+        clock: MarketClock = None,
+    ) -> None:
+        """Constructor method
+
+        :param exchanges: exchanges to schedule, defaults to every known exchange
+        :param intervals: overrides of seconds between runs per phase, defaults to None
+        :param clock: market clock, defaults to the process-wide clock
+        """
+
+        self.exchanges = exchanges or list(_EXCHANGE_CALENDARS.keys())
+        self.intervals = {**_PHASE_INTERVALS, **(intervals or {})}
+        self.clock = clock or _CLOCK
+
+    def phase(self, exchange: str, now: datetime = None) -> _PHASE_LITERAL:
+        """Determines trading phase of an exchange
+
+        :param exchange: exchange name
+        :param now: time to check, defaults to current QT time
+        :return: phase of exchange
+        """
+
+        now = (now or self.clock.now()).astimezone(timezone.utc)
+        calendar = _EXCHANGE_CALENDARS[exchange]
+        hours = session(calendar, self._local_date(calendar, now))
+        if hours is None:
+            return "closed"
+
+        mkt_open, mkt_close = hours
+        if mkt_open <= now < mkt_close:
+            return "open"
+        if mkt_open - timedelta(minutes=_PRE_OPEN_WINDOW) <= now < mkt_open:
+            return "pre_open"
+        if mkt_close <= now < mkt_close + timedelta(minutes=_POST_CLOSE_WINDOW):
+            return "post_close"
+
+        return "closed"
+
+    def plan(self, now: datetime = None) -> Dict[str, dict]:
+        """Determines phase and run interval of every exchange
+
+        :param now: time to plan for, defaults to current QT time
+        :return: dict of {exchange: {"phase": phase, "interval": seconds or None}}
+        """
+
+        now = now or self.clock.now()
+        plan = {}
+        for exchange in self.exchanges:
+            phase = self.phase(exchange, now)
+            plan[exchange] = {"phase": phase, "interval": self.intervals[phase]}
+
+        return plan
+
+    def due(self, last_runs: Dict[str, float], now: datetime = None) -> List[str]:
+        """Determines which exchanges should be run this cycle
+
+        :param last_runs: dict of {exchange: epoch time of last run} (missing: never run)
+        :param now: time of cycle, defaults to current QT time
+        :return: list of exchanges due to run
+        """
+
+        now = now or self.clock.now()
+        due = []
+        for exchange, entry in self.plan(now).items():
+            interval = entry["interval"]
+            if interval is None:
+                continue
+            if now.timestamp() - last_runs.get(exchange, 0) >= interval:
+                due.append(exchange)
+
+        return due
+
+    def next_open(self, exchange: str, now: datetime = None, max_days: int = 10) -> datetime:
+        """Finds start of the next pre-open window of an exchange (to sleep until)
+
+        :param exchange: exchange name
+        :param now: time to search from, defaults to current QT time
+        :param max_days: max days to search ahead, defaults to 10
+        :return: UTC datetime, None if no session within max_days
+        """
+
+        now = (now or self.clock.now()).astimezone(timezone.utc)
+        calendar = _EXCHANGE_CALENDARS[exchange]
+        for days in range(max_days + 1):
+            hours = session(calendar, self._local_date(calendar, now + timedelta(days=days)))
+            if hours is None:
+                continue
+
+            start = hours[0] - timedelta(minutes=_PRE_OPEN_WINDOW)
+            if hours[1] > now:
+                return max(start, now)
+
+        return None
+
+    @staticmethod
+    def _local_date(calendar: str, now: datetime) -> str:
+        """Obtains the date at an exchange calendar's location
+
+        :param calendar: pandas_market_calendars calendar name
+        :param now: timezone-aware datetime
+        :return: date in YYYY-MM-DD format
+        """
+
+        return now.astimezone(_calendar(calendar).tz).strftime("%Y-%m-%d")
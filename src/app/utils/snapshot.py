@@ -0,0 +1,257 @@
+"""
+snapshot.py - Contains the SnapshotCache class which caches scrape results so retried/re-run partitions skip completed work
+
+Snapshots are addressed by everything that determines a source's result (ticker, exchange,
+ordered fields and extra call arguments) and are fresh for their source's TTL after being
+written. Expired local snapshots are evicted periodically; S3 snapshots are removed by evict()
+(or a bucket lifecycle rule).
+"""
+
+from app.utils.aws import AWSClient
+
+from botocore.exceptions import ClientError
+from typing import Callable, List, Literal, Tuple
+import gzip
+import hashlib
+import json
+import os
+import threading
+import time
+import logging
+
+logger = logging.getLogger(__name__)
+
+# freshness (in seconds) of cached results for each per-ticker source
+_SOURCE_TTLS = {
+    "qt.get_mkt_quote": 60,
+    "qt.get_symbol_info": 6 * 60 * 60,
+    "nq.get_quote_nq": 15 * 60,
+}
+_DEFAULT_TTL = 5 * 60
+_EVICT_INTERVAL = 10 * 60  # min seconds between automatic evictions of local snapshots
+
+
+class SnapshotCache:
+    """A class to organize caching of per-ticker/per-partition scrape results in S3 or a local directory"""
+
+    def __init__(
+        self,
+        backend: Literal["s3", "local"] = "s3",
+        root: str = None,
+        ttls: dict = None,
+    ) -> None:
+        """Constructor method
+
+        :param backend: where snapshots are stored, defaults to "s3"
+        :param root: S3 key prefix or local directory, defaults to SNAPSHOT_CACHE_ROOT env var
+        :param ttls: overrides of freshness TTLs (seconds) per source, defaults to None
+        """
+
+        self.backend = backend
+        default_root = "snapshots" if backend == "s3" else "/tmp/snapshots"
+        self.root = root or os.environ.get("SNAPSHOT_CACHE_ROOT", default_root)
+        self.ttls = {**_SOURCE_TTLS, **(ttls or {})}
+        self.s3 = AWSClient("s3") if backend == "s3" else None
+        self.evicted_at = 0
+
+    def key(self, ticker: str, source: str, fields: List[str], args: list = None) -> str:
+        """Builds content-addressed key for a snapshot
+
+        :param ticker: ticker (or partition id) the snapshot belongs to
+        :param source: name of data source (e.g. "qt.get_mkt_quote")
+        :param fields: fields requested from source, in call order (results are stored in that order)
+        :param args: anything else the source's result depends on (JSON serializable), defaults to None
+        :return: key of snapshot
+        """
+
+        digest = hashlib.sha256(
+            json.dumps([ticker, source, list(fields), args], default=str).encode()
+        ).hexdigest()[:32]
+
+        return f"{self.root}/{source}/{digest}.json.gz"
+
+    def get(
+        self, ticker: str, source: str, fields: List[str], args: list = None
+    ) -> object:
+        """Obtains a fresh snapshot if one exists
+
+        :param ticker: ticker (or partition id) the snapshot belongs to
+        :param source: name of data source
+        :param fields: fields requested from source
+        :param args: see key, defaults to None
+        :return: cached results, None if no snapshot younger than the source's TTL exists
+        """
+
+        key = self.key(ticker, source, fields, args)
+        try:
+            data = self._read(key)
+            if data is not None:
+                snapshot = json.loads(gzip.decompress(data))
+                if time.time() - snapshot["ts"] < self.ttls.get(source, _DEFAULT_TTL):
+                    return snapshot["results"]
+        except Exception as e:
+            logger.error("Snapshot read error for %s: %s", key, e, exc_info=True)
+
+        return None
+
+    def put(
+        self,
+        ticker: str,
+        source: str,
+        fields: List[str],
+        results: object,
+        args: list = None,
+    ) -> None:
+        """Stores snapshot of scrape results
+
+        :param ticker: ticker (or partition id) the snapshot belongs to
+        :param source: name of data source
+        :param fields: fields requested from source
+        :param results: JSON serializable results to cache
+        :param args: see key, defaults to None
+        """
+
+        key = self.key(ticker, source, fields, args)
+        data = gzip.compress(
+            json.dumps(
+                {"ticker": ticker, "ts": time.time(), "results": results},
+                separators=(",", ":"),
+                default=str,
+            ).encode()
+        )
+
+        try:
+            self._write(key, data)
+        except Exception as e:
+            logger.error("Snapshot write error for %s: %s", key, e, exc_info=True)
+
+        if self.backend == "local" and time.time() - self.evicted_at >= _EVICT_INTERVAL:
+            self.evict()
+
+    def evict(self) -> int:
+        """Removes snapshots older than their source's TTL
+
+        :return: number of snapshots removed
+        """
+
+        self.evicted_at = time.time()
+        now = time.time()
+        expired = []
+        try:
+            for key, modified in self._list():
+                source = key[len(self.root) + 1 :].split("/")[0]
+                if now - modified >= self.ttls.get(source, _DEFAULT_TTL):
+                    expired.append(key)
+
+            if self.backend == "s3":
+                failed = set(self.s3.pc_s3_del_batch(expired))
+                expired = [key for key in expired if key not in failed]
+            else:
+                for key in expired:
+                    # another process may have evicted it already
+                    if os.path.exists(key):
+                        os.remove(key)
+        except Exception as e:
+            logger.error("Snapshot eviction error under %s: %s", self.root, e, exc_info=True)
+            return 0
+
+        logger.debug("Evicted %d expired snapshots.", len(expired))
+        return len(expired)
+
+    def wrap(self, source: str, fx: Callable) -> Callable:
+        """Wraps a per-ticker DataHandler source function (handler, info, ...) to serve results from the cache
+
+        The handler's exchange and any extra arguments (e.g. force_search) are part of the key.
+        Results that are entirely None (failed extractions) are not cached so they are retried.
+        Calls without a handler (e.g. exchange searches by prefix) bypass the cache.
+
+        :param source: name of data source (determines TTL)
+        :param fx: source function taking (handler, info, *args) and returning a list
+        :return: function with the same signature as fx
+        """
+
+        def wrapper(handler: object, info: List, *args, **kwargs) -> List:
+            if not hasattr(handler, "tickers"):
+                return fx(handler, info, *args, **kwargs)
+
+            ticker = handler.tickers["yf"]
+            key_args = [getattr(handler, "exchange", None), args, sorted(kwargs.items())]
+            results = self.get(ticker, source, info, key_args)
+            if results is not None:
+                return results
+
+            results = fx(handler, info, *args, **kwargs)
+            if any(r is not None for r in results):
+                self.put(ticker, source, info, results, key_args)
+
+            return results
+
+        return wrapper
+
+    def _read(self, key: str) -> bytes:
+        """Reads raw snapshot bytes from the backend
+
+        :param key: key of snapshot
+        :return: bytes of snapshot, None if missing
+        """
+
+        if self.backend == "s3":
+            try:
+                s3_res = self.s3.op_client("get_object").get_object(
+                    Bucket=os.environ.get("BUCKET_NAME"), Key=key
+                )
+                return s3_res["Body"].read()
+            except ClientError as e:
+                if e.response["Error"]["Code"] in ("NoSuchKey", "404"):
+                    return None
+                raise e
+
+        if not os.path.exists(key):
+            return None
+        with open(key, "rb") as f:
+            return f.read()
+
+    def _list(self) -> List[Tuple[str, float]]:
+        """Lists snapshots in the backend
+
+        :return: list of (key, epoch time last modified)
+        """
+
+        snapshots = []
+        if self.backend == "s3":
+            paginator = self.s3.client.get_paginator("list_objects_v2")
+            for page in paginator.paginate(
+                Bucket=os.environ.get("BUCKET_NAME"), Prefix=f"{self.root}/"
+            ):
+                snapshots += [
+                    (obj["Key"], obj["LastModified"].timestamp())
+                    for obj in page.get("Contents", [])
+                ]
+        elif os.path.isdir(self.root):
+            for dir_path, _, names in os.walk(self.root):
+                for name in names:
+                    if name.endswith(".json.gz"):
+                        path = os.path.join(dir_path, name)
+                        snapshots.append((path, os.path.getmtime(path)))
+
+        return snapshots
+
+    def _write(self, key: str, data: bytes) -> None:
+        """Writes raw snapshot bytes to the backend
+
+        :param key: key of snapshot
+        :param data: bytes of snapshot
+        """
+
+        if self.backend == "s3":
+            self.s3.op_client("upload_file").put_object(
+                Bucket=os.environ.get("BUCKET_NAME"), Key=key, Body=data
+            )
+            return
+
+        # write to temp file first so concurrent readers never see partial snapshots
+        os.makedirs(os.path.dirname(key), exist_ok=True)
+        tmp_path = f"{key}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(tmp_path, "wb") as f:
+            f.write(data)
+        os.replace(tmp_path, key)
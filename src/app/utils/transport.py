@@ -0,0 +1,257 @@
+"""
+transport.py - Shared HTTP path for data sources with per-endpoint adaptive timeouts and hedged requests
+"""
+
+from app.utils.cassette import get_cassette
+
+from collections import deque
+from typing import Dict
+import concurrent.futures
+import requests
+import threading
+import time
+import logging
+
+logger = logging.getLogger(__name__)
+
+_DEFAULT_TIMEOUT = 30  # used until an endpoint has enough samples
+_MIN_TIMEOUT = 2
+_MIN_SAMPLES = 20
+_TIMEOUT_MULTIPLIER = 3  # timeout = p99 * multiplier
+_HEDGE_PERCENTILE = 95  # hedge once the first request is slower than this
+_HEDGE_RATIO = 0.05  # max extra requests sent as hedges (fraction of requests)
+_HEDGE_BURST = 5  # max hedge tokens accumulated
+_MAX_HEDGES_IN_FLIGHT = 8
+
+_TRACKERS = {}
+_TRACKERS_LOCK = threading.Lock()
+_EXECUTOR = concurrent.futures.ThreadPoolExecutor(
+    max_workers=64, thread_name_prefix="http"
+)
+
+
+class LatencyTracker:
+    """A class to organize recent latencies of an endpoint and the hedging budget derived from them"""
+
+    def __init__(self, endpoint: str, window: int = 500) -> None:
+        """Constructor method
+
+        :param endpoint: name of endpoint (e.g. "nq.summary")
+        :param window: number of most recent latencies kept, defaults to 500
+        """
+
+        self.endpoint = endpoint
+        self.samples = deque(maxlen=window)
+        self.hedge_tokens = 0.0
+        self.hedges_in_flight = 0
+        self.lock = threading.Lock()
+
+    def record(self, latency: float) -> None:
+        """Records latency of a completed (or timed out) request
+
+        :param latency: seconds taken
+        """
+
+        with self.lock:
+            self.samples.append(latency)
+            self.hedge_tokens = min(self.hedge_tokens + _HEDGE_RATIO, _HEDGE_BURST)
+
+    def percentile(self, pct: float) -> float:
+        """Computes latency percentile over the window
+
+        :param pct: percentile in [0, 100]
+        :return: latency in seconds, None if not enough samples
+        """
+
+        with self.lock:
+            if len(self.samples) < _MIN_SAMPLES:
+                return None
+            samples = sorted(self.samples)
+
+        return samples[min(int(len(samples) * pct / 100), len(samples) - 1)]
+
+    def timeout(self) -> float:
+        """Computes adaptive timeout (p99 * multiplier, clamped)
+
+        :return: timeout in seconds
+        """
+
+        p99 = self.percentile(99)
+        if p99 is None:
+            return _DEFAULT_TIMEOUT
+
+        return min(max(p99 * _TIMEOUT_MULTIPLIER, _MIN_TIMEOUT), _DEFAULT_TIMEOUT)
+
+    def acquire_hedge(self) -> bool:
+        """Takes a hedge token if the extra-load budget allows
+
+        :return: whether a hedge request may be sent
+        """
+
+        with self.lock:
+            if self.hedge_tokens < 1 or self.hedges_in_flight >= _MAX_HEDGES_IN_FLIGHT:
+                return False
+            self.hedge_tokens -= 1
+            self.hedges_in_flight += 1
+            return True
+
+    def release_hedge(self) -> None:
+        """Marks a hedge request as completed"""
+
+        with self.lock:
+            self.hedges_in_flight -= 1
+
+    def stats(self) -> dict:
+        """Exports latency stats of endpoint
+
+        :return: dict of sample count, p50/p95/p99 and current timeout
+        """
+
+        return {
+            "samples": len(self.samples),
+            "p50": self.percentile(50),
+            "p95": self.percentile(95),
+            "p99": self.percentile(99),
+            "timeout": self.timeout(),
+        }
+
+
+def get_tracker(endpoint: str) -> LatencyTracker:
+    """Obtains the process-wide latency tracker of an endpoint
+
+    :param endpoint: name of endpoint
+    :return: LatencyTracker shared by all threads
+    """
+
+    with _TRACKERS_LOCK:
+        if endpoint not in _TRACKERS:
+            _TRACKERS[endpoint] = LatencyTracker(endpoint)
+
+        return _TRACKERS[endpoint]
+
+
+def latency_stats() -> Dict[str, dict]:
+    """Exports latency stats of all endpoints
+
+    :return: dict of {endpoint: stats}
+    """
+
+    with _TRACKERS_LOCK:
+        trackers = list(_TRACKERS.values())
+
+    return {tracker.endpoint: tracker.stats() for tracker in trackers}
+
+
+def reset_trackers() -> None:
+    """Forgets latencies of all endpoints"""
+
+    with _TRACKERS_LOCK:
+        _TRACKERS.clear()
+
+
+def get(endpoint: str, url: str, hedge: bool = False, **kwargs) -> requests.Response:
+    """Sends GET request with the endpoint's adaptive timeout, optionally hedged
+
+    A hedged request sends a duplicate once the first has been outstanding longer than the
+    endpoint's p95 latency (within the hedging budget); whichever answers first wins.
+    Only hedge idempotent requests.
+
+    :param endpoint: name of endpoint latencies are tracked under (e.g. "nq.summary")
+    :param url: GET url
+    :param hedge: set to True to allow a hedge request, defaults to False
+    :raises requests.exceptions.RequestException: raised when all requests failed
+    :return: response of first request to complete
+    """
+
+    # record/replay layer (see app.utils.cassette)
+    cassette = get_cassette()
+    if cassette is not None and cassette.mode == "replay":
+        return cassette.replay("GET", url, kwargs.get("params"))
+
+    start = time.perf_counter()
+    res = _send(endpoint, url, hedge, **kwargs)
+    if cassette is not None:
+        cassette.record("GET", url, kwargs.get("params"), res, time.perf_counter() - start)
+
+    return res
+
+
+def post(endpoint: str, url: str, **kwargs) -> requests.Response:
+    """Sends POST request with the endpoint's adaptive timeout (never hedged)
+
+    :param endpoint: name of endpoint latencies are tracked under (e.g. "qt.oauth")
+    :param url: POST url
+    :raises requests.exceptions.RequestException: raised when the request failed
+    :return: response
+    """
+
+    # record/replay layer (see app.utils.cassette)
+    cassette = get_cassette()
+    if cassette is not None and cassette.mode == "replay":
+        return cassette.replay("POST", url, kwargs.get("params"))
+
+    tracker = get_tracker(endpoint)
+    start = time.perf_counter()
+    res = _timed_request(tracker, "POST", url, tracker.timeout(), **kwargs)
+    if cassette is not None:
+        cassette.record("POST", url, kwargs.get("params"), res, time.perf_counter() - start)
+
+    return res
+
+
+def _send(endpoint: str, url: str, hedge: bool, **kwargs) -> requests.Response:
+    """Sends GET request with the endpoint's adaptive timeout, optionally hedged (see get)
+
+    :param endpoint: name of endpoint latencies are tracked under
+    :param url: GET url
+    :param hedge: set to True to allow a hedge request
+    :return: response of first request to complete
+    """
+
+    tracker = get_tracker(endpoint)
+    timeout = tracker.timeout()
+    hedge_delay = tracker.percentile(_HEDGE_PERCENTILE) if hedge else None
+
+    if hedge_delay is None:
+        return _timed_request(tracker, "GET", url, timeout, **kwargs)
+
+    futures = [_EXECUTOR.submit(_timed_request, tracker, "GET", url, timeout, **kwargs)]
+    done, _ = concurrent.futures.wait(futures, timeout=hedge_delay)
+    if not done and tracker.acquire_hedge():
+        logger.debug("Hedging %s request after %.2fs: %s", endpoint, hedge_delay, url)
+        hedge_future = _EXECUTOR.submit(_timed_request, tracker, "GET", url, timeout, **kwargs)
+        hedge_future.add_done_callback(lambda _: tracker.release_hedge())
+        futures.append(hedge_future)
+
+    error = None
+    for future in concurrent.futures.as_completed(futures):
+        try:
+            return future.result()
+        except Exception as e:
+            error = e
+
+    raise error
+
+
+def _timed_request(
+    tracker: LatencyTracker, method: str, url: str, timeout: float, **kwargs
+) -> requests.Response:
+    """Sends request and records its latency
+
+    :param tracker: tracker of endpoint
+    :param method: HTTP method
+    :param url: request url
+    :param timeout: timeout in seconds
+    :return: response
+    """
+
+    start = time.perf_counter()
+    try:
+        res = requests.request(method, url, timeout=timeout, **kwargs)
+    except requests.exceptions.Timeout:
+        # censored sample - keeps timeouts from shrinking while an endpoint is slow
+        tracker.record(timeout)
+        raise
+
+    tracker.record(time.perf_counter() - start)
+    return res
@@ -0,0 +1,326 @@
+"""
+tsstore.py - Contains the TSStore class which stores intraday metrics as Parquet files partitioned by date and exchange
+
+Layout: {root}/date=YYYY-MM-DD/exchange={exchange}/{part|compacted}-{uuid}.parquet
+Files are sorted by (ticker, ts) so row group statistics allow pruning on ticker and time.
+"""
+
+from app.utils.aws import AWSClient
+
+import pyarrow as pa
+import pyarrow.dataset as ds
+import pyarrow.parquet as pq
+import pandas as pd
+from datetime import date, datetime, timedelta, timezone
+from typing import List, Literal, Union
+import io
+import os
+import uuid
+import logging
+
+logger = logging.getLogger(__name__)
+
+_ROW_GROUP_SIZE = 64 * 1024
+
+
+class _S3RangeFile(io.RawIOBase):
+    """Seekable read-only file over an S3 object which fetches byte ranges on demand
+
+    Lets Parquet readers pull only the footer and the row groups they need.
+    """
+
+    def __init__(self, s3: AWSClient, s3_key: str, size: int) -> None:
+        """Constructor method
+
+        :param s3: AWSClient for s3
+        :param s3_key: key of object
+        :param size: size of object in bytes
+        """
+
+        self.s3 = s3
+        self.s3_key = s3_key
+        self.size = size
+        self.pos = 0
+
+    def readable(self) -> bool:
+        return True
+
+    def seekable(self) -> bool:
+        return True
+
+    def tell(self) -> int:
+        return self.pos
+
+    def seek(self, offset: int, whence: int = io.SEEK_SET) -> int:
+        if whence == io.SEEK_CUR:
+            offset += self.pos
+        elif whence == io.SEEK_END:
+            offset += self.size
+        self.pos = max(0, min(offset, self.size))
+        return self.pos
+
+    def readinto(self, buffer: bytearray) -> int:
+        if self.pos >= self.size or len(buffer) == 0:
+            return 0
+
+        end = min(self.pos + len(buffer), self.size) - 1
+        data = self.s3.pc_s3_get_range(self.s3_key, self.pos, end)
+        if data is None:
+            raise IOError(f"Failed to read {self.s3_key} [{self.pos}-{end}]")
+
+        buffer[: len(data)] = data
+        self.pos += len(data)
+        return len(data)
+
+
+class TSStore:
+    """A class to organize reading/writing of partitioned intraday metric files"""
+
+    def __init__(self, backend: Literal["s3", "local"] = "s3", root: str = None) -> None:
+        """Constructor method
+
+        :param backend: where files are stored, defaults to "s3"
+        :param root: S3 key prefix or local directory, defaults to TS_STORE_ROOT env var
+        """
+
+        self.backend = backend
+        default_root = "tsstore" if backend == "s3" else "/tmp/tsstore"
+        self.root = root or os.environ.get("TS_STORE_ROOT", default_root)
+        self.s3 = AWSClient("s3") if backend == "s3" else None
+
+    def write(self, records: Union[pd.DataFrame, List[dict]]) -> List[str]:
+        """Appends metrics as a new file in each (date, exchange) partition
+
+        :param records: rows containing at least ts, ticker and exchange columns (e.g. process_partition results)
+        :return: list of paths/keys of written files (partitions that failed to write are left out)
+        """
+
+        df = records if isinstance(records, pd.DataFrame) else pd.DataFrame(records)
+        if df.empty:
+            return []
+
+        df = df.copy()
+        df["ts"] = pd.to_datetime(df["ts"], utc=True)
+        df["exchange"] = df["exchange"].str.lower()
+        df["date"] = df["ts"].dt.strftime("%Y-%m-%d")
+
+        paths = []
+        for (dt_str, exchange), group in df.groupby(["date", "exchange"]):
+            group = group.drop(columns=["date", "exchange"])
+            group = group.sort_values(["ticker", "ts"])
+            table = pa.Table.from_pandas(group, preserve_index=False)
+
+            path = self._partition(dt_str, exchange) + f"/part-{uuid.uuid4().hex}.parquet"
+            try:
+                self.write_table(table, path)
+            except IOError as e:
+                logger.error("Metrics for %s/%s were not written: %s", dt_str, exchange, e)
+                continue
+            paths.append(path)
+
+        logger.info("Wrote %s metric rows to %s partitions.", len(df), len(paths))
+        return paths
+
+    def read(
+        self,
+        start: datetime,
+        end: datetime,
+        tickers: List[str] = None,
+        exchanges: List[str] = None,
+        columns: List[str] = None,
+    ) -> pd.DataFrame:
+        """Reads metrics within [start, end), pushing ticker/time predicates down to the Parquet reader
+
+        :param start: start of time range (naive datetimes are treated as UTC)
+        :param end: end of time range (exclusive)
+        :param tickers: tickers to include, defaults to None (all)
+        :param exchanges: exchanges to include (case-insensitive), defaults to None (all)
+        :param columns: metric columns to include (ts and ticker always included), defaults to None (all)
+        :return: dataframe of metrics with an exchange column
+        """
+
+        start, end = _to_utc(start), _to_utc(end)
+        expr = (ds.field("ts") >= pa.scalar(start, pa.timestamp("ns", "UTC"))) & (
+            ds.field("ts") < pa.scalar(end, pa.timestamp("ns", "UTC"))
+        )
+        if tickers:
+            expr = expr & ds.field("ticker").isin(tickers)
+
+        if columns:
+            columns = ["ts", "ticker"] + [c for c in columns if c not in ("ts", "ticker")]
+
+        tables = []
+        for dt in _date_range(start.date(), end.date()):
+            for exchange, paths in self._list_partition(dt, exchanges).items():
+                for path in paths:
+                    table = self.read_table(path, expr, columns)
+                    if table.num_rows:
+                        table = table.append_column(
+                            "exchange", pa.array([exchange] * table.num_rows)
+                        )
+                        tables.append(table)
+
+        if not tables:
+            return pd.DataFrame(columns=(columns or ["ts", "ticker"]) + ["exchange"])
+
+        table = pa.concat_tables(tables, promote=True)
+        return table.to_pandas().sort_values(["ticker", "ts"]).reset_index(drop=True)
+
+    def compact(self, dt: date, exchange: str) -> str:
+        """Merges all files in a (date, exchange) partition into a single sorted file
+
+        :param dt: date of partition
+        :param exchange: exchange of partition
+        :return: path/key of compacted file, None if nothing to compact or the merged file was not written
+        """
+
+        exchange = exchange.lower()
+        paths = self._list_partition(dt, [exchange]).get(exchange, [])
+        if len(paths) < 2:
+            return None
+
+        tables = [self.read_table(path) for path in paths]
+        table = pa.concat_tables(tables, promote=True)
+        table = table.sort_by([("ticker", "ascending"), ("ts", "ascending")])
+
+        # write merged file before removing parts so no rows are ever missing
+        path = (
+            self._partition(dt.strftime("%Y-%m-%d"), exchange)
+            + f"/compacted-{uuid.uuid4().hex}.parquet"
+        )
+        try:
+            self.write_table(table, path)
+        except IOError as e:
+            logger.error("Compaction of %s/%s aborted - parts kept: %s", dt, exchange, e)
+            return None
+
+        if self.backend == "s3":
+            failed = self.s3.pc_s3_del_batch(paths)
+            if failed:
+                logger.error("Compaction left %s stale files: %s", len(failed), failed)
+        else:
+            for old_path in paths:
+                os.remove(old_path)
+
+        logger.info("Compacted %s files into %s.", len(paths), path)
+        return path
+
+    def _partition(self, dt_str: str, exchange: str) -> str:
+        """Builds path/key prefix of a partition
+
+        :param dt_str: date in YYYY-MM-DD format
+        :param exchange: exchange of partition
+        :return: path/key prefix
+        """
+
+        return f"{self.root}/date={dt_str}/exchange={exchange}"
+
+    def _list_partition(self, dt: date, exchanges: List[str] = None) -> dict:
+        """Lists files of a date's partitions
+
+        :param dt: date of partitions
+        :param exchanges: exchanges to include, defaults to None (all)
+        :return: dict of {exchange: [path/key]}
+        """
+
+        prefix = f"{self.root}/date={dt.strftime('%Y-%m-%d')}/"
+        # partitions are written with lowercase exchanges
+        exchanges = {exchange.lower() for exchange in exchanges or []}
+        partitions = {}
+        for key in self.list_files(prefix):
+            exchange = key[len(prefix) :].split("/")[0].replace("exchange=", "")
+            if exchanges and exchange not in exchanges:
+                continue
+            partitions.setdefault(exchange, []).append(key)
+
+        return partitions
+
+    def list_files(self, prefix: str) -> List[str]:
+        """Lists Parquet files under a prefix (recursively)
+
+        :param prefix: path/key prefix ending with /
+        :return: sorted list of paths/keys
+        """
+
+        keys = []
+        if self.backend == "s3":
+            paginator = self.s3.client.get_paginator("list_objects_v2")
+            for page in paginator.paginate(
+                Bucket=os.environ.get("BUCKET_NAME"), Prefix=prefix
+            ):
+                keys += [obj["Key"] for obj in page.get("Contents", [])]
+        elif os.path.isdir(prefix):
+            for dir_path, _, names in os.walk(prefix):
+                keys += [os.path.join(dir_path, name) for name in names]
+
+        return sorted(key for key in keys if key.endswith(".parquet"))
+
+    def read_table(
+        self, path: str, expr: ds.Expression = None, columns: List[str] = None
+    ) -> pa.Table:
+        """Reads a single Parquet file, applying the filter expression while scanning
+
+        :param path: path/key of file
+        :param expr: filter expression, defaults to None
+        :param columns: columns to read, defaults to None (all)
+        :return: arrow table
+        """
+
+        if self.backend == "s3":
+            head = self.s3.client.head_object(
+                Bucket=os.environ.get("BUCKET_NAME"), Key=path
+            )
+            source = io.BufferedReader(
+                _S3RangeFile(self.s3, path, head["ContentLength"]),
+                buffer_size=1024 * 1024,
+            )
+        else:
+            source = path
+
+        return pq.read_table(source, columns=columns, filters=expr)
+
+    def write_table(self, table: pa.Table, path: str) -> None:
+        """Writes a single zstd-compressed Parquet file
+
+        :param table: arrow table to write
+        :param path: path/key of file
+        :raises IOError: raised when the file could not be written
+        """
+
+        if self.backend == "s3":
+            buffer = io.BytesIO()
+            pq.write_table(
+                table, buffer, compression="zstd", row_group_size=_ROW_GROUP_SIZE
+            )
+            buffer.seek(0)
+            if not self.s3.pc_s3_upload(buffer, path):
+                raise IOError(f"Failed to upload {path}")
+        else:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            pq.write_table(
+                table, path, compression="zstd", row_group_size=_ROW_GROUP_SIZE
+            )
+
+
+def _to_utc(dt: datetime) -> datetime:
+    """Converts datetime to timezone-aware UTC (naive datetimes are assumed UTC)
+
+    :param dt: datetime to convert
+    :return: UTC datetime
+    """
+
+    if dt.tzinfo is None:
+        return dt.replace(tzinfo=timezone.utc)
+
+    return dt.astimezone(timezone.utc)
+
+
+def _date_range(start: date, end: date) -> List[date]:
+    """Lists dates from start to end (inclusive)
+
+    :param start: first date
+    :param end: last date
+    :return: list of dates
+    """
+
+    return [start + timedelta(days=i) for i in range((end - start).days + 1)]
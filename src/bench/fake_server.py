@@ -0,0 +1,142 @@
+"""
+fake_server.py - Local HTTP stand-in for Questrade and nasdaq.com serving recorded responses
+
+Serves v1/time, v1/symbols, v1/markets/quotes and /api/quote/{ticker}/summary with
+configurable latency and error injection.
+"""
+
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlparse, parse_qs
+import copy
+import json
+import os
+import random
+import re
+import threading
+import time
+
+_FIXTURES_PATH = os.path.join(os.path.dirname(__file__), "fixtures.json")
+
+
+class _Server(ThreadingHTTPServer):
+    daemon_threads = True
+    request_queue_size = 256  # avoid dropped connections under high concurrency
+
+
+class FakeMarketServer:
+    """A class to organize a threaded local server for recorded market data responses"""
+
+    def __init__(
+        self,
+        latency: float = 0.02,
+        jitter: float = 0.01,
+        error_rate: float = 0.0,
+        rate_limit_rate: float = 0.0,
+        seed: int = 0,
+    ) -> None:
+        """Constructor method
+
+        :param latency: mean response latency in seconds, defaults to 0.02
+        :param jitter: max +/- random latency added to each response, defaults to 0.01
+        :param error_rate: fraction of responses answered with a 500, defaults to 0.0
+        :param rate_limit_rate: fraction of QT responses answered with a 429, defaults to 0.0
+        :param seed: random seed for latency/error injection, defaults to 0
+        """
+
+        with open(_FIXTURES_PATH, "r") as f:
+            self.fixtures = json.load(f)
+
+        self.latency = latency
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.rate_limit_rate = rate_limit_rate
+        self.random = random.Random(seed)
+        self.random_lock = threading.Lock()
+        self.requests = 0
+
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self) -> None:
+                status, body = server.respond(self.path)
+                data = json.dumps(body).encode()
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+            def log_message(self, *args) -> None:
+                pass
+
+        self.httpd = _Server(("127.0.0.1", 0), Handler)
+        self.url = f"http://127.0.0.1:{self.httpd.server_address[1]}/"
+
+    def __enter__(self) -> "FakeMarketServer":
+        threading.Thread(target=self.httpd.serve_forever, daemon=True).start()
+        return self
+
+    def __exit__(self, *args) -> None:
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+    def respond(self, path: str) -> tuple:
+        """Builds response for a request path after injecting latency/errors
+
+        :param path: request path including query string
+        :return: tuple of (status code, JSON body)
+        """
+
+        with self.random_lock:
+            self.requests += 1
+            delay = max(0, self.latency + self.random.uniform(-self.jitter, self.jitter))
+            roll = self.random.random()
+        time.sleep(delay)
+
+        parsed = urlparse(path)
+        params = parse_qs(parsed.query)
+        route = parsed.path.strip("/")
+
+        if roll < self.error_rate:
+            return 500, {"message": "injected error"}
+
+        if route.startswith("v1/") and roll < self.error_rate + self.rate_limit_rate:
+            return 429, {"code": 1006, "message": "Too many requests"}
+
+        if route == "v1/time":
+            return 200, self.fixtures["qt_time"]
+
+        if route.startswith("v1/markets/quotes"):
+            ids = params.get("ids", [route.split("/")[-1]])[0].split(",")
+            return 200, {"quotes": [self._qt_record("qt_quote", qid) for qid in ids]}
+
+        if route.startswith("v1/symbols"):
+            ids = params.get("ids", [""])[0]
+            if ids:
+                symbols = [self._qt_record("qt_symbol", qid) for qid in ids.split(",")]
+            else:
+                name = params.get("names", params.get("prefix", ["AAPL"]))[0]
+                symbols = [self._qt_record("qt_symbol", "1", name)]
+            return 200, {"symbols": symbols}
+
+        match = re.match(r"api/quote/([^/]+)/summary", route)
+        if match:
+            body = copy.deepcopy(self.fixtures["nq_summary"])
+            body["data"]["symbol"] = match.group(1)
+            return 200, body
+
+        return 404, {"message": f"Unknown route {route}"}
+
+    def _qt_record(self, fixture: str, qid: str, symbol: str = None) -> dict:
+        """Builds a QT record for a symbol id from a recorded fixture
+
+        :param fixture: name of fixture
+        :param qid: QT symbol id
+        :param symbol: symbol name, defaults to f"T{qid}"
+        :return: record
+        """
+
+        record = dict(self.fixtures[fixture])
+        record["symbolId"] = int(qid) if qid.isdigit() else 0
+        record["symbol"] = symbol or f"T{qid}"
+        return record
@@ -0,0 +1,218 @@
+"""
+run.py - Offline benchmarks of market data fetching against the local fake market-data server
+
+Usage (from src/):
+    python -m bench.run --sizes 100 1000 --workers 1 8 32 --latency 0.02 --error-rate 0.01
+
+Reports tickers/sec, p50/p95/p99 per-call latency and peak traced memory (measured in a
+separate untimed pass) for each scenario.
+"""
+
+from bench.fake_server import FakeMarketServer
+
+from typing import Callable, List
+import argparse
+import concurrent.futures
+import json
+import os
+import time
+import tracemalloc
+import unittest.mock
+
+_QUOTE_FIELDS = ["symbol", "lastTradePrice", "bidPrice", "askPrice", "volume", "isHalted"]
+_NQ_FIELDS = [
+    "data.summaryData.PreviousClose.value",
+    "data.summaryData.MarketCap.value",
+    "data.summaryData.AverageVolume.value",
+]
+
+
+def percentile(samples: List[float], pct: float) -> float:
+    """Computes percentile of samples
+
+    :param samples: list of samples
+    :param pct: percentile in [0, 100]
+    :return: percentile value (0 if no samples)
+    """
+
+    if not samples:
+        return 0
+    samples = sorted(samples)
+    return samples[min(int(len(samples) * pct / 100), len(samples) - 1)]
+
+
+def measure(
+    name: str, num_tickers: int, calls: List[Callable], workers: int
+) -> dict:
+    """Runs calls concurrently and measures throughput, latency and peak memory
+
+    Peak memory is taken from a second, untimed pass since tracing allocations slows every call.
+
+    :param name: name of scenario
+    :param num_tickers: number of tickers processed by all calls
+    :param calls: list of zero-argument functions to time
+    :param workers: number of concurrent workers
+    :return: dict of results
+    """
+
+    from app.utils import transport
+    from app.utils.breaker import get_breaker
+
+    def run(fx: Callable) -> None:
+        # start each pass with fresh breakers/latency history
+        transport.reset_trackers()
+        get_breaker("qt").reset()
+        get_breaker("nq").reset()
+        with concurrent.futures.ThreadPoolExecutor(max_workers=workers) as executor:
+            list(executor.map(fx, calls))
+
+    latencies = []
+
+    def timed(fx: Callable) -> None:
+        start = time.perf_counter()
+        fx()
+        latencies.append(time.perf_counter() - start)
+
+    start = time.perf_counter()
+    run(timed)
+    elapsed = time.perf_counter() - start
+
+    tracemalloc.start()
+    run(lambda fx: fx())
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    return {
+        "scenario": name,
+        "tickers": num_tickers,
+        "workers": workers,
+        "seconds": round(elapsed, 3),
+        "tickers_per_sec": round(num_tickers / elapsed, 1),
+        "p50_ms": round(percentile(latencies, 50) * 1000, 1),
+        "p95_ms": round(percentile(latencies, 95) * 1000, 1),
+        "p99_ms": round(percentile(latencies, 99) * 1000, 1),
+        "peak_mem_mb": round(peak / 1024 / 1024, 2),
+    }
+
+
+class _BenchDB:
+    """Serves QT symbol ids from memory in place of app.db.DB (no database offline)"""
+
+    qids = {}
+
+    def get_qid(self, yf_ticker: str) -> str:
+        return self.qids.get(yf_ticker)
+
+    def close(self) -> None:
+        pass
+
+
+def run_scenarios(size: int, workers: int, partition_payload: dict = None) -> List[dict]:
+    """Runs every scenario for a universe size and worker count
+
+    :param size: number of tickers in universe
+    :param workers: number of concurrent workers
+    :param partition_payload: kwargs for process_partition, defaults to None (skipped)
+    :return: list of result dicts
+    """
+
+    from app.data.qt import QT
+    from app.data.nq import get_quote_nq
+    from app.data.handler_batch import DataHandlerBatch
+
+    qt = QT()
+    tickers = [f"T{i}" for i in range(1, size + 1)]
+    batch = DataHandlerBatch(
+        {"yf": tickers, "qt": tickers, "nq": tickers},
+        exchanges=["nasdaq"] * size,
+        currencies=["USD"] * size,
+        qt=qt,
+    )
+    batch.qids = {ticker: ticker[1:] for ticker in tickers}
+    _BenchDB.qids = batch.qids
+
+    with unittest.mock.patch("app.data.qt.DB", _BenchDB):
+        per_symbol = measure(
+            "qt_quote_per_symbol",
+            size,
+            [lambda view=view: qt.get_mkt_quote(view, _QUOTE_FIELDS) for view in batch],
+            workers,
+        )
+
+    results = [
+        per_symbol,
+        measure(
+            "qt_quote_batch",
+            size,
+            [lambda: batch.get_mkt_quote(_QUOTE_FIELDS)],
+            1,
+        ),
+        measure(
+            "nq_quote",
+            size,
+            [lambda view=view: get_quote_nq(view, _NQ_FIELDS) for view in batch],
+            workers,
+        ),
+    ]
+
+    if partition_payload is not None:
+        from app.utils.scrape import process_partition
+
+        results.append(
+            measure(
+                "process_partition",
+                size,
+                [lambda: process_partition(**partition_payload)],
+                1,
+            )
+        )
+
+    return results
+
+
+def main() -> None:
+    """Parses arguments, starts fake server and prints benchmark results"""
+
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[100, 1000])
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 8, 32])
+    parser.add_argument("--latency", type=float, default=0.02)
+    parser.add_argument("--jitter", type=float, default=0.01)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--rate-limit-rate", type=float, default=0.0)
+    parser.add_argument(
+        "--partition-payload",
+        help="JSON file of process_partition kwargs (requires the full app environment)",
+    )
+    parser.add_argument("--out", help="write results as JSON to this path")
+    args = parser.parse_args()
+
+    partition_payload = None
+    if args.partition_payload:
+        with open(args.partition_payload, "r") as f:
+            partition_payload = json.load(f)
+
+    with FakeMarketServer(
+        args.latency, args.jitter, args.error_rate, args.rate_limit_rate
+    ) as server:
+        # data sources read these on import/auth
+        os.environ["PC_BENCH_QT_SERVER"] = server.url
+        os.environ["NQ_BASE_URL"] = server.url.rstrip("/")
+
+        results = []
+        for size in args.sizes:
+            for workers in args.workers:
+                results += run_scenarios(size, workers, partition_payload)
+
+    cols = list(results[0].keys())
+    print(" | ".join(f"{col:>19}" for col in cols))
+    for result in results:
+        print(" | ".join(f"{str(result[col]):>19}" for col in cols))
+
+    if args.out:
+        with open(args.out, "w") as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,5 +1,9 @@
 from app.utils.aws import AWSClient
 
+from contextlib import closing
+from unittest import mock
+import io
+import os
 import unittest
 import logging
 
@@ -11,6 +15,110 @@ class TestAWS(unittest.TestCase):
     def setUpClass(cls) -> None:
         logger.info("\n=== TESTING AWS.PY ===")
 
+    def test_client_cache(self) -> None:
+        """Ensure boto3 clients are reused across AWSClient constructions"""
+
+        s3_a = AWSClient("s3")
+        s3_b = AWSClient("s3")
+        self.assertIs(s3_a.client, s3_b.client)
+        self.assertIs(s3_a.op_client("get_object"), s3_b.op_client("get_object"))
+        self.assertIsNot(s3_a.client, AWSClient("s3", max_pool_connections=50).client)
+
+        lambda_client = AWSClient("lambda")
+        self.assertIsNot(lambda_client.client, s3_a.client)
+        self.assertEqual(
+            lambda_client.op_client("invoke").meta.config.read_timeout, 900
+        )
+        self.assertEqual(lambda_client.client.meta.config.read_timeout, 900)
+        self.assertEqual(s3_a.client.meta.config.read_timeout, 60)
+
+    def test_del_batch_split(self) -> None:
+        """Ensure more than 1000 keys are split across delete_objects calls"""
+
+        s3 = AWSClient("s3")
+        keys = [f"test/del/{i}.txt" for i in range(1005)]
+        client = mock.Mock()
+        client.delete_objects.side_effect = [
+            {},
+            {"Errors": [{"Key": keys[-1], "Code": "AccessDenied", "Message": "denied"}]},
+        ]
+
+        with mock.patch.object(s3, "op_client", return_value=client):
+            failed = s3.pc_s3_del_batch(keys)
+
+        self.assertEqual(failed, {keys[-1]: "AccessDenied: denied"})
+        batches = [
+            [obj["Key"] for obj in call.kwargs["Delete"]["Objects"]]
+            for call in client.delete_objects.call_args_list
+        ]
+        self.assertEqual(batches, [keys[:1000], keys[1000:]])
+
+
+@unittest.skipUnless(
+    os.environ.get("S3_ENDPOINT_URL"),
+    "S3_ENDPOINT_URL must point to a local S3-compatible stand-in (e.g. minio)",
+)
+class TestAWSS3Transfers(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls) -> None:
+        logger.info("\n=== TESTING AWS.PY S3 TRANSFERS ===")
+        cls.s3 = AWSClient("s3")
+        try:
+            cls.s3.client.create_bucket(Bucket=os.environ.get("BUCKET_NAME"))
+        except Exception:
+            pass  # bucket already exists
+
+    def test_stream_and_range(self) -> None:
+        """Ensure objects can be streamed in chunks and read by byte range"""
+
+        data = os.urandom(3 * 1024 * 1024 + 17)
+        self.s3.pc_s3_upload(
+            io.BytesIO(data), "test/stream.bin", part_size=5 * 1024 * 1024
+        )
+
+        chunks = list(self.s3.pc_s3_iter("test/stream.bin", chunk_size=1024 * 1024))
+        self.assertEqual(len(chunks), 4)
+        self.assertEqual(b"".join(chunks), data)
+        self.assertEqual(self.s3.pc_s3_get_range("test/stream.bin", 10, 19), data[10:20])
+
+        with closing(self.s3.pc_s3_open("test/stream.bin", (100, None))) as body:
+            self.assertEqual(body.read(), data[100:])
+
+        self.assertIsNone(self.s3.pc_s3_iter("test/missing.bin"))
+
+    def test_multipart_upload(self) -> None:
+        """Ensure uploads above the part size are sent as multipart uploads"""
+
+        data = os.urandom(11 * 1024 * 1024)
+        self.s3.pc_s3_upload(
+            io.BytesIO(data), "test/multipart.bin", part_size=5 * 1024 * 1024
+        )
+
+        head = self.s3.client.head_object(
+            Bucket=os.environ.get("BUCKET_NAME"), Key="test/multipart.bin"
+        )
+        self.assertTrue(head["ETag"].strip('"').endswith("-3"))
+        self.assertEqual(self.s3.pc_s3_get("test/multipart.bin"), data)
+
+    def test_del_batch(self) -> None:
+        """Ensure keys are deleted in batches"""
+
+        keys = [f"test/del/{i}.txt" for i in range(1005)]
+        uploaded = keys[:3] + keys[-3:]  # in both batches
+        for key in uploaded:
+            self.s3.pc_s3_upload(io.BytesIO(b"x"), key)
+
+        client = self.s3.op_client("delete_objects")
+        with mock.patch.object(
+            client, "delete_objects", wraps=client.delete_objects
+        ) as delete_objects:
+            failed = self.s3.pc_s3_del_batch(keys)
+
+        self.assertEqual(failed, {})
+        self.assertEqual(delete_objects.call_count, 2)
+        for key in uploaded:
+            self.assertIsNone(self.s3.pc_s3_get(key))
+
 
 if __name__ == "__main__":
     unittest.main()
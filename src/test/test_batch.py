@@ -0,0 +1,110 @@
+from app.strategy.batch import Universe, BatchScorer
+
+from types import SimpleNamespace
+import math
+import numpy as np
+import unittest
+import logging
+
+logger = logging.getLogger(__name__)
+
+_FACTORS = {
+    "momentum": (lambda c: c["lastTradePrice"] / c["prevDayClosePrice"] - 1, 1.0),
+    "rel_volume": (lambda c: c["volume"] / c["averageVol3Months"], 0.1),
+    "spread": (lambda c: (c["askPrice"] - c["bidPrice"]) / c["lastTradePrice"], -1.0),
+}
+
+
+def _score_handler(handler: object) -> float:
+    """Per-DataHandler reference scoring in plain Python (independent of the factor lambdas)
+
+    :param handler: object with point and quote dicts
+    :return: score, None if the stock cannot be scored
+    """
+
+    quote, point = handler.quote, handler.point
+    if quote.get("isHalted"):
+        return None
+
+    price = quote.get("lastTradePrice")
+    close = point.get("prevDayClosePrice")
+    bid, ask = quote.get("bidPrice"), quote.get("askPrice")
+    volume, avg_volume = quote.get("volume"), point.get("averageVol3Months")
+    if None in (price, close, bid, ask, volume, avg_volume) or 0 in (price, close, avg_volume):
+        return None
+
+    return (price / close - 1) + 0.1 * (volume / avg_volume) - (ask - bid) / price
+
+
+class TestBatch(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls) -> None:
+        logger.info("\n=== TESTING BATCH.PY ===")
+
+    def setUp(self) -> None:
+        rng = np.random.default_rng(0)
+        n = 500
+        self.col_names = ["symbol", "exchange", "prevDayClosePrice", "averageVol3Months"]
+        self.rows = [
+            (f"T{i}", "nasdaq", float(rng.uniform(1, 100)), float(rng.integers(0, 1e6)))
+            for i in range(n)
+        ]
+        self.quotes = {}
+        for i, row in enumerate(self.rows):
+            if i % 50 == 0:
+                continue  # no fresh quote
+            price = row[2] * float(rng.uniform(0.8, 1.2))
+            self.quotes[row[0]] = {
+                "lastTradePrice": price,
+                "bidPrice": price * 0.99,
+                "askPrice": None if i % 37 == 0 else price * 1.01,
+                "volume": int(rng.integers(0, 2e6)),
+                "isHalted": i % 41 == 0,
+            }
+
+        self.universe = Universe.from_point(self.rows, self.col_names, self.quotes)
+        self.scorer = BatchScorer(_FACTORS)
+        self.handlers = [
+            SimpleNamespace(
+                tickers={"yf": row[0]},
+                point=dict(zip(self.col_names, row)),
+                quote=self.quotes.get(row[0], {}),
+            )
+            for row in self.rows
+        ]
+
+    def test_parity(self) -> None:
+        """Ensure batch scores, signals and ranks match per-DataHandler scoring"""
+
+        results = self.scorer.score(self.universe)
+
+        expected = [_score_handler(handler) for handler in self.handlers]
+        expected = np.array([math.nan if x is None else x for x in expected])
+        self.assertTrue(np.isnan(expected).any())
+
+        np.testing.assert_allclose(results["score"], expected, equal_nan=True)
+        for handler, value in zip(self.handlers, expected):
+            stock = {**handler.point, **handler.quote}
+            np.testing.assert_allclose(self.scorer.score_one(stock), value, equal_nan=True)
+        valid = ~np.isnan(expected)
+        self.assertTrue(
+            np.array_equal(results["buy"], valid & (expected >= self.scorer.buy_threshold))
+        )
+        self.assertTrue(
+            np.array_equal(results["sell"], valid & (expected <= self.scorer.sell_threshold))
+        )
+
+        ranked = sorted(np.flatnonzero(valid), key=lambda i: -expected[i])
+        self.assertEqual(list(results["rank"][ranked]), list(range(1, len(ranked) + 1)))
+        self.assertTrue((results["rank"][~valid] == -1).all())
+
+    def test_row(self) -> None:
+        """Ensure per-stock views keep non-numeric columns"""
+
+        row = self.universe.row("T1")
+        self.assertEqual(row["exchange"], "nasdaq")
+        self.assertEqual(row["prevDayClosePrice"], self.rows[1][2])
+
+
+if __name__ == "__main__":
+    unittest.main()
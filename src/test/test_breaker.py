@@ -0,0 +1,96 @@
+from app.utils.breaker import CircuitBreaker, is_failure_status
+
+from unittest import mock
+import unittest
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+class TestBreaker(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls) -> None:
+        logger.info("\n=== TESTING BREAKER.PY ===")
+
+    def test_states(self) -> None:
+        """Ensure breaker opens on failures, fails fast, then recovers via half open"""
+
+        changes = []
+        breaker = CircuitBreaker(
+            "test", failure_rate=0.5, min_calls=4, window=4, cooldown=10, half_open_calls=1
+        )
+        breaker.add_listener(lambda name, prev, state: changes.append(state))
+
+        with mock.patch("app.utils.breaker.time.time", return_value=0):
+            for success in [True, False, True, False]:
+                self.assertTrue(breaker.allow())
+                breaker.record(success)
+            self.assertEqual(breaker.state, "open")
+            self.assertFalse(breaker.allow())
+
+        with mock.patch("app.utils.breaker.time.time", return_value=11):
+            self.assertTrue(breaker.allow())
+            self.assertEqual(breaker.state, "half_open")
+            self.assertFalse(breaker.allow())  # only one trial call
+            breaker.record(False)
+            self.assertEqual(breaker.state, "open")
+
+        with mock.patch("app.utils.breaker.time.time", return_value=22):
+            self.assertTrue(breaker.allow())
+            breaker.record(True)
+            self.assertEqual(breaker.state, "closed")
+
+        self.assertEqual(changes, ["open", "half_open", "open", "half_open", "closed"])
+        self.assertEqual(breaker.stats()["calls"], 0)
+
+    def test_unanswered_trials(self) -> None:
+        """Ensure half open trials are handed out again if their outcomes are never recorded"""
+
+        breaker = CircuitBreaker("test", min_calls=1, window=1, cooldown=10, half_open_calls=1)
+        with mock.patch("app.utils.breaker.time.time", return_value=0):
+            breaker.record(False)
+
+        with mock.patch("app.utils.breaker.time.time", return_value=11):
+            self.assertTrue(breaker.allow())  # trial call that never records
+            self.assertFalse(breaker.allow())
+
+        with mock.patch("app.utils.breaker.time.time", return_value=22):
+            self.assertTrue(breaker.allow())
+            breaker.record(True)
+            self.assertEqual(breaker.state, "closed")
+
+    def test_half_open_trials(self) -> None:
+        """Ensure half open closes only after all trial calls succeed"""
+
+        breaker = CircuitBreaker("test", min_calls=1, window=1, cooldown=10, half_open_calls=2)
+        with mock.patch("app.utils.breaker.time.time", return_value=0):
+            breaker.record(False)
+
+        with mock.patch("app.utils.breaker.time.time", return_value=11):
+            self.assertTrue(breaker.allow())
+            self.assertTrue(breaker.allow())
+            breaker.record(True)
+            self.assertEqual(breaker.state, "half_open")
+            breaker.record(True)
+            self.assertEqual(breaker.state, "closed")
+
+    def test_listener_outside_lock(self) -> None:
+        """Ensure listeners may use the breaker they are notified by"""
+
+        breaker = CircuitBreaker("test", min_calls=1, window=1)
+        states = []
+        breaker.add_listener(lambda name, prev, state: states.append(breaker.stats()["state"]))
+        breaker.record(False)
+        self.assertEqual(states, ["open"])
+
+    def test_failure_status(self) -> None:
+        """Ensure blocking, timeouts and rate limiting count as failures"""
+
+        self.assertEqual(
+            [is_failure_status(status) for status in [200, 404, 403, 408, 429, 500, 503]],
+            [False, False, True, True, True, True, True],
+        )
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,106 @@
+from app.utils import cassette, transport
+from bench.fake_server import FakeMarketServer
+
+from unittest import mock
+import gzip
+import os
+import tempfile
+import unittest
+import logging
+
+logger = logging.getLogger(__name__)
+
+_OAUTH_URL = "https://login.questrade.com/oauth2/token"
+
+
+class TestCassette(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls) -> None:
+        logger.info("\n=== TESTING CASSETTE.PY ===")
+
+    def setUp(self) -> None:
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tmp_dir.name, "cassette.jsonl.gz")
+        cassette._CASSETTE = None
+
+    def tearDown(self) -> None:
+        cassette._CASSETTE = None
+        self.tmp_dir.cleanup()
+
+    def test_record_replay(self) -> None:
+        """Ensure recorded responses replay without network access regardless of host"""
+
+        with FakeMarketServer(latency=0) as server:
+            env = {"PC_CASSETTE_MODE": "record", "PC_CASSETTE_PATH": self.path}
+            with mock.patch.dict(os.environ, env):
+                quotes = transport.get(
+                    "test.quotes", f"{server.url}v1/markets/quotes", params={"ids": "1,2"}
+                ).json()
+                cassette.get_cassette().flush()
+
+        env = {"PC_CASSETTE_MODE": "replay", "PC_CASSETTE_PATH": self.path}
+        with mock.patch.dict(os.environ, env), mock.patch("requests.request") as request:
+            res = transport.get(
+                "test.quotes",
+                "https://api01.iq.questrade.com/v1/markets/quotes",
+                params={"ids": "1,2"},
+            )
+            self.assertEqual(res.status_code, 200)
+            self.assertEqual(res.json(), quotes)
+
+            with self.assertRaises(transport.requests.exceptions.ConnectionError):
+                transport.get("test.quotes", "https://api01.iq.questrade.com/v1/time")
+
+            request.assert_not_called()
+
+    def test_auth(self) -> None:
+        """Ensure token refreshes replay regardless of the refresh token sent, without credentials"""
+
+        recorded = transport.requests.models.Response()
+        recorded.status_code = 200
+        recorded._content = b'{"access_token": "a1", "refresh_token": "r2", "api_server": "s"}'
+
+        env = {"PC_CASSETTE_MODE": "record", "PC_CASSETTE_PATH": self.path}
+        with mock.patch.dict(os.environ, env), mock.patch(
+            "requests.request", return_value=recorded
+        ):
+            transport.post("test.oauth", _OAUTH_URL, params={"refresh_token": "r1"})
+            cassette.get_cassette().flush()
+
+        env = {"PC_CASSETTE_MODE": "replay", "PC_CASSETTE_PATH": self.path}
+        with mock.patch.dict(os.environ, env), mock.patch("requests.request") as request:
+            res = transport.post("test.oauth", _OAUTH_URL, params={"refresh_token": "r9"})
+            self.assertEqual(
+                res.json(),
+                {"access_token": "redacted", "refresh_token": "redacted", "api_server": "s"},
+            )
+            request.assert_not_called()
+
+        with gzip.open(self.path, "rt") as f:
+            body = f.read()
+            self.assertNotIn("a1", body)
+            self.assertNotIn("r2", body)
+
+    def test_record_truncates(self) -> None:
+        """Ensure a new recording replaces the cassette of a previous run"""
+
+        recorded = transport.requests.models.Response()
+        recorded.status_code = 200
+
+        for body in [b"run 1", b"run 2"]:
+            cassette._CASSETTE = None
+            recorded._content = body
+            env = {"PC_CASSETTE_MODE": "record", "PC_CASSETTE_PATH": self.path}
+            with mock.patch.dict(os.environ, env), mock.patch(
+                "requests.request", return_value=recorded
+            ):
+                transport.get("test.time", "https://api01.iq.questrade.com/v1/time")
+                cassette.get_cassette().flush()
+
+        replay = cassette.Cassette(self.path, "replay")
+        [entry] = replay.entries["GET /v1/time "]
+        self.assertEqual(entry["body"], "run 2")
+
+
+if __name__ == "__main__":
+    unittest.main()
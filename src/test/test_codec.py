@@ -0,0 +1,79 @@
+from app.utils import codec
+
+from datetime import datetime
+import json
+import numpy as np
+import unittest
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+class _FakeS3:
+    """In-memory stand-in for AWSClient("s3")"""
+
+    def __init__(self) -> None:
+        self.objects = {}
+
+    def pc_s3_upload(self, fileobj: object, s3_key: str) -> bool:
+        self.objects[s3_key] = fileobj.read()
+        return True
+
+    def pc_s3_get(self, s3_key: str) -> bytes:
+        return self.objects.get(s3_key)
+
+    def pc_s3_del(self, s3_key: str) -> None:
+        del self.objects[s3_key]
+
+
+class TestCodec(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls) -> None:
+        logger.info("\n=== TESTING CODEC.PY ===")
+
+    def setUp(self) -> None:
+        self.result = [
+            {"ticker": f"T{i}", "price": float(i), "volume": np.int64(i * 100), "halted": False}
+            for i in range(2000)
+        ]
+
+    def test_round_trip(self) -> None:
+        """Ensure results decode to their JSON equivalent and encode smaller than JSON"""
+
+        result = {"rows": self.result, "ts": datetime(2024, 1, 2, 9, 30)}
+        data = codec.encode(result)
+        expected = json.loads(json.dumps(result, default=codec._default))
+
+        self.assertEqual(codec.decode(data), expected)
+        self.assertLess(len(data), len(json.dumps(expected)) / 4)
+
+    def test_inline(self) -> None:
+        """Ensure small results travel inline in a JSON serializable envelope"""
+
+        s3 = _FakeS3()
+        envelope = json.loads(json.dumps(codec.pack_result(self.result, s3)))
+        self.assertIn("data", envelope)
+        self.assertEqual(codec.unpack_result(envelope, s3)[5]["volume"], 500)
+        self.assertEqual(codec.unpack_result({"plain": 1}, s3), {"plain": 1})
+
+    def test_spill(self) -> None:
+        """Ensure large results spill to S3 and are removed once read"""
+
+        s3 = _FakeS3()
+        envelope = codec.pack_result(self.result, s3, spill_bytes=100)
+        self.assertIn(envelope["s3_key"], s3.objects)
+
+        self.assertEqual(len(codec.unpack_result(envelope, s3)), 2000)
+        self.assertEqual(s3.objects, {})
+
+    def test_spill_failure(self) -> None:
+        """Ensure results that could not be spilled are not returned inline"""
+
+        s3 = _FakeS3()
+        s3.pc_s3_upload = lambda file, s3_key: False
+        with self.assertRaises(RuntimeError):
+            codec.pack_result(self.result, s3, spill_bytes=100)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,43 @@
+from app.utils.dbstats import QueryStats, fingerprint, method_scope
+
+import unittest
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+class TestDBStats(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls) -> None:
+        logger.info("\n=== TESTING DBSTATS.PY ===")
+
+    def test_fingerprint(self) -> None:
+        """Ensure queries of the same shape share a fingerprint"""
+
+        self.assertEqual(
+            fingerprint("SELECT * FROM t WHERE a = 'x' AND b IN (1, 2)  LIMIT 5"),
+            fingerprint("select *\n from t where a = 'y' and b in (3) limit 1"),
+        )
+
+    def test_n_plus_one(self) -> None:
+        """Ensure repeated query shapes are flagged with the issuing method"""
+
+        stats = QueryStats()
+        with method_scope("get_qid"):
+            for _ in range(12):
+                stats.record_query("SELECT q_id FROM _point WHERE symbol = %s", 0.01, 1)
+        stats.record_query("SELECT * FROM _point WHERE currency = %s", 0.2, 500)
+        stats.record_retry("get_qid", 0.15)
+
+        [candidate] = stats.n_plus_one()
+        self.assertEqual(candidate["count"], 12)
+        self.assertEqual(candidate["methods"], ["get_qid"])
+
+        summary = stats.summary()
+        self.assertEqual(summary["queries"], 13)
+        self.assertEqual(summary["top"][0]["rows"], 500)
+        self.assertEqual(summary["retries"], {"get_qid": {"retries": 1, "backoff_s": 0.15}})
+
+
+if __name__ == "__main__":
+    unittest.main()
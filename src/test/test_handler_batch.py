@@ -0,0 +1,91 @@
+from app.data import handler_batch
+from app.data.handler_batch import DataHandlerBatch
+
+from unittest import mock
+import unittest
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+class _FakeQT:
+    """Stand-in for QT recording the handlers of each bulk call"""
+
+    def __init__(self) -> None:
+        self.calls = []
+
+    def get_qids(self, handlers: list) -> dict:
+        self.calls.append(("get_qids", [h.tickers["yf"] for h in handlers]))
+        return {h.tickers["yf"]: i for i, h in enumerate(handlers)}
+
+    def get_mkt_quote_batch(self, handlers: list, info: list, qids: dict) -> list:
+        self.calls.append(("get_mkt_quote_batch", [h.tickers["qt"] for h in handlers]))
+        return [[qids[h.tickers["yf"]]] + info for h in handlers]
+
+    def get_symbol_info_batch(self, handlers: list, info: list, qids: dict) -> list:
+        self.calls.append(("get_symbol_info_batch", [h.tickers["qt"] for h in handlers]))
+        return [[h.currency] for h in handlers]
+
+
+class TestHandlerBatch(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls) -> None:
+        logger.info("\n=== TESTING HANDLER_BATCH.PY ===")
+
+    def setUp(self) -> None:
+        self.qt = _FakeQT()
+        self.batch = DataHandlerBatch(
+            {
+                "yf": ["AAPL", "SHOP.TO", "BRK-B"],
+                "qt": ["AAPL", "SHOP.TO", "BRK.B"],
+                "nq": ["AAPL", "SHOP", "BRK/B"],
+            },
+            ["NASDAQ", "TSX", "NYSE"],
+            ["USD", "CAD", "USD"],
+            self.qt,
+        )
+
+    def test_view(self) -> None:
+        """Ensure views map each index to its symbol across sources"""
+
+        view = self.batch[1]
+        self.assertEqual(view.tickers, {"yf": "SHOP.TO", "qt": "SHOP.TO", "nq": "SHOP"})
+        self.assertIs(view.tickers, view.tickers)
+        self.assertEqual((view.exchange, view.currency), ("TSX", "CAD"))
+        self.assertIs(view.qt, self.qt)
+
+        self.assertEqual(self.batch[-1].tickers["nq"], "BRK/B")
+        self.assertEqual([v.tickers["yf"] for v in self.batch], ["AAPL", "SHOP.TO", "BRK-B"])
+        with self.assertRaises(IndexError):
+            self.batch[3]
+
+        with self.assertRaises(ValueError):
+            DataHandlerBatch({"yf": ["AAPL"], "qt": []}, ["NASDAQ"], ["USD"])
+
+    def test_fan_out(self) -> None:
+        """Ensure source calls are made once for the whole batch, reusing looked up QT ids"""
+
+        quotes = self.batch.get_mkt_quote(["lastTradePrice"])
+        self.assertEqual([quote[0] for quote in quotes], [0, 1, 2])
+        self.assertEqual({quote[1] for quote in quotes}, {"lastTradePrice"})
+        self.assertEqual(self.batch.get_symbol_info(["currency"]), [["USD"], ["CAD"], ["USD"]])
+        self.assertEqual(
+            self.qt.calls,
+            [
+                ("get_qids", ["AAPL", "SHOP.TO", "BRK-B"]),
+                ("get_mkt_quote_batch", ["AAPL", "SHOP.TO", "BRK.B"]),
+                ("get_symbol_info_batch", ["AAPL", "SHOP.TO", "BRK.B"]),
+            ],
+        )
+
+        with mock.patch.object(handler_batch, "get_quote_nq_batch") as nq_batch:
+            nq_batch.return_value = [["N/A"]] * 3
+            self.assertEqual(self.batch.get_quote_nq(["lastSalePrice"], 4), [["N/A"]] * 3)
+
+        handlers, info, max_workers = nq_batch.call_args[0]
+        self.assertEqual([h.tickers["nq"] for h in handlers], ["AAPL", "SHOP", "BRK/B"])
+        self.assertEqual((info, max_workers), (["lastSalePrice"], 4))
+
+
+if __name__ == "__main__":
+    unittest.main()
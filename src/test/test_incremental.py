@@ -0,0 +1,50 @@
+from app.strategy.incremental import IncrementalScorer
+
+import unittest
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+class TestIncremental(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls) -> None:
+        logger.info("\n=== TESTING INCREMENTAL.PY ===")
+
+    def test_score(self) -> None:
+        """Ensure only changed tickers are re-scored and dropped tickers are evicted"""
+
+        calls = []
+
+        def score_fx(ticker: str, quote: dict) -> float:
+            calls.append(ticker)
+            return quote["lastTradePrice"] * 2
+
+        scorer = IncrementalScorer(score_fx)
+        quotes = {
+            "AAPL": {"lastTradeTime": "t1", "lastTradePrice": 150, "volume": 10},
+            "MSFT": {"lastTradeTime": "t1", "lastTradePrice": 250, "volume": 20},
+        }
+        self.assertEqual(scorer.score(quotes), {"AAPL": 300, "MSFT": 500})
+        self.assertEqual(sorted(calls), ["AAPL", "MSFT"])
+
+        # unchanged quotes are served from memo
+        calls.clear()
+        self.assertEqual(scorer.score(quotes), {"AAPL": 300, "MSFT": 500})
+        self.assertEqual(calls, [])
+
+        # volume change only re-scores that ticker
+        quotes["MSFT"] = {**quotes["MSFT"], "volume": 21, "bidPrice": 1}
+        scorer.score(quotes)
+        self.assertEqual(calls, ["MSFT"])
+
+        # dropped tickers are evicted
+        calls.clear()
+        del quotes["AAPL"]
+        self.assertEqual(scorer.score(quotes), {"MSFT": 500})
+        self.assertNotIn("AAPL", scorer.results)
+        self.assertEqual(calls, [])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,151 @@
+from app.strategy.indicators import IndicatorEngine
+
+import numpy as np
+import pandas as pd
+import os
+import tempfile
+import unittest
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+def _bars(n: int = 300, seed: int = 0) -> pd.DataFrame:
+    """Builds random OHLCV bars over two sessions"""
+
+    rng = np.random.default_rng(seed)
+    close = 100 + np.cumsum(rng.normal(0, 1, n))
+    high = close + rng.uniform(0, 2, n)
+    low = close - rng.uniform(0, 2, n)
+    volume = rng.integers(100, 10000, n).astype(float)
+    ts = pd.date_range("2024-01-02 14:30", periods=n, freq="3min", tz="UTC")
+    return pd.DataFrame({"ts": ts, "high": high, "low": low, "close": close, "volume": volume})
+
+
+def _full(df: pd.DataFrame) -> pd.DataFrame:
+    """Recomputes indicators over the full history"""
+
+    close = df["close"]
+    delta = close.diff()
+    gain = delta.clip(lower=0).iloc[1:].ewm(alpha=1 / 14, adjust=False).mean()
+    loss = (-delta).clip(lower=0).iloc[1:].ewm(alpha=1 / 14, adjust=False).mean()
+    prev_close = close.shift()
+    true_range = pd.concat(
+        [df["high"] - df["low"], (df["high"] - prev_close).abs(), (df["low"] - prev_close).abs()],
+        axis=1,
+    ).max(axis=1)
+    typical = (df["high"] + df["low"] + close) / 3
+    session = df["ts"].dt.strftime("%Y-%m-%d")
+
+    return pd.DataFrame(
+        {
+            "ema_12": close.ewm(span=12, adjust=False).mean(),
+            "ema_26": close.ewm(span=26, adjust=False).mean(),
+            "rsi_14": 100 - 100 / (1 + gain / loss),
+            "atr_14": true_range.ewm(alpha=1 / 14, adjust=False).mean(),
+            "vwap": (typical * df["volume"]).groupby(session).cumsum()
+            / df["volume"].groupby(session).cumsum(),
+            "vol_avg_20": df["volume"].rolling(20).mean(),
+        }
+    )
+
+
+class TestIndicators(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls) -> None:
+        logger.info("\n=== TESTING INDICATORS.PY ===")
+
+    def test_parity(self) -> None:
+        """Ensure incremental updates match full recomputation at every bar"""
+
+        df = _bars()
+        expected = _full(df)
+        engine = IndicatorEngine()
+        actual = pd.DataFrame(
+            [engine.update_bar("AAPL", bar) for bar in df.to_dict("records")]
+        ).astype(float)
+
+        pd.testing.assert_frame_equal(actual, expected[actual.columns], check_exact=False)
+
+    def test_persistence(self) -> None:
+        """Ensure state saved mid-stream resumes exactly"""
+
+        bars = _bars().to_dict("records")
+        uninterrupted = IndicatorEngine()
+        for bar in bars:
+            uninterrupted.update_bar("AAPL", bar)
+
+        engine = IndicatorEngine()
+        for bar in bars[:150]:
+            engine.update_bar("AAPL", bar)
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "state.json.gz")
+            engine.save("local", path)
+            engine = IndicatorEngine.load("local", path)
+        for bar in bars[150:]:
+            engine.update_bar("AAPL", bar)
+
+        for name, value in uninterrupted.values("AAPL").items():
+            self.assertAlmostEqual(engine.values("AAPL")[name], value, places=9)
+
+    def test_load_spec(self) -> None:
+        """Ensure loading builds the engine from the caller's spec, restoring shared indicators"""
+
+        engine = IndicatorEngine({"ema_3": ("ema", 3), "rsi_2": ("rsi", 2)})
+        for bar in _bars().to_dict("records")[:20]:
+            engine.update_bar("AAPL", bar)
+
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "state.json.gz")
+            engine.save("local", path)
+            spec = {"ema_3": ("ema", 3), "rsi_2": ("rsi", 4), "vwap": ("vwap",)}
+            loaded = IndicatorEngine.load("local", path, spec=spec)
+
+        self.assertEqual(loaded.spec, spec)
+        values = loaded.values("AAPL")
+        self.assertAlmostEqual(values["ema_3"], engine.values("AAPL")["ema_3"], places=9)
+        self.assertIsNone(values["rsi_2"])  # params changed - state discarded
+        self.assertIsNone(values["vwap"])
+
+    def test_update_quote(self) -> None:
+        """Ensure quote snapshots are converted to bars using day volume/high/low changes"""
+
+        engine = IndicatorEngine({"vwap": ("vwap",), "atr_2": ("atr", 2)})
+        quote = {"lastTradePrice": 10.0, "volume": 100, "highPrice": 11.0, "lowPrice": 9.0}
+        engine.update_quote("AAPL", {**quote, "lastTradeTime": "2024-01-02T10:00:00"})
+        values = engine.update_quote(
+            "AAPL",
+            {**quote, "lastTradePrice": 12.0, "volume": 300, "highPrice": 12.5,
+             "lastTradeTime": "2024-01-02T10:01:00"},
+        )
+
+        # second bar: high 12.5 (new day high), low 10 (previous price), close 12, volume 200
+        self.assertAlmostEqual(values["vwap"], (10.0 * 100 + (12.5 + 10 + 12) / 3 * 200) / 300)
+        self.assertAlmostEqual(values["atr_2"], (2.0 + 2.5) / 2)
+
+    def test_update_quote_sessions(self) -> None:
+        """Ensure repeated snapshots are skipped and new days are detected by session"""
+
+        engine = IndicatorEngine({"vol_avg_2": ("vol_avg", 2), "ema_2": ("ema", 2)})
+        quote = {
+            "lastTradePrice": 10.0,
+            "volume": 100,
+            "highPrice": 11.0,
+            "lowPrice": 9.0,
+            "lastTradeTime": "2024-01-02T09:31:00",
+        }
+        engine.update_quote("AAPL", quote)
+        for _ in range(5):
+            engine.update_quote("AAPL", quote)
+        self.assertIsNone(engine.values("AAPL")["vol_avg_2"])
+
+        # state restored from early in the previous session - next day's volume is higher
+        engine = IndicatorEngine.from_state(engine.to_state())
+        values = engine.update_quote(
+            "AAPL", {**quote, "volume": 5000, "lastTradeTime": "2024-01-03T15:00:00"}
+        )
+        self.assertEqual(values["vol_avg_2"], (100 + 5000) / 2)
+
+
+if __name__ == "__main__":
+    unittest.main()
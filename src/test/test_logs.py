@@ -0,0 +1,78 @@
+from app.utils import logs
+
+import json
+import logging
+import unittest
+
+logger = logging.getLogger(__name__)
+
+
+class _ListHandler(logging.Handler):
+    def __init__(self) -> None:
+        super().__init__()
+        self.lines = []
+
+    def emit(self, record: logging.LogRecord) -> None:
+        self.lines.append(self.format(record))
+
+
+class TestLogs(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls) -> None:
+        logger.info("\n=== TESTING LOGS.PY ===")
+
+    def test_rate_limit(self) -> None:
+        """Ensure repeated errors from one call site are sampled with a suppressed count"""
+
+        log_filter = logs.RateLimitFilter(burst=3, window=60, sample_every=10)
+        records = [
+            logging.LogRecord("x", logging.ERROR, "nq.py", 74, "failed %s", (i,), None)
+            for i in range(25)
+        ]
+        kept = [r for r in records if log_filter.filter(r)]
+
+        self.assertEqual([r.args[0] for r in kept], [0, 1, 2, 12, 22])
+        self.assertEqual(kept[3].suppressed, 9)
+
+        info = logging.LogRecord("x", logging.INFO, "nq.py", 74, "ok", None, None)
+        self.assertTrue(all(log_filter.filter(info) for _ in range(10)))
+
+    def setUp(self) -> None:
+        # app.app may have set up logging already - start from a clean slate
+        root = logging.getLogger()
+        self.prev_handlers, self.prev_level = root.handlers[:], root.level
+        self.prev_listener = logs._LISTENER
+        if self.prev_listener is not None:
+            self.prev_listener.stop()
+        logs._LISTENER = None
+        root.handlers = []
+
+    def tearDown(self) -> None:
+        if logs._LISTENER is not None:
+            logs._LISTENER.stop()
+        logs._LISTENER = self.prev_listener
+        if self.prev_listener is not None:
+            self.prev_listener.start()
+
+        root = logging.getLogger()
+        root.handlers, root.level = self.prev_handlers, self.prev_level
+
+    def test_setup_flush(self) -> None:
+        """Ensure queued records are written as JSON by flush_logs"""
+
+        handler = _ListHandler()
+        logs.setup_logging(logging.INFO, [handler])
+        try:
+            raise ValueError("boom")
+        except ValueError:
+            logging.getLogger("app.data.nq").error("failed %s", "AAPL", exc_info=True)
+        logs.flush_logs()
+
+        [line] = handler.lines
+        doc = json.loads(line)
+        self.assertEqual(doc["msg"], "failed AAPL")
+        self.assertEqual(doc["level"], "ERROR")
+        self.assertIn("ValueError: boom", doc["exc"])
+
+if __name__ == "__main__":
+    unittest.main()
@@ -1,5 +1,7 @@
 import unittest
 import app.utils.notify as notify
+import pandas as pd
+import re
 import logging
 
 logger = logging.getLogger(__name__)
@@ -27,6 +29,62 @@ class TestNotify(unittest.TestCase):
             ["redacted@gmail.com"], "Testing", "<strong>Test content<strong>"
         )
 
+    def test_df_html_point(self) -> None:
+        """Ensure point dataframes are rendered with formatted numbers and links"""
+
+        df = pd.DataFrame(
+            {
+                "symbol": ["AAPL", "SHOP.TO", "MSFT"],
+                "q_id": [8049.0, 38526.0, 27426.0],
+                "volume": [1234567, 999, None],
+            }
+        )
+
+        html = notify.df_html_point(df)
+        self.assertIn("<td>8049</td>", html)
+        self.assertIn("<td>1,234,567</td>", html)
+        self.assertIn("<td>999</td>", html)
+        self.assertIn("<td>nan</td>", html)
+        self.assertIn("https://ca.finance.yahoo.com/quote/SHOP.TO", html)
+
+        html = notify.df_html_point(df, max_rows=1, offset=1)
+        self.assertIn("SHOP.TO", html)
+        self.assertNotIn("AAPL", html)
+        self.assertIn("Showing rows 1 to 1 of 3", html)
+
+        html = notify.df_html_point(df, max_rows=10, offset=5)
+        self.assertNotIn("Showing rows", html)
+
+    def test_df_html_point_cells(self) -> None:
+        """Ensure other cells are formatted like DataFrame.to_html(escape=False)"""
+
+        df = pd.DataFrame(
+            {
+                "symbol": ["AT&T", "MSFT", "SHOP.TO"],
+                "description": ["AT&T <b>Inc</b>", None, "Shopify"],
+                "pe": [0.1 + 0.2, float("nan"), 25.0],
+                "eps": [12.3456789, 1.5, -0.25],
+                "tiny": [1e-8, 1.0, 0.0],
+                "large": [12345678.125, 2.5, float("inf")],
+                "mod_date": pd.to_datetime(
+                    ["2022-01-01 10:00:00", "2022-01-02 16:30:15", None]
+                ),
+                "ex_date": pd.to_datetime(["2022-01-01", None, "2022-03-01"]),
+                "shares": [1, 2, 3],
+            }
+        )
+
+        html = notify.df_html_point(df)
+        self.assertIn("<td>AT&T <b>Inc</b></td>", html)
+        self.assertIn("<td>12.345679</td>", html)
+        self.assertIn("<td>2022-01-01 10:00:00</td>", html)
+        self.assertIn("quote/AT&T", html)
+
+        # cells other than the link match DataFrame.to_html
+        cells = re.findall(r"<td>(.*?)</td>", html)
+        expected = re.findall(r"<td>(.*?)</td>", df.to_html(escape=False))
+        self.assertEqual([c for c in cells if "<a href" not in c], expected)
+
 
 if __name__ == "__main__":
     unittest.main()
@@ -0,0 +1,78 @@
+from app.data.planner import FieldPlanner
+
+from types import SimpleNamespace
+from unittest import mock
+import unittest
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+class TestPlanner(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls) -> None:
+        logger.info("\n=== TESTING PLANNER.PY ===")
+        cls.planner = FieldPlanner(qt=None)
+
+    def test_plan(self) -> None:
+        """Ensure fields are coalesced into as few, cheap sources as possible"""
+
+        fields = ["averageVol3Months", "marketCap", "lastTradePrice", "isHalted"]
+        self.assertEqual(
+            self.planner.plan(fields, "USD"),
+            {
+                "qt_quote": {"lastTradePrice": "lastTradePrice", "isHalted": "isHalted"},
+                "qt_symbol": {
+                    "averageVol3Months": "averageVol3Months",
+                    "marketCap": "marketCap",
+                },
+            },
+        )
+
+        # nasdaq.com is required for beta - overlapping fields ride along
+        plan = self.planner.plan(["beta", "marketCap"], "USD")
+        self.assertEqual(list(plan), ["nq"])
+
+        with self.assertRaises(ValueError):
+            self.planner.plan(["beta"], "CAD")
+
+    def test_fetch_batch(self) -> None:
+        """Ensure values are normalized per field and unplannable groups don't abort others"""
+
+        qt = mock.MagicMock()
+        qt.get_qids.return_value = [8049]
+        qt.get_mkt_quote_batch.side_effect = lambda group, fields, qids: [
+            [150.25] for _ in group
+        ]
+        qt.get_symbol_info_batch.side_effect = lambda group, fields, qids: [
+            [2.4e12] for _ in group
+        ]
+        planner = FieldPlanner(qt)
+        handlers = [SimpleNamespace(currency="USD"), SimpleNamespace(currency="CAD")]
+
+        with mock.patch(
+            "app.data.planner.get_quote_nq_batch",
+            return_value=[["1.25", "$2,400,000,000,000"]],
+        ) as nq_batch:
+            results, errors = planner.fetch_batch(
+                handlers, ["beta", "marketCap", "lastTradePrice"]
+            )
+
+        nq_batch.assert_called_once()
+        self.assertEqual(
+            results[0], {"beta": 1.25, "marketCap": 2.4e12, "lastTradePrice": 150.25}
+        )
+        self.assertEqual(results[1], dict.fromkeys(["beta", "marketCap", "lastTradePrice"]))
+        self.assertEqual(list(errors), ["CAD"])
+
+        # without beta marketCap comes from QT - same type and value
+        results, errors = planner.fetch_batch(handlers[:1], ["marketCap"])
+        self.assertEqual((results, errors), ([{"marketCap": 2.4e12}], {}))
+        self.assertIsInstance(results[0]["marketCap"], float)
+
+        with self.assertRaises(ValueError):
+            planner.fetch(handlers[1], ["beta"])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,77 @@
+from app.utils import profiler
+
+import glob
+import os
+import pstats
+import tempfile
+from unittest import mock
+import unittest
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+class TestProfiler(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls) -> None:
+        logger.info("\n=== TESTING PROFILER.PY ===")
+
+    def test_profiling_enabled(self) -> None:
+        """Ensure profiling is opt-in through the event or environment"""
+
+        os.environ.pop("PC_PROFILE", None)
+        self.assertFalse(profiler.profiling_enabled({"script": "cleanup"}))
+        self.assertTrue(profiler.profiling_enabled({"script": "cleanup", "profile": True}))
+
+        os.environ["PC_PROFILE"] = "1"
+        try:
+            self.assertTrue(profiler.profiling_enabled({"script": "cleanup"}))
+        finally:
+            del os.environ["PC_PROFILE"]
+
+    def test_profile_call(self) -> None:
+        """Ensure profiled call returns its result and saves a readable profile"""
+
+        bucket = os.environ.pop("BUCKET_NAME", None)
+        profile_dir = profiler._PROFILE_DIR
+        with tempfile.TemporaryDirectory() as tmp:
+            profiler._PROFILE_DIR = tmp
+            try:
+                result = profiler.profile_call("test/script", sorted, [3, 1, 2])
+            finally:
+                profiler._PROFILE_DIR = profile_dir
+                if bucket is not None:
+                    os.environ["BUCKET_NAME"] = bucket
+
+            self.assertEqual(result, [1, 2, 3])
+            [path] = glob.glob(os.path.join(tmp, "test_script-*.prof"))
+            self.assertGreater(pstats.Stats(path).total_calls, 0)
+
+    def test_profile_upload(self) -> None:
+        """Ensure uploaded profiles are removed from disk and failed uploads are not reported"""
+
+        bucket = os.environ.get("BUCKET_NAME")
+        os.environ["BUCKET_NAME"] = "bucket"
+        profile_dir = profiler._PROFILE_DIR
+        with tempfile.TemporaryDirectory() as tmp:
+            profiler._PROFILE_DIR = tmp
+            try:
+                with mock.patch.object(profiler, "AWSClient") as client:
+                    client.return_value.pc_s3_upload.return_value = False
+                    with self.assertLogs(profiler.logger, "INFO") as logs:
+                        profiler.profile_call("script", sorted, [3, 1, 2])
+            finally:
+                profiler._PROFILE_DIR = profile_dir
+                if bucket is None:
+                    del os.environ["BUCKET_NAME"]
+                else:
+                    os.environ["BUCKET_NAME"] = bucket
+
+            client.return_value.pc_s3_upload.assert_called_once()
+            [line] = [line for line in logs.output if "uploaded" in line]
+            self.assertIn("could not be uploaded", line)
+            self.assertEqual(os.listdir(tmp), [])
+
+
+if __name__ == "__main__":
+    unittest.main()
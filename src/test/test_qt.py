@@ -1,5 +1,6 @@
 from app.data.qt import QT
 from app.data.handler import DataHandler
+from app.data.handler_batch import DataHandlerBatch
 
 import unittest
 import logging
@@ -30,6 +31,21 @@ class TestQt(unittest.TestCase):
         self.assertGreater(float(vol), 1000000)
         self.assertGreater(float(cap), 1000000)
 
+    def test_get_mkt_quote_batch(self) -> None:
+        """Test bulk market quote extraction from QT"""
+
+        batch = DataHandlerBatch(
+            {"yf": ["AAPL", "MSFT"], "qt": ["AAPL", "MSFT"]},
+            exchanges=["nasdaq", "nasdaq"],
+            currencies=["USD", "USD"],
+            qt=self.qt,
+        )
+        results = batch.get_mkt_quote(["symbol", "isHalted"])
+        self.assertEqual([symbol for symbol, _ in results], ["AAPL", "MSFT"])
+        self.assertEqual(
+            results[1], self.qt.get_mkt_quote(batch[1], ["symbol", "isHalted"])
+        )
+
     def test_get_exchange(self) -> None:
         """Test exchange extraction from QT"""
 
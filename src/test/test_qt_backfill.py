@@ -0,0 +1,141 @@
+from app.data.qt_backfill import CandleBackfill, _RateLimiter
+
+from datetime import datetime, timedelta, timezone
+from unittest import mock
+import tempfile
+import unittest
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+class _FakeQT:
+    """Serves one daily candle per day of the requested window"""
+
+    def __init__(self, fail_after: int = None) -> None:
+        self.calls = 0
+        self.fail_after = fail_after
+
+    def get_req(self, url: str, params: dict) -> dict:
+        self.calls += 1
+        if self.fail_after is not None and self.calls > self.fail_after:
+            return None
+
+        start = datetime.fromisoformat(params["startTime"])
+        end = datetime.fromisoformat(params["endTime"])
+        candles = []
+        while start < end:
+            price = float(start.toordinal() % 100)
+            candles.append(
+                {
+                    "start": start.isoformat(),
+                    "open": price,
+                    "high": price + 1,
+                    "low": price - 1,
+                    "close": price + 0.5,
+                    "volume": 1000,
+                    "VWAP": price + 0.25,
+                }
+            )
+            start += timedelta(days=1)
+
+        return {"candles": candles}
+
+
+class TestQTBackfill(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls) -> None:
+        logger.info("\n=== TESTING QT_BACKFILL.PY ===")
+
+    def setUp(self) -> None:
+        self.tmp = tempfile.TemporaryDirectory()
+        self.start = datetime(2010, 1, 1, tzinfo=timezone.utc)
+        self.end = datetime(2020, 1, 1, tzinfo=timezone.utc)
+
+    def tearDown(self) -> None:
+        self.tmp.cleanup()
+
+    def test_windows(self) -> None:
+        """Ensure ranges are split into windows under QT's candle cap"""
+
+        backfill = CandleBackfill(_FakeQT(), backend="local", root=self.tmp.name)
+        windows = backfill.windows(self.start, self.end, "OneDay")
+        self.assertEqual(len(windows), 2)
+        self.assertEqual(windows[0][0], self.start)
+        self.assertEqual(windows[-1][1], self.end)
+        self.assertTrue(all(b - a <= timedelta(days=2000) for a, b in windows))
+
+    def test_resume(self) -> None:
+        """Ensure failed windows are retried on resume without refetching completed ones"""
+
+        qids = {"AAPL": "8049", "SHOP.TO": "38738"}
+        backfill = CandleBackfill(_FakeQT(fail_after=3), backend="local", root=self.tmp.name)
+        stats = backfill.run(qids, self.start, self.end)
+        self.assertEqual((stats["windows"], stats["failed"]), (4, 1))
+
+        qt = _FakeQT()
+        backfill = CandleBackfill(qt, backend="local", root=self.tmp.name)
+        stats = backfill.run(qids, self.start, self.end)
+        self.assertEqual((stats["windows"], stats["skipped"], stats["failed"]), (1, 3, 0))
+        self.assertEqual(qt.calls, 1)
+
+        df = backfill.read("AAPL")
+        self.assertEqual(len(df), (self.end - self.start).days)
+        self.assertTrue(df["ts"].is_monotonic_increasing)
+        self.assertEqual(list(df.columns), ["ts", "open", "high", "low", "close", "volume", "vwap"])
+
+    def test_extend(self) -> None:
+        """Ensure a truncated last window is refetched when the range is extended"""
+
+        qids = {"AAPL": "8049"}
+        backfill = CandleBackfill(_FakeQT(), backend="local", root=self.tmp.name)
+        backfill.run(qids, self.start, datetime(2012, 1, 1, tzinfo=timezone.utc))
+
+        qt = _FakeQT()
+        backfill = CandleBackfill(qt, backend="local", root=self.tmp.name)
+        stats = backfill.run(qids, self.start, datetime(2014, 1, 1, tzinfo=timezone.utc))
+        self.assertEqual((stats["windows"], stats["skipped"]), (1, 0))
+        self.assertEqual(len(backfill.read("AAPL")), 4 * 365 + 1)
+
+    def test_in_progress(self) -> None:
+        """Ensure windows reaching into the present and failed writes are not checkpointed"""
+
+        qids = {"AAPL": "8049"}
+        end = datetime.now(timezone.utc)
+        backfill = CandleBackfill(_FakeQT(), backend="local", root=self.tmp.name)
+        backfill.run(qids, end - timedelta(days=10), end)
+        self.assertEqual(backfill.load_checkpoint("OneDay", "AAPL"), [])
+
+        with mock.patch.object(backfill.store, "write_table", side_effect=IOError("down")):
+            stats = backfill.run(qids, self.start, self.end)
+        self.assertEqual(stats["failed"], 2)
+        self.assertEqual(backfill.load_checkpoint("OneDay", "AAPL"), [])
+
+    def test_checkpoint_per_ticker(self) -> None:
+        """Ensure backfills of different tickers keep each other's progress"""
+
+        aapl = CandleBackfill(_FakeQT(), backend="local", root=self.tmp.name)
+        shop = CandleBackfill(_FakeQT(), backend="local", root=self.tmp.name)
+        aapl.run({"AAPL": "8049"}, self.start, self.end)
+        shop.run({"SHOP.TO": "38738"}, self.start, self.end)
+
+        self.assertEqual(len(aapl.load_checkpoint("OneDay", "AAPL")), 2)
+        self.assertEqual(len(aapl.load_checkpoint("OneDay", "SHOP.TO")), 2)
+
+    def test_hourly_limit(self) -> None:
+        """Ensure requests beyond the hourly budget wait for the oldest to age out"""
+
+        limiter = _RateLimiter(rate=1000, hourly_limit=3)
+        with mock.patch("app.data.qt_backfill.time.monotonic", return_value=100), mock.patch(
+            "app.data.qt_backfill.time.sleep"
+        ) as sleep:
+            for _ in range(4):
+                limiter.wait()
+
+        waits = [call.args[0] for call in sleep.call_args_list]
+        self.assertEqual(len(waits), 3)
+        self.assertAlmostEqual(waits[-1], 3600)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,125 @@
+from app.data.qt_cache import SymbolInfoCache
+
+from datetime import datetime, timezone
+from types import SimpleNamespace
+from unittest import mock
+import os
+import tempfile
+import unittest
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+class _FakeQT:
+    """Returns the requested v1/symbols fields, counting requests"""
+
+    def __init__(self) -> None:
+        self.calls = 0
+
+    def get_symbol_info(self, handler: object, info: list, force_search: bool = False) -> list:
+        self.calls += 1
+        symbol = {
+            "symbol": handler.tickers["qt"],
+            "prevDayClosePrice": 150.0,
+            "lastTradePrice": 151.0,
+        }
+        return [symbol.get(field) for field in info]
+
+
+def _ts(*args) -> float:
+    return datetime(*args, tzinfo=timezone.utc).timestamp()
+
+
+class TestQTCache(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls) -> None:
+        logger.info("\n=== TESTING QT_CACHE.PY ===")
+
+    def setUp(self) -> None:
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tmp_dir.name, "cache.json")
+        self.qt = _FakeQT()
+        self.cache = SymbolInfoCache(self.qt, path=self.path)
+        self.handler = SimpleNamespace(tickers={"yf": "AAPL", "qt": "AAPL"}, exchange="NASDAQ")
+
+    def tearDown(self) -> None:
+        self.tmp_dir.cleanup()
+
+    def get(self, info: list, now: float) -> list:
+        with mock.patch("app.data.qt_cache.time.time", return_value=now):
+            return self.cache.get_symbol_info(self.handler, info)
+
+    def test_hit_miss(self) -> None:
+        """Ensure fields are served from cache until one of the requested fields expires"""
+
+        now = _ts(2022, 6, 1, 15)
+        self.assertEqual(self.get(["symbol", "prevDayClosePrice"], now), ["AAPL", 150.0])
+        self.assertEqual(self.get(["symbol"], now + 3600), ["AAPL"])
+        self.assertEqual(self.qt.calls, 1)
+
+        # intraday fields expire after a minute
+        self.get(["lastTradePrice"], now + 3600)
+        self.get(["lastTradePrice"], now + 3630)
+        self.assertEqual(self.qt.calls, 2)
+        self.get(["lastTradePrice"], now + 3661)
+        self.assertEqual(self.qt.calls, 3)
+
+    def test_daily_expiry(self) -> None:
+        """Ensure daily fields expire at midnight exchange time, not UTC"""
+
+        # 19:00 and 21:00 ET on June 1st are on different UTC dates
+        self.get(["prevDayClosePrice"], _ts(2022, 6, 1, 23))
+        self.get(["prevDayClosePrice"], _ts(2022, 6, 2, 1))
+        self.assertEqual(self.qt.calls, 1)
+
+        self.get(["prevDayClosePrice"], _ts(2022, 6, 2, 4, 1))
+        self.assertEqual(self.qt.calls, 2)
+
+    def test_save_load(self) -> None:
+        """Ensure non-intraday fields survive a save/load round trip"""
+
+        now = _ts(2022, 6, 1, 15)
+        self.get(["symbol", "lastTradePrice"], now)
+        with mock.patch("app.data.qt_cache.time.time", return_value=now):
+            self.cache.save()
+
+        qt = _FakeQT()
+        cache = SymbolInfoCache(qt, path=self.path)
+        with mock.patch("app.data.qt_cache.time.time", return_value=now + 60):
+            self.assertEqual(cache.get_symbol_info(self.handler, ["symbol"]), ["AAPL"])
+            self.assertEqual(qt.calls, 0)
+            cache.get_symbol_info(self.handler, ["lastTradePrice"])
+            self.assertEqual(qt.calls, 1)
+
+    def test_save_merge(self) -> None:
+        """Ensure saves are skipped without fetches and keep symbols saved by other containers"""
+
+        now = _ts(2022, 6, 1, 15)
+        self.cache.save()
+        self.assertFalse(os.path.exists(self.path))
+
+        other = SymbolInfoCache(_FakeQT(), path=self.path)
+        msft = SimpleNamespace(tickers={"yf": "MSFT", "qt": "MSFT"}, exchange="NASDAQ")
+        with mock.patch("app.data.qt_cache.time.time", return_value=now):
+            self.cache.get_symbol_info(self.handler, ["symbol"])
+            other.get_symbol_info(msft, ["symbol"])
+            self.cache.save()
+            other.save()
+
+        cache = SymbolInfoCache(_FakeQT(), path=self.path)
+        self.assertEqual(set(cache.entries), {"AAPL|nasdaq", "MSFT|nasdaq"})
+
+    def test_attach(self) -> None:
+        """Ensure attached QT instances serve get_symbol_info from the cache"""
+
+        qt = _FakeQT()
+        self.cache.attach(qt)
+        self.cache.attach(qt)
+        qt.get_symbol_info(self.handler, ["symbol"])
+        qt.get_symbol_info(self.handler, ["symbol"])
+        self.assertEqual(qt.calls, 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
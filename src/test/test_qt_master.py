@@ -0,0 +1,118 @@
+from app.data.qt_master import SymbolMaster
+
+import os
+import tempfile
+import unittest
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+def _symbol(qid: int, symbol: str, exchange: str, currency: str, kind: str = "Stock") -> dict:
+    return {
+        "symbol": symbol,
+        "symbolId": qid,
+        "description": f"{symbol} Inc",
+        "listingExchange": exchange,
+        "currency": currency,
+        "securityType": kind,
+        "isQuotable": True,
+    }
+
+
+_SYMBOLS = [
+    _symbol(8049, "AAPL", "NASDAQ", "USD"),
+    _symbol(8050, "AAPL.TO", "TSX", "CAD"),
+    _symbol(9291, "AAP", "NYSE", "USD"),
+    _symbol(9292, "AAPLX", "NASDAQ", "USD", "MutualFund"),
+    _symbol(38738, "SHOP.TO", "TSX", "CAD"),
+    _symbol(1001, "SHOP.TO", "TSXV", "CAD"),  # cross-listed under the same name
+]
+
+
+class _FakeQT:
+    """Pages symbol search results two at a time"""
+
+    def __init__(self, failing: str = None) -> None:
+        self.calls = 0
+        self.failing = failing
+
+    def get_req(self, url: str, params: dict) -> dict:
+        self.calls += 1
+        if params["prefix"] == self.failing:
+            return None
+        matches = [s for s in _SYMBOLS if s["symbol"].startswith(params["prefix"])]
+        return {"symbols": matches[params["offset"] : params["offset"] + 2]}
+
+    def get_exchange(self, handler: object, info: list, prefix: str, currency: str) -> list:
+        return ["fallback"]
+
+
+class TestQTMaster(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls) -> None:
+        logger.info("\n=== TESTING QT_MASTER.PY ===")
+
+    def setUp(self) -> None:
+        self.tmp = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tmp.name, "master.json.gz")
+        self.master = SymbolMaster(_FakeQT(), backend="local", path=self.path)
+        self.master.harvest(["A", "S"])
+
+    def tearDown(self) -> None:
+        self.tmp.cleanup()
+
+    def test_harvest_search(self) -> None:
+        """Ensure paged harvest results are searchable by prefix"""
+
+        self.assertEqual(len(self.master), 6)
+        self.assertEqual(
+            [r["symbol"] for r in self.master.search("aap")],
+            ["AAP", "AAPL", "AAPL.TO", "AAPLX"],
+        )
+        self.assertEqual(self.master.search("AAPL", limit=1)[0]["symbolId"], 8049)
+        self.assertEqual(
+            self.master.get_qids(["SHOP.TO", "MISSING"], ["tsx", "tsx"], ["CAD", "CAD"]),
+            {"SHOP.TO": "38738"},
+        )
+        self.assertEqual(self.master.get_qids(["SHOP.TO"], ["tsx"], ["USD"]), {})
+
+    def test_harvest_overlap(self) -> None:
+        """Ensure paging continues past pages of symbols already found by another prefix"""
+
+        master = SymbolMaster(_FakeQT(), backend="local", path=self.path)
+        master.harvest(["AAPL", "AA"], max_workers=1)
+        self.assertEqual(len(master), 4)
+
+    def test_failed_prefix(self) -> None:
+        """Ensure symbols of a failed prefix are kept and the harvest is retried"""
+
+        harvested_at = self.master.harvested_at
+        self.master.qt = _FakeQT(failing="S")
+        self.master.harvest(["A", "S"])
+        self.assertEqual(len(self.master), 6)
+        self.assertEqual(self.master.harvested_at, harvested_at)
+
+    def test_get_exchange(self) -> None:
+        """Ensure exchange checks match QT.get_exchange rules locally"""
+
+        info = ["listingExchange"]
+        self.assertEqual(self.master.get_exchange(None, info, "AAPL", "USD"), ["nasdaq"])
+        self.assertEqual(self.master.get_exchange(None, info, "AAPL", "CAD"), ["tsx"])
+        self.assertEqual(self.master.get_exchange(None, info, "ZZZ", "USD"), ["fallback"])
+        self.assertEqual(
+            self.master.get_exchange(None, info, "ZZZ", "USD", fallback=False), [None]
+        )
+
+    def test_save_load(self) -> None:
+        """Ensure persisted directory round trips"""
+
+        self.master.save()
+        loaded = SymbolMaster(backend="local", path=self.path)
+        loaded.load()
+        self.assertEqual(loaded.search(""), self.master.search(""))
+        self.assertEqual(loaded.harvested_at, self.master.harvested_at)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,217 @@
+from app.data.qt_stream import QTStream
+
+from types import SimpleNamespace
+from unittest import mock
+import base64
+import hashlib
+import json
+import socket
+import struct
+import threading
+import time
+import unittest
+import logging
+
+logger = logging.getLogger(__name__)
+
+_WS_GUID = "258EAFA5-E914-47DA-95CA-C5AB0DC85B11"
+
+
+class FakeStreamServer:
+    """Minimal local WebSocket stand-in for Questrade's streaming port"""
+
+    def __init__(self, quotes: list) -> None:
+        self.quotes = quotes
+        self.tokens = []
+        self.sock = socket.socket()
+        self.sock.bind(("127.0.0.1", 0))
+        self.sock.listen()
+        self.port = self.sock.getsockname()[1]
+        threading.Thread(target=self.serve, daemon=True).start()
+
+    def serve(self) -> None:
+        while True:
+            try:
+                conn, _ = self.sock.accept()
+            except OSError:
+                return
+            threading.Thread(target=self.handle, args=(conn,), daemon=True).start()
+
+    def handle(self, conn: socket.socket) -> None:
+        # handshake
+        request = b""
+        while b"\r\n\r\n" not in request:
+            request += conn.recv(1024)
+        key = [
+            line.split(":", 1)[1].strip()
+            for line in request.decode().split("\r\n")
+            if line.lower().startswith("sec-websocket-key")
+        ][0]
+        accept = base64.b64encode(hashlib.sha1((key + _WS_GUID).encode()).digest())
+        conn.sendall(
+            b"HTTP/1.1 101 Switching Protocols\r\nUpgrade: websocket\r\n"
+            b"Connection: Upgrade\r\nSec-WebSocket-Accept: " + accept + b"\r\n\r\n"
+        )
+
+        # first client message is the access token
+        self.tokens.append(self.recv_frame(conn))
+
+        self.send_frame(conn, json.dumps({"success": True}))
+        for quote in self.quotes:
+            self.send_frame(conn, json.dumps({"quotes": [quote]}))
+
+        # answer pings until the client disconnects
+        try:
+            while True:
+                opcode, payload = self.read_frame(conn)
+                if opcode == 0x9:
+                    conn.sendall(struct.pack(">BB", 0x8A, len(payload)) + payload)
+        except (OSError, IndexError):
+            pass
+        conn.close()
+
+    def read_frame(self, conn: socket.socket) -> tuple:
+        header = conn.recv(2)
+        opcode, length = header[0] & 0x0F, header[1] & 0x7F
+        if length == 126:
+            length = struct.unpack(">H", conn.recv(2))[0]
+        mask = conn.recv(4)
+        payload = b""
+        while len(payload) < length:
+            payload += conn.recv(length - len(payload))
+        return opcode, bytes(b ^ mask[i % 4] for i, b in enumerate(payload))
+
+    def recv_frame(self, conn: socket.socket) -> str:
+        return self.read_frame(conn)[1].decode()
+
+    def send_frame(self, conn: socket.socket, msg: str) -> None:
+        data = msg.encode()
+        if len(data) < 126:
+            header = struct.pack(">BB", 0x81, len(data))
+        else:
+            header = struct.pack(">BBH", 0x81, 126, len(data))
+        conn.sendall(header + data)
+
+    def close(self) -> None:
+        self.sock.close()
+
+
+class FakeQT:
+    """QT stand-in that points the stream at the local server"""
+
+    def __init__(self, port: int) -> None:
+        self.port = port
+        self.access = "token-1"
+        self.api_server = "http://127.0.0.1/"
+        self.polled = []
+
+    def get_req(self, url: str, params: dict) -> dict:
+        return {"streamPort": self.port}
+
+    def get_auth(self) -> None:
+        self.access = "token-2"
+
+    def get_mkt_quote(self, handler: object, info: list) -> list:
+        self.polled.append(handler.tickers["yf"])
+        return [None] * len(info)
+
+
+class TestQtStream(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls) -> None:
+        logger.info("\n=== TESTING QT_STREAM.PY ===")
+
+    def setUp(self) -> None:
+        self.server = FakeStreamServer(
+            [
+                {"symbolId": 8049, "symbol": "AAPL", "lastTradePrice": 150.1},
+                {"symbolId": 8049, "volume": 1000},
+            ]
+        )
+        self.qt = FakeQT(self.server.port)
+        self.stream = QTStream(self.qt, {"AAPL": "8049", "MSFT": "27426"})
+        self.stream.start()
+
+    def tearDown(self) -> None:
+        self.stream.stop()
+        self.server.close()
+
+    def wait_for(self, condition: object, timeout: float = 5) -> None:
+        end = time.time() + timeout
+        while not condition() and time.time() < end:
+            time.sleep(0.05)
+
+    def test_get_mkt_quote(self) -> None:
+        """Ensure streamed quotes are merged and served locally"""
+
+        self.wait_for(lambda: (self.stream.get_quote("8049") or {}).get("volume"))
+        self.assertEqual(self.server.tokens, ["token-1"])
+
+        handler = SimpleNamespace(tickers={"yf": "AAPL"})
+        self.assertEqual(
+            self.stream.get_mkt_quote(handler, ["symbol", "lastTradePrice", "volume"]),
+            ["AAPL", 150.1, 1000],
+        )
+        self.assertEqual(self.qt.polled, [])
+
+        # no streamed quote yet - falls back to polling
+        handler = SimpleNamespace(tickers={"yf": "MSFT"})
+        self.stream.get_mkt_quote(handler, ["symbol"])
+        self.assertEqual(self.qt.polled, ["MSFT"])
+
+    def test_resubscribe_on_token_refresh(self) -> None:
+        """Ensure the stream resubscribes with the new token after a refresh"""
+
+        self.wait_for(lambda: self.server.tokens)
+        self.qt.get_auth()
+        self.wait_for(lambda: "token-2" in self.server.tokens, timeout=10)
+        self.assertEqual(self.server.tokens, ["token-1", "token-2"])
+
+    def test_heartbeat(self) -> None:
+        """Ensure quotes are served while their subscription is live, however old they are"""
+
+        self.wait_for(lambda: self.stream.get_quote("8049"))
+        handler = SimpleNamespace(tickers={"yf": "AAPL"})
+
+        # no trades for minutes - the subscription is alive, so the quote is still current
+        with self.stream.lock:
+            self.stream.heartbeats[0] = time.monotonic()
+        with mock.patch(
+            "app.data.qt_stream.time.monotonic", return_value=time.monotonic() + 5
+        ):
+            self.stream.get_mkt_quote(handler, ["symbol"])
+        self.assertEqual(self.qt.polled, [])
+
+        self.stream.heartbeat_timeout = 0
+        with mock.patch(
+            "app.data.qt_stream.time.monotonic", return_value=time.monotonic() + 5
+        ):
+            self.stream.get_mkt_quote(handler, ["symbol"])
+        self.assertEqual(self.qt.polled, ["AAPL"])
+
+        # idle subscriptions stay live through pings
+        self.stream.heartbeat_timeout = 60
+        time.sleep(6)
+        self.assertGreater(self.stream.heartbeats[0], time.monotonic() - 2)
+
+        with self.stream.lock:
+            self.stream.heartbeats.clear()
+        self.stream.get_mkt_quote(handler, ["symbol"])
+        self.assertEqual(self.qt.polled, ["AAPL", "AAPL"])
+
+    def test_failed_reauth(self) -> None:
+        """Ensure a failing re-authentication does not end the chunk's thread"""
+
+        qt = FakeQT(self.server.port)
+        qt.get_req = lambda url, params: None
+        qt.get_auth = mock.Mock(side_effect=ConnectionError("DB down"))
+
+        stream = QTStream(qt, {"AAPL": "8049"})
+        stream.start()
+        self.wait_for(lambda: qt.get_auth.call_count >= 2)
+        self.assertTrue(stream.threads[0].is_alive())
+        stream.stop()
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,50 @@
+from app.utils.runtime import RuntimeContext, get_runtime
+
+import os
+import unittest
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+class TestRuntime(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls) -> None:
+        logger.info("\n=== TESTING RUNTIME.PY ===")
+
+        # offline QT - no DB or OAuth round trips
+        os.environ["PC_BENCH_QT_SERVER"] = "http://127.0.0.1:1/"
+
+    @classmethod
+    def tearDownClass(cls) -> None:
+        del os.environ["PC_BENCH_QT_SERVER"]
+
+    def test_reuse(self) -> None:
+        """Ensure resources are created once and reused while healthy"""
+
+        runtime = RuntimeContext()
+        qt = runtime.qt
+        runtime.check()
+        self.assertIs(runtime.qt, qt)
+        self.assertIs(runtime.aws("s3"), runtime.aws("s3"))
+        self.assertEqual(runtime.stats(), {"invocations": 1, "rebuilds": {"qt": 1, "db": 0}})
+
+    def test_rebuild_stale(self) -> None:
+        """Ensure stale QT credentials are rebuilt on next use"""
+
+        runtime = RuntimeContext()
+        qt = runtime.qt
+        qt.expires_at = 0
+        runtime.check()
+        self.assertIsNot(runtime.qt, qt)
+        self.assertEqual(runtime.stats()["rebuilds"]["qt"], 2)
+
+    def test_get_runtime(self) -> None:
+        """Ensure the process-wide runtime context is shared"""
+
+        self.assertIsInstance(get_runtime(), RuntimeContext)
+        self.assertIs(get_runtime(), get_runtime())
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,92 @@
+from app.utils.scheduler import MarketClock, SessionScheduler
+
+from datetime import datetime, timezone
+from unittest import mock
+import time
+import unittest
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+class _FakeQT:
+    def __init__(self, time: str = "2030-01-02T10:15:30.000000-05:00") -> None:
+        self.time = time
+
+    def get_req(self, url: str, params: dict) -> dict:
+        return {"time": self.time} if self.time else None
+
+
+def _utc(*args) -> datetime:
+    return datetime(*args, tzinfo=timezone.utc)
+
+
+class TestScheduler(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls) -> None:
+        logger.info("\n=== TESTING SCHEDULER.PY ===")
+
+    def setUp(self) -> None:
+        self.scheduler = SessionScheduler(["nyse", "tsx"])
+
+    def test_clock(self) -> None:
+        """Ensure clock offset is calibrated against QT time"""
+
+        clock = MarketClock()
+        clock.calibrate(_FakeQT())
+        self.assertTrue(clock.is_calibrated())
+        self.assertGreater(clock.offset, 0)
+        self.assertEqual(clock.now().utcoffset().total_seconds(), -5 * 60 * 60)
+
+        # DST changes are applied without recalibrating
+        clock.offset = _utc(2030, 7, 2, 14, 15).timestamp() - time.time()
+        self.assertEqual((clock.now().hour, clock.now().minute), (10, 15))
+
+    def test_clock_unavailable(self) -> None:
+        """Ensure a failed calibration is retried and still reports exchange time"""
+
+        clock = MarketClock()
+        clock.calibrate(_FakeQT(time=None))
+        self.assertFalse(clock.is_calibrated())
+
+        # local clock is still reported in exchange time, not the container's timezone
+        ts = _utc(2030, 1, 2, 15, 15).timestamp()
+        with mock.patch("app.utils.scheduler.time.time", return_value=ts):
+            self.assertEqual((clock.now().hour, clock.now().minute), (10, 15))
+
+    def test_phase(self) -> None:
+        """Ensure phases follow session hours, early closes and holidays"""
+
+        # regular session 9:30-16:00 ET
+        self.assertEqual(self.scheduler.phase("nyse", _utc(2023, 11, 22, 14, 20)), "pre_open")
+        self.assertEqual(self.scheduler.phase("nyse", _utc(2023, 11, 22, 15, 0)), "open")
+        self.assertEqual(self.scheduler.phase("nyse", _utc(2023, 11, 22, 21, 5)), "post_close")
+        self.assertEqual(self.scheduler.phase("nyse", _utc(2023, 11, 22, 23, 0)), "closed")
+
+        # day after Thanksgiving closes at 13:00 ET
+        self.assertEqual(self.scheduler.phase("nyse", _utc(2023, 11, 24, 18, 10)), "post_close")
+
+        # Canada Day
+        self.assertEqual(self.scheduler.phase("tsx", _utc(2022, 7, 1, 15, 0)), "closed")
+        self.assertEqual(self.scheduler.phase("nyse", _utc(2022, 7, 1, 15, 0)), "open")
+
+    def test_due(self) -> None:
+        """Ensure only open exchanges are run, at the interval of their phase"""
+
+        now = _utc(2022, 7, 1, 15, 0)
+        self.assertEqual(self.scheduler.due({}, now), ["nyse"])
+        self.assertEqual(self.scheduler.due({"nyse": now.timestamp() - 30}, now), [])
+        self.assertEqual(self.scheduler.due({"nyse": now.timestamp() - 60}, now), ["nyse"])
+
+    def test_next_open(self) -> None:
+        """Ensure next session skips weekends and holidays"""
+
+        # Friday after close -> Tuesday (Monday is Labour Day)
+        self.assertEqual(
+            self.scheduler.next_open("tsx", _utc(2022, 9, 2, 22, 0)),
+            _utc(2022, 9, 6, 13, 15),
+        )
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,86 @@
+from app.utils.snapshot import SnapshotCache
+
+from types import SimpleNamespace
+from unittest import mock
+import tempfile
+import unittest
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+class TestSnapshot(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls) -> None:
+        logger.info("\n=== TESTING SNAPSHOT.PY ===")
+
+    def setUp(self) -> None:
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.cache = SnapshotCache("local", root=self.tmp_dir.name)
+
+    def tearDown(self) -> None:
+        self.tmp_dir.cleanup()
+
+    def test_key(self) -> None:
+        """Ensure keys depend on ticker, source, field order and extra arguments"""
+
+        key = self.cache.key("AAPL", "qt.get_mkt_quote", ["symbol", "volume"])
+        self.assertEqual(key, self.cache.key("AAPL", "qt.get_mkt_quote", ["symbol", "volume"]))
+        # results are positional - a different field order must not share a snapshot
+        self.assertNotEqual(key, self.cache.key("AAPL", "qt.get_mkt_quote", ["volume", "symbol"]))
+        self.assertNotEqual(key, self.cache.key("MSFT", "qt.get_mkt_quote", ["symbol", "volume"]))
+        self.assertNotEqual(
+            key, self.cache.key("AAPL", "qt.get_mkt_quote", ["symbol", "volume"], [True])
+        )
+
+    def test_expiry(self) -> None:
+        """Ensure snapshots are only served for their source's TTL and then evicted"""
+
+        with mock.patch("app.utils.snapshot.time.time", return_value=1000):
+            self.cache.put("AAPL", "qt.get_mkt_quote", ["volume"], [100])
+        with mock.patch("app.utils.snapshot.time.time", return_value=1059):
+            self.assertEqual(self.cache.get("AAPL", "qt.get_mkt_quote", ["volume"]), [100])
+        with mock.patch("app.utils.snapshot.time.time", return_value=1060):
+            self.assertIsNone(self.cache.get("AAPL", "qt.get_mkt_quote", ["volume"]))
+
+        self.cache.put("AAPL", "nq.get_quote_nq", ["volume"], [100])
+        self.cache.ttls["qt.get_mkt_quote"] = 0
+        self.assertEqual(self.cache.evict(), 1)
+        self.assertEqual(self.cache.get("AAPL", "nq.get_quote_nq", ["volume"]), [100])
+
+    def test_wrap(self) -> None:
+        """Ensure wrapped source functions only fetch on a cache miss"""
+
+        calls = []
+
+        def fetch(handler: object, info: list, force_search: bool = False) -> list:
+            calls.append(handler.tickers["yf"])
+            return [handler.tickers["yf"], 100] if handler.tickers["yf"] else [None, None]
+
+        cached_fetch = self.cache.wrap("nq.get_quote_nq", fetch)
+        handler = SimpleNamespace(tickers={"yf": "AAPL"})
+        self.assertEqual(cached_fetch(handler, ["symbol", "volume"]), ["AAPL", 100])
+        self.assertEqual(cached_fetch(handler, ["symbol", "volume"]), ["AAPL", 100])
+        self.assertEqual(calls, ["AAPL"])
+        self.assertEqual(cached_fetch(handler, ["volume", "symbol"]), ["AAPL", 100])
+        self.assertEqual(calls, ["AAPL", "AAPL"])
+
+        # failed extractions are not cached
+        handler = SimpleNamespace(tickers={"yf": ""})
+        cached_fetch(handler, ["symbol", "volume"])
+        cached_fetch(handler, ["symbol", "volume"])
+        self.assertEqual(calls, ["AAPL", "AAPL", "", ""])
+
+        # extra arguments and exchange are part of the key
+        handler = SimpleNamespace(tickers={"yf": "AAPL"}, exchange="nasdaq")
+        cached_fetch(handler, ["symbol", "volume"], True)
+        cached_fetch(handler, ["symbol", "volume"], False)
+        self.assertEqual(calls, ["AAPL", "AAPL", "", "", "AAPL", "AAPL"])
+
+        # calls without a handler bypass the cache
+        search = self.cache.wrap("qt.get_exchange", lambda handler, info, prefix: [prefix])
+        self.assertEqual(search({}, ["listingExchange"], "AA"), ["AA"])
+
+
+if __name__ == "__main__":
+    unittest.main()
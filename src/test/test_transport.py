@@ -0,0 +1,75 @@
+from app.utils import transport
+
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import itertools
+import threading
+import time
+import unittest
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+class SlowFirstHandler(BaseHTTPRequestHandler):
+    """Responds slowly to the first request and immediately to the rest"""
+
+    counter = itertools.count()
+
+    def do_GET(self) -> None:
+        n = next(self.counter)
+        if n == 0:
+            time.sleep(1)
+        body = str(n).encode()
+        self.send_response(200)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args) -> None:
+        pass
+
+
+class TestTransport(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls) -> None:
+        logger.info("\n=== TESTING TRANSPORT.PY ===")
+        cls.server = ThreadingHTTPServer(("127.0.0.1", 0), SlowFirstHandler)
+        cls.url = f"http://127.0.0.1:{cls.server.server_address[1]}/"
+        threading.Thread(target=cls.server.serve_forever, daemon=True).start()
+
+    @classmethod
+    def tearDownClass(cls) -> None:
+        cls.server.shutdown()
+
+    def test_adaptive_timeout(self) -> None:
+        """Ensure timeouts follow observed latency within bounds"""
+
+        tracker = transport.get_tracker("test.timeout")
+        self.assertEqual(tracker.timeout(), 30)
+
+        for _ in range(50):
+            tracker.record(1.5)
+        self.assertEqual(tracker.timeout(), 4.5)
+
+        for _ in range(500):
+            tracker.record(0.1)
+        self.assertEqual(tracker.timeout(), 2)
+
+    def test_hedged_get(self) -> None:
+        """Ensure a slow request is hedged and the first answer wins"""
+
+        tracker = transport.get_tracker("test.hedge")
+        for _ in range(20):
+            tracker.record(0.05)
+
+        start = time.perf_counter()
+        res = transport.get("test.hedge", self.url, hedge=True)
+        self.assertLess(time.perf_counter() - start, 0.5)
+        self.assertEqual(res.text, "1")
+
+        # hedging budget is spent
+        self.assertFalse(tracker.acquire_hedge())
+
+
+if __name__ == "__main__":
+    unittest.main()
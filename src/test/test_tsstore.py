@@ -0,0 +1,101 @@
+from app.utils.tsstore import TSStore
+
+import pyarrow as pa
+from datetime import date, datetime
+from unittest import mock
+import os
+import tempfile
+import unittest
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+class TestTSStore(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls) -> None:
+        logger.info("\n=== TESTING TSSTORE.PY ===")
+
+    def setUp(self) -> None:
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.store = TSStore("local", root=self.tmp_dir.name)
+
+        for minute in range(3):
+            self.store.write(
+                [
+                    {
+                        "ts": datetime(2022, 6, 1, 14, minute),
+                        "ticker": ticker,
+                        "exchange": exchange,
+                        "last_trade_price": 100.0 + minute,
+                        "volume": 1000 * minute,
+                    }
+                    for ticker, exchange in [
+                        ("AAPL", "nasdaq"),
+                        ("MSFT", "nasdaq"),
+                        ("SHOP.TO", "tsx"),
+                    ]
+                ]
+            )
+
+    def tearDown(self) -> None:
+        self.tmp_dir.cleanup()
+
+    def test_read(self) -> None:
+        """Ensure reads filter on ticker, exchange and time range"""
+
+        df = self.store.read(datetime(2022, 6, 1), datetime(2022, 6, 2))
+        self.assertEqual(len(df), 9)
+
+        df = self.store.read(
+            datetime(2022, 6, 1, 14, 1),
+            datetime(2022, 6, 1, 14, 3),
+            tickers=["AAPL"],
+            columns=["last_trade_price"],
+        )
+        self.assertEqual(list(df["last_trade_price"]), [101.0, 102.0])
+        self.assertEqual(list(df.columns), ["ts", "ticker", "last_trade_price", "exchange"])
+
+        df = self.store.read(
+            datetime(2022, 6, 1), datetime(2022, 6, 2), exchanges=["TSX"]
+        )
+        self.assertEqual(set(df["ticker"]), {"SHOP.TO"})
+
+    def test_compact(self) -> None:
+        """Ensure compaction merges part files without losing rows"""
+
+        partition = f"{self.tmp_dir.name}/date=2022-06-01/exchange=nasdaq"
+        self.assertEqual(len(os.listdir(partition)), 3)
+
+        self.store.compact(date(2022, 6, 1), "nasdaq")
+        self.assertEqual(len(os.listdir(partition)), 1)
+
+        df = self.store.read(datetime(2022, 6, 1), datetime(2022, 6, 2))
+        self.assertEqual(len(df), 9)
+
+    def test_failed_upload(self) -> None:
+        """Ensure parts are kept and unwritten paths are not returned when uploads fail"""
+
+        parts = [
+            f"{self.store.root}/date=2022-06-01/exchange=nasdaq/part-{i}.parquet"
+            for i in range(2)
+        ]
+        s3 = mock.MagicMock()
+        s3.client.get_paginator.return_value.paginate.return_value = [
+            {"Contents": [{"Key": key} for key in parts]}
+        ]
+        s3.pc_s3_upload.return_value = False
+
+        table = pa.table({"ts": [datetime(2022, 6, 1)], "ticker": ["AAPL"]})
+        store = TSStore("local", root=self.store.root)
+        store.backend, store.s3 = "s3", s3
+        with mock.patch.object(store, "read_table", return_value=table):
+            self.assertIsNone(store.compact(date(2022, 6, 1), "nasdaq"))
+        s3.pc_s3_del_batch.assert_not_called()
+
+        records = [{"ts": datetime(2022, 6, 1), "ticker": "AAPL", "exchange": "nasdaq"}]
+        self.assertEqual(store.write(records), [])
+
+
+if __name__ == "__main__":
+    unittest.main()
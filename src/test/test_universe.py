@@ -0,0 +1,74 @@
+from app.data.universe import UniverseIndex
+
+from datetime import datetime
+import numpy as np
+import unittest
+import logging
+
+logger = logging.getLogger(__name__)
+
+_COLS = ["symbol", "q_id", "currency", "exchange", "sector", "market_cap", "mod_date"]
+
+
+class _FakeDB:
+    def __init__(self, rows: list) -> None:
+        self.rows = rows
+        self.calls = []
+
+    def get_point_since(self, mod_date: datetime = None) -> tuple:
+        self.calls.append(mod_date)
+        return _COLS, [r for r in self.rows if mod_date is None or r[-1] > mod_date]
+
+
+class TestUniverse(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls) -> None:
+        logger.info("\n=== TESTING UNIVERSE.PY ===")
+
+    def setUp(self) -> None:
+        self.db = _FakeDB(
+            [
+                ("AAPL", 1, "USD", "nasdaq", "Tech", 3e12, datetime(2024, 1, 1)),
+                ("XOM", 2, "USD", "nyse", "Energy", 4e11, datetime(2024, 1, 1)),
+                ("SHOP.TO", 3, "CAD", "tsx", "Tech", 1e11, datetime(2024, 1, 1)),
+                ("ABC.CN", 4, "CAD", "cse", "Tech", None, datetime(2024, 1, 1)),
+            ]
+        )
+        self.index = UniverseIndex()
+        self.index.refresh(self.db)
+
+    def test_query(self) -> None:
+        """Ensure equality, membership and range filters compose"""
+
+        self.assertEqual(self.index.symbols(currency="USD"), ["AAPL", "XOM"])
+        self.assertEqual(self.index.symbols(sector="Tech", currency="CAD"), ["SHOP.TO", "ABC.CN"])
+        self.assertEqual(self.index.symbols(exchange=["nyse", "tsx"]), ["XOM", "SHOP.TO"])
+        self.assertEqual(self.index.symbols(sector="Tech", market_cap=(5e10, 1e12)), ["SHOP.TO"])
+        self.assertEqual(self.index.symbols(symbol=["XOM", "MISSING"]), ["XOM"])
+        self.assertEqual(self.index.symbols(currency="EUR"), [])
+
+        with self.assertRaises(KeyError):
+            self.index.query(unknown=1)
+
+    def test_rows(self) -> None:
+        """Ensure rows match those returned by the DB"""
+
+        self.assertEqual(self.index.rows(self.index.query(currency="CAD")), self.db.rows[2:])
+        universe = self.index.universe(self.index.query(currency="USD"))
+        self.assertTrue(np.array_equal(universe.columns["market_cap"], [3e12, 4e11]))
+
+    def test_incremental_refresh(self) -> None:
+        """Ensure only modified rows are fetched and merged into the index"""
+
+        self.db.rows[1] = ("XOM", 2, "USD", "nyse", "Energy", 5e11, datetime(2024, 1, 2))
+        self.db.rows.append(("NEW", 5, "USD", "nyse", "Tech", 2e9, datetime(2024, 1, 2)))
+
+        self.assertEqual(self.index.refresh(self.db), 2)
+        self.assertEqual(self.db.calls[-1], datetime(2024, 1, 1))
+        self.assertEqual(self.index.symbols(exchange="nyse"), ["XOM", "NEW"])
+        self.assertEqual(self.index.symbols(market_cap=(4.5e11, 1e12)), ["XOM"])
+        self.assertEqual(self.index.last_mod, datetime(2024, 1, 2))
+
+
+if __name__ == "__main__":
+    unittest.main()